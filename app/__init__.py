@@ -54,7 +54,12 @@ def create_app(config_name=None):
         db.init_app(app)
 
     # Initialize Flask-SocketIO
-    socketio.init_app(app, cors_allowed_origins="*", async_mode="threading")
+    socketio.init_app(
+        app,
+        cors_allowed_origins="*",
+        async_mode="threading",
+        message_queue=app.config.get("SOCKETIO_MESSAGE_QUEUE"),
+    )
 
     # Initialize Flask-Mail
     mail.init_app(app)
@@ -73,15 +78,54 @@ def create_app(config_name=None):
             Prescription,
             Allergy,
             VitalSigns,
+            Diagnosis,
         )
         from app.models.email_verification import EmailVerification
         from app.models.login_attempt import LoginAttempt
+        from app.models.daily_metric import DailyMetric, MetricCounter
+        from app.models.report_job import ReportJob
+        from app.models.trend_sketch import TrendSketch
+        from app.services.metrics_maintainer import MetricsMaintainer
+
+        from app.services.diagnosis_service import DiagnosisService
+        from app.services.trend_sketches import TrendSketchService
+        from app.services.conversation_service import ConversationService
+        from app.services.message_sync import MessageSyncService
+
+        # Code diagnoses, keep the reporting rollup, trend sketches and
+        # conversation summaries current as records change, and log message
+        # changes for incremental sync
+        MetricsMaintainer.register()
+        DiagnosisService.register()
+        TrendSketchService.register()
+        ConversationService.register()
+        MessageSyncService.register()
+
+        # Cache report results, invalidated by writes to the reported tables
+        from app.services.analytics_cache import init_analytics_cache
+
+        init_analytics_cache(app)
+
+        # Sidebar counts share the report cache and its invalidation
+        from app.utils.sidebar_utils import SidebarStatsCache
+
+        SidebarStatsCache.register()
+
+        # Unread message counts, pushed to clients when they change
+        from app.services.unread_counters import UnreadCounterService
+
+        UnreadCounterService.register()
 
     # Register blueprints
     from app.routes import register_blueprints
 
     register_blueprints(app)
 
+    # Register CLI commands
+    from app.commands import register_commands
+
+    register_commands(app)
+
     # Create database tables only in non-Vercel environments
     with app.app_context():
         if not app.config.get("DISABLE_DATABASE", False):
@@ -0,0 +1,178 @@
+import click
+from datetime import datetime, date, timedelta
+
+
+def _parse_date(value, default):
+    """Parse a YYYY-MM-DD command line option, falling back to a default."""
+    if not value:
+        return default
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise click.BadParameter(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+def register_commands(app):
+    """Register custom CLI commands with the Flask app."""
+
+    @app.cli.command("refresh-daily-metrics")
+    @click.option("--start", "start", help="First day to refresh (YYYY-MM-DD).")
+    @click.option("--end", "end", help="Last day to refresh (YYYY-MM-DD).")
+    @click.option(
+        "--days",
+        default=7,
+        show_default=True,
+        help="Number of days back from --end to refresh when --start is omitted.",
+    )
+    def refresh_daily_metrics(start, end, days):
+        """Backfill or refresh the daily_metrics rollup and trend sketches."""
+        from app.services.analytics_service import AnalyticsService
+        from app.services.metrics_maintainer import MetricsMaintainer
+        from app.services.trend_sketches import TrendSketchService
+
+        end_date = _parse_date(end, date.today())
+        start_date = _parse_date(start, end_date - timedelta(days=days - 1))
+
+        if start_date > end_date:
+            raise click.BadParameter("--start must not be after --end")
+
+        refreshed = AnalyticsService.refresh_daily_metrics(start_date, end_date)
+        TrendSketchService.refresh(start_date, end_date)
+        MetricsMaintainer.rebuild_counters()
+        click.echo(f"Refreshed daily metrics for {refreshed} day(s): {start_date} to {end_date}")
+
+    @app.cli.command("check-daily-metrics")
+    @click.option("--start", "start", help="First day to check (YYYY-MM-DD).")
+    @click.option("--end", "end", help="Last day to check (YYYY-MM-DD).")
+    @click.option(
+        "--days",
+        default=30,
+        show_default=True,
+        help="Number of days back from --end to check when --start is omitted.",
+    )
+    @click.option("--repair", is_flag=True, help="Refresh the range if drift is found.")
+    def check_daily_metrics(start, end, days, repair):
+        """Compare the rollup and counters against a full recompute."""
+        from app.services.analytics_service import AnalyticsService
+        from app.services.metrics_maintainer import MetricsMaintainer
+
+        end_date = _parse_date(end, date.today())
+        start_date = _parse_date(start, end_date - timedelta(days=days - 1))
+
+        mismatches = MetricsMaintainer.check_consistency(start_date, end_date)
+        if not mismatches:
+            click.echo(f"Daily metrics are consistent from {start_date} to {end_date}")
+            return
+
+        for mismatch in mismatches:
+            click.echo(
+                f"{mismatch['date'] or 'system'} doctor={mismatch['doctor_id']} "
+                f"{mismatch['field']}: stored={mismatch['stored']} expected={mismatch['expected']}"
+            )
+        click.echo(f"Found {len(mismatches)} mismatch(es)")
+
+        if repair:
+            AnalyticsService.refresh_daily_metrics(start_date, end_date)
+            MetricsMaintainer.rebuild_counters()
+            click.echo("Refreshed the rollup and counters")
+
+    @app.cli.command("clear-analytics-cache")
+    def clear_analytics_cache():
+        """Drop every cached report result."""
+        from app.services.analytics_cache import analytics_cache
+
+        stats = analytics_cache.stats()
+        analytics_cache.clear()
+        click.echo(f"Cleared {stats['entries']} cached report result(s)")
+
+    @app.cli.command("prune-report-jobs")
+    @click.option(
+        "--hours",
+        type=int,
+        default=None,
+        help="Delete finished jobs older than this (default REPORT_JOB_RETENTION_HOURS).",
+    )
+    def prune_report_jobs(hours):
+        """Delete finished background report jobs and their files."""
+        from app.services.job_service import JobService
+
+        expired = JobService.expire_stale_jobs()
+        pruned = JobService.prune_jobs(hours)
+        click.echo(f"Pruned {pruned} report job(s); marked {expired} stale job(s) as failed")
+
+    @app.cli.command("normalize-diagnoses")
+    @click.option(
+        "--all",
+        "recompute",
+        is_flag=True,
+        help="Recompute codes for every consultation, e.g. after changing synonyms.",
+    )
+    def normalize_diagnoses(recompute):
+        """Assign normalized diagnosis codes to existing consultations."""
+        from app.services.diagnosis_service import DiagnosisService
+
+        updated = DiagnosisService.backfill(recompute=recompute)
+        click.echo(f"Assigned diagnosis codes to {updated} consultation(s)")
+
+    @app.cli.command("rebuild-conversation-summaries")
+    def rebuild_conversation_summaries():
+        """Recompute every conversation summary from the messages."""
+        from app.services.conversation_service import ConversationService
+
+        rebuilt = ConversationService.rebuild()
+        click.echo(f"Rebuilt {rebuilt} conversation summary row(s)")
+
+    @app.cli.command("check-conversation-summaries")
+    @click.option("--repair", is_flag=True, help="Rebuild the summaries if drift is found.")
+    def check_conversation_summaries(repair):
+        """Compare the conversation summaries against a full recompute."""
+        from app.services.conversation_service import ConversationService
+
+        mismatches = ConversationService.check_consistency()
+        if not mismatches:
+            click.echo("Conversation summaries are consistent")
+            return
+
+        for mismatch in mismatches:
+            click.echo(
+                f"user={mismatch['user_id']} peer={mismatch['peer_id']} "
+                f"{mismatch['field']}: stored={mismatch['stored']} expected={mismatch['expected']}"
+            )
+        click.echo(f"Found {len(mismatches)} mismatch(es)")
+
+        if repair:
+            ConversationService.rebuild()
+            click.echo("Rebuilt the conversation summaries")
+
+    @app.cli.command("prune-message-events")
+    @click.option(
+        "--days",
+        type=int,
+        default=None,
+        help="Delete events older than this (default MESSAGE_EVENT_RETENTION_DAYS).",
+    )
+    def prune_message_events(days):
+        """Delete old message sync events."""
+        from app.services.message_sync import MessageSyncService
+
+        removed = MessageSyncService.prune(days)
+        click.echo(f"Pruned {removed} message event(s)")
+
+    @app.cli.command("db-index-audit")
+    @click.option("--verbose", is_flag=True, help="Print the plan of every query.")
+    @click.argument("names", nargs=-1)
+    def db_index_audit(verbose, names):
+        """Flag registered hot queries whose plan scans a whole table."""
+        from app.utils.index_audit import audit_queries
+
+        results = audit_queries(names)
+        flagged = [result for result in results if result["full_scans"]]
+        for result in results:
+            status = "FULL SCAN" if result["full_scans"] else "ok"
+            click.echo(f"{status:9}  {result['name']}")
+            for line in result["plan"] if verbose else result["full_scans"]:
+                click.echo(f"           {line}")
+
+        click.echo(f"Checked {len(results)} query shape(s); {len(flagged)} with full scans")
+        if flagged:
+            raise SystemExit(1)
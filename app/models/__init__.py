@@ -8,8 +8,12 @@ from .medical_record import (
     Prescription,
     Allergy,
     VitalSigns,
+    Diagnosis,
 )
-from .message import InternalMessage
+from .message import InternalMessage, ConversationSummary, MessageEvent
+from .daily_metric import DailyMetric, MetricCounter
+from .report_job import ReportJob
+from .trend_sketch import TrendSketch
 
 __all__ = [
     "User",
@@ -22,5 +26,12 @@ __all__ = [
     "Prescription",
     "Allergy",
     "VitalSigns",
+    "Diagnosis",
     "InternalMessage",
+    "ConversationSummary",
+    "MessageEvent",
+    "DailyMetric",
+    "MetricCounter",
+    "ReportJob",
+    "TrendSketch",
 ]
\ No newline at end of file
@@ -1,6 +1,7 @@
 from app import db
 from datetime import datetime, timedelta
 from enum import Enum
+from sqlalchemy.orm import validates
 import pytz
 
 
@@ -25,6 +26,16 @@ class AppointmentType(Enum):
 class Appointment(db.Model):
     __tablename__ = "appointments"
 
+    # Bookable hours of a doctor's day (9 AM to 5 PM)
+    WORKING_HOURS = (9, 17)
+
+    # Statuses that occupy a doctor's schedule
+    ACTIVE_STATUSES = (
+        AppointmentStatus.SCHEDULED,
+        AppointmentStatus.CONFIRMED,
+        AppointmentStatus.IN_PROGRESS,
+    )
+
     id = db.Column(db.Integer, primary_key=True)
 
     # Foreign keys
@@ -34,6 +45,8 @@ class Appointment(db.Model):
     # Appointment details
     appointment_date = db.Column(db.DateTime, nullable=False, index=True)
     duration_minutes = db.Column(db.Integer, default=30, nullable=False)
+    # appointment_date + duration_minutes, kept in sync by _sync_end_time
+    end_time = db.Column(db.DateTime, nullable=False)
     appointment_type = db.Column(
         db.Enum(AppointmentType), default=AppointmentType.CONSULTATION, nullable=False
     )
@@ -65,17 +78,37 @@ class Appointment(db.Model):
     # Notification tracking
     confirmation_sent = db.Column(db.Boolean, default=False, nullable=False)
 
+    __table_args__ = (
+        # Doctor schedules, conflict checks and per-doctor reports
+        db.Index(
+            "ix_appointments_doctor_date_status", "doctor_id", "appointment_date", "status"
+        ),
+        # A patient's appointment list
+        db.Index("ix_appointments_patient_date", "patient_id", "appointment_date"),
+        # Overlap checks: seek to the doctor's appointments ending after a
+        # slot starts and filter on start and status without a table lookup
+        db.Index(
+            "ix_appointments_doctor_end",
+            "doctor_id",
+            "end_time",
+            "appointment_date",
+            "status",
+        ),
+    )
+
     def __init__(self, **kwargs):
         super(Appointment, self).__init__(**kwargs)
         if self.appointment_date and self.duration_minutes is None:
             self.duration_minutes = 30
 
-    @property
-    def end_time(self):
-        """Calculate appointment end time based on duration."""
-        if self.appointment_date and self.duration_minutes:
-            return self.appointment_date + timedelta(minutes=self.duration_minutes)
-        return None
+    @validates("appointment_date", "duration_minutes")
+    def _sync_end_time(self, key, value):
+        """Recompute the stored end time whenever the start or duration changes."""
+        start = value if key == "appointment_date" else self.appointment_date
+        duration = value if key == "duration_minutes" else self.duration_minutes
+        if start is not None and duration is not None:
+            self.end_time = start + timedelta(minutes=duration)
+        return value
 
     @property
     def is_past(self):
@@ -146,89 +179,44 @@ class Appointment(db.Model):
 
     @staticmethod
     def get_available_slots(doctor_id, date, duration_minutes=30, exclude_appointment_id=None):
-        """Get available appointment slots for a doctor on a specific date."""
+        """Get available appointment slots for a doctor on a specific date.
+
+        For many doctors or days use ``SchedulingService.available_slots``.
+        """
         from app.models.user import User
+        from app.services.scheduling_service import SchedulingService
 
         doctor = User.query.get(doctor_id)
         if not doctor or doctor.role != "doctor":
             return []
 
-        # Define working hours (9 AM to 5 PM)
-        start_hour = 9
-        end_hour = 17
-
-        # Create datetime objects for the day
-        start_time = datetime.combine(
-            date, datetime.min.time().replace(hour=start_hour)
+        slots = SchedulingService.available_slots(
+            [doctor.id],
+            date,
+            date,
+            duration_minutes,
+            exclude_appointment_id=exclude_appointment_id,
         )
-        end_time = datetime.combine(date, datetime.min.time().replace(hour=end_hour))
-
-        # Get existing appointments for the doctor on this date
-        query = Appointment.query.filter(
-            Appointment.doctor_id == doctor_id,
-            Appointment.appointment_date >= start_time,
-            Appointment.appointment_date < end_time + timedelta(days=1),
-            Appointment.status.in_(
-                [
-                    AppointmentStatus.SCHEDULED,
-                    AppointmentStatus.CONFIRMED,
-                    AppointmentStatus.IN_PROGRESS,
-                ]
-            ),
-        )
-        
-        # Exclude current appointment if rescheduling
-        if exclude_appointment_id:
-            query = query.filter(Appointment.id != exclude_appointment_id)
-        
-        existing_appointments = query.all()
-
-        # Generate possible time slots
-        available_slots = []
-        current_time = start_time
-
-        while current_time + timedelta(minutes=duration_minutes) <= end_time:
-            slot_end = current_time + timedelta(minutes=duration_minutes)
-
-            # Check if this slot conflicts with existing appointments
-            is_available = True
-            for appointment in existing_appointments:
-                if (
-                    current_time < appointment.end_time
-                    and slot_end > appointment.appointment_date
-                ):
-                    is_available = False
-                    break
-
-            if is_available:
-                available_slots.append(current_time)
-
-            current_time += timedelta(minutes=duration_minutes)
-
-        return available_slots
+        return [slot["start"] for slot in slots]
 
     @staticmethod
     def has_conflict(
         doctor_id, appointment_date, duration_minutes, exclude_appointment_id=None
     ):
-        """Check if there's a scheduling conflict for a doctor."""
+        """Check if there's a scheduling conflict for a doctor.
+
+        Compares against the stored ``end_time`` so the check is portable
+        and seeks ``ix_appointments_doctor_end`` instead of computing every
+        appointment's end. To check many slots at once use
+        ``SchedulingService.check_slots``.
+        """
         end_time = appointment_date + timedelta(minutes=duration_minutes)
 
         query = Appointment.query.filter(
             Appointment.doctor_id == doctor_id,
-            Appointment.status.in_(
-                [
-                    AppointmentStatus.SCHEDULED,
-                    AppointmentStatus.CONFIRMED,
-                    AppointmentStatus.IN_PROGRESS,
-                ]
-            ),
+            Appointment.end_time > appointment_date,
             Appointment.appointment_date < end_time,
-            db.func.datetime(
-                Appointment.appointment_date,
-                "+" + db.cast(Appointment.duration_minutes, db.String) + " minutes",
-            )
-            > appointment_date,
+            Appointment.status.in_(Appointment.ACTIVE_STATUSES),
         )
 
         if exclude_appointment_id:
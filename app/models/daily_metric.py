@@ -0,0 +1,96 @@
+from app import db
+from datetime import datetime
+
+
+class DailyMetric(db.Model):
+    """Pre-aggregated reporting counts for one day and one doctor.
+
+    Rows with ``doctor_id`` set to NULL hold the facility-wide totals for the
+    day, including the number of new patient registrations, which are not
+    attributed to a doctor. A facility-wide row is written for every day
+    that has been rolled up, even when all counts are zero, so its presence
+    marks the day as covered by the rollup.
+    """
+
+    __tablename__ = "daily_metrics"
+
+    id = db.Column(db.Integer, primary_key=True)
+    metric_date = db.Column(db.Date, nullable=False, index=True)
+    doctor_id = db.Column(
+        db.Integer, db.ForeignKey("users.id"), nullable=True, index=True
+    )
+
+    # Appointment counts by status
+    total_appointments = db.Column(db.Integer, default=0, nullable=False)
+    scheduled_appointments = db.Column(db.Integer, default=0, nullable=False)
+    confirmed_appointments = db.Column(db.Integer, default=0, nullable=False)
+    in_progress_appointments = db.Column(db.Integer, default=0, nullable=False)
+    completed_appointments = db.Column(db.Integer, default=0, nullable=False)
+    cancelled_appointments = db.Column(db.Integer, default=0, nullable=False)
+    no_show_appointments = db.Column(db.Integer, default=0, nullable=False)
+
+    # Consultation and prescription counts
+    total_consultations = db.Column(db.Integer, default=0, nullable=False)
+    completed_consultations = db.Column(db.Integer, default=0, nullable=False)
+    total_prescriptions = db.Column(db.Integer, default=0, nullable=False)
+
+    # Patient counts
+    new_patients = db.Column(db.Integer, default=0, nullable=False)
+    unique_patients = db.Column(db.Integer, default=0, nullable=False)
+    unique_patients_seen = db.Column(db.Integer, default=0, nullable=False)
+
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint("metric_date", "doctor_id", name="uq_daily_metric_date_doctor"),
+    )
+
+    COUNT_FIELDS = (
+        "total_appointments",
+        "scheduled_appointments",
+        "confirmed_appointments",
+        "in_progress_appointments",
+        "completed_appointments",
+        "cancelled_appointments",
+        "no_show_appointments",
+        "total_consultations",
+        "completed_consultations",
+        "total_prescriptions",
+        "new_patients",
+        "unique_patients",
+        "unique_patients_seen",
+    )
+
+    def to_dict(self):
+        """Convert the rollup row to a dictionary of counts."""
+        data = {field: getattr(self, field) for field in self.COUNT_FIELDS}
+        data["date"] = self.metric_date.strftime("%Y-%m-%d")
+        data["doctor_id"] = self.doctor_id
+        return data
+
+    def __repr__(self):
+        return f"<DailyMetric {self.metric_date} doctor={self.doctor_id}>"
+
+
+class MetricCounter(db.Model):
+    """A named, system-wide running total such as the number of appointments."""
+
+    __tablename__ = "metric_counters"
+
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+
+    @staticmethod
+    def get_values(names):
+        """Return a dict of counter values, or None if any counter is missing."""
+        counters = MetricCounter.query.filter(MetricCounter.name.in_(names)).all()
+        values = {counter.name: counter.value for counter in counters}
+        if len(values) < len(names):
+            return None
+        return values
+
+    def __repr__(self):
+        return f"<MetricCounter {self.name}={self.value}>"
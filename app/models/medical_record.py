@@ -17,6 +17,25 @@ class PrescriptionStatus(Enum):
     EXPIRED = "expired"
 
 
+class Diagnosis(db.Model):
+    """A normalized diagnosis; its id is the interned ``diagnosis_code``.
+
+    Assessments that normalize to the same text (after case, whitespace
+    and synonym folding) share one row, identified by a hash of that text.
+    """
+
+    __tablename__ = "diagnoses"
+
+    id = db.Column(db.Integer, primary_key=True)
+    key_hash = db.Column(db.String(40), unique=True, nullable=False, index=True)
+    normalized_name = db.Column(db.Text, nullable=False)
+    display_name = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<Diagnosis {self.id}: {self.display_name[:40]}>"
+
+
 class Consultation(db.Model):
     __tablename__ = "consultations"
 
@@ -54,6 +73,9 @@ class Consultation(db.Model):
 
     # Assessment and plan
     assessment = db.Column(db.Text, nullable=True)
+    diagnosis_code = db.Column(
+        db.Integer, db.ForeignKey("diagnoses.id"), nullable=True, index=True
+    )
     differential_diagnosis = db.Column(db.Text, nullable=True)
     treatment_plan = db.Column(db.Text, nullable=True)
     follow_up_instructions = db.Column(db.Text, nullable=True)
@@ -76,6 +98,14 @@ class Consultation(db.Model):
         "User", foreign_keys=[doctor_id], backref="doctor_consultations"
     )
     appointment = db.relationship("Appointment", backref="consultation", uselist=False)
+    diagnosis = db.relationship("Diagnosis")
+
+    __table_args__ = (
+        # Draft counts, facility-wide or per doctor
+        db.Index("ix_consultations_status_doctor", "status", "doctor_id"),
+        # Per-doctor consultation lists and reports
+        db.Index("ix_consultations_doctor_date", "doctor_id", "consultation_date"),
+    )
 
     def complete_consultation(self):
         """Mark consultation as completed."""
@@ -140,6 +170,14 @@ class Prescription(db.Model):
     )
     consultation = db.relationship("Consultation", backref="prescriptions")
 
+    __table_args__ = (
+        # Recent prescriptions, facility-wide or per doctor
+        db.Index("ix_prescriptions_created_at", "created_at"),
+        db.Index("ix_prescriptions_doctor_created", "doctor_id", "created_at"),
+        # Per-doctor prescription reports
+        db.Index("ix_prescriptions_doctor_prescribed", "doctor_id", "prescribed_date"),
+    )
+
     @property
     def is_active(self):
         """Check if prescription is currently active."""
@@ -7,6 +7,7 @@ from sqlalchemy import (
     DateTime,
     Boolean,
     ForeignKey,
+    Index,
     Text,
 )
 from sqlalchemy.orm import relationship
@@ -42,6 +43,36 @@ class InternalMessage(db.Model):
     related_appointment = relationship("Appointment", backref="related_messages")
     related_patient = relationship("User", foreign_keys=[related_patient_id])
 
+    __table_args__ = (
+        # Unread counts
+        Index(
+            "ix_internal_messages_recipient_unread",
+            "recipient_id",
+            "is_read",
+            "is_deleted_by_recipient",
+        ),
+        # Inbox and sent folders, newest first
+        Index(
+            "ix_internal_messages_recipient_inbox",
+            "recipient_id",
+            "is_deleted_by_recipient",
+            "created_at",
+        ),
+        Index(
+            "ix_internal_messages_sender_sent",
+            "sender_id",
+            "is_deleted_by_sender",
+            "created_at",
+        ),
+        # Messages between two users, for conversations and summary refreshes
+        Index(
+            "ix_internal_messages_pair",
+            "sender_id",
+            "recipient_id",
+            "created_at",
+        ),
+    )
+
     def __repr__(self):
         return f"<Message {self.subject} from {self.sender.username} to {self.recipient.username}>"
 
@@ -69,4 +100,100 @@ class InternalMessage(db.Model):
             "related_patient_id": self.related_patient_id,
             "created_at": self.created_at.isoformat(),
             "read_at": self.read_at.isoformat() if self.read_at else None,
-        }
\ No newline at end of file
+        }
+
+
+class ConversationSummary(db.Model):
+    """One user's view of a conversation with another user.
+
+    Holds the latest message exchanged in either direction and the number
+    of messages from the peer the user has not read or deleted, so the
+    conversation list is a single indexed range read. Rows are kept current
+    by ``ConversationService`` whenever messages are written.
+    """
+
+    __tablename__ = "conversation_summaries"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    peer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    last_message_id = Column(
+        Integer, ForeignKey("internal_messages.id"), nullable=False
+    )
+    last_message_at = Column(DateTime)
+    unread_count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    last_message = relationship("InternalMessage")
+    peer = relationship("User", foreign_keys=[peer_id])
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            "user_id", "peer_id", name="uq_conversation_summaries_user_peer"
+        ),
+        # Conversation list, most recent first
+        Index(
+            "ix_conversation_summaries_user_recent",
+            "user_id",
+            "last_message_at",
+            "last_message_id",
+        ),
+    )
+
+    # Fields compared by the drift check
+    SUMMARY_FIELDS = ("last_message_id", "last_message_at", "unread_count")
+
+    def __repr__(self):
+        return f"<ConversationSummary user={self.user_id} peer={self.peer_id} unread={self.unread_count}>"
+
+
+class MessageEvent(db.Model):
+    """A change to a message as seen by one of its participants.
+
+    Rows are appended in the same transaction as the change, so a user's
+    events in ``id`` order are the log that incremental sync replays from
+    a client's last seen ``id``.
+    """
+
+    __tablename__ = "message_events"
+
+    CREATED = "created"
+    READ = "read"
+    DELETED = "deleted"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    message_id = Column(Integer, nullable=False)
+    kind = Column(String(20), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # A user's changes since a sync token
+        Index("ix_message_events_user_id", "user_id", "id"),
+        # Never reuse ids freed by pruning; tokens must only move forward
+        {"sqlite_autoincrement": True},
+    )
+
+    def __repr__(self):
+        return f"<MessageEvent {self.id} {self.kind} message={self.message_id} user={self.user_id}>"
+
+
+class MessageSyncState(db.Model):
+    """Single-row bookkeeping for incremental message sync.
+
+    ``pruned_through`` is the highest event id removed by pruning; tokens
+    older than it must reset. Every transaction that logs events updates
+    ``last_logged_at`` first and so holds the row's lock until it commits,
+    which hands out event ids in commit order.
+    """
+
+    __tablename__ = "message_sync_state"
+
+    ROW_ID = 1
+
+    id = Column(Integer, primary_key=True)
+    pruned_through = Column(Integer, default=0, nullable=False)
+    last_logged_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<MessageSyncState pruned_through={self.pruned_through}>"
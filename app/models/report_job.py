@@ -0,0 +1,77 @@
+from app import db
+from datetime import datetime
+from enum import Enum
+import json
+
+
+class JobStatus(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class ReportJob(db.Model):
+    """A report or export generated in the background.
+
+    ``job_key`` is a hash of the job type, its parameters and the scope of
+    the requesting user, so identical requests made while a job is still
+    pending or running are attached to that job instead of starting another.
+    """
+
+    __tablename__ = "report_jobs"
+
+    id = db.Column(db.String(32), primary_key=True)
+    job_key = db.Column(db.String(64), nullable=False, index=True)
+    job_type = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.Text, nullable=False)
+
+    requested_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+
+    status = db.Column(db.Enum(JobStatus), default=JobStatus.PENDING, nullable=False)
+    progress = db.Column(db.Integer, default=0, nullable=False)
+    message = db.Column(db.String(255), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    # Finished artifact
+    artifact_path = db.Column(db.String(500), nullable=True)
+    artifact_name = db.Column(db.String(255), nullable=True)
+    content_type = db.Column(db.String(100), nullable=True)
+
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    requester = db.relationship("User", backref="report_jobs")
+
+    @property
+    def parameters(self):
+        """The job parameters as a dict."""
+        return json.loads(self.params)
+
+    @property
+    def is_active(self):
+        return self.status in (JobStatus.PENDING, JobStatus.RUNNING)
+
+    def to_dict(self):
+        """Convert the job to a dictionary for status responses."""
+        return {
+            "id": self.id,
+            "job_type": self.job_type,
+            "params": self.parameters,
+            "status": self.status.value,
+            "progress": self.progress,
+            "message": self.message,
+            "error": self.error,
+            "artifact_name": self.artifact_name,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def __repr__(self):
+        return f"<ReportJob {self.id} {self.job_type} {self.status.value}>"
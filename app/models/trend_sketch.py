@@ -0,0 +1,37 @@
+from app import db
+from datetime import datetime
+import json
+
+
+class TrendSketch(db.Model):
+    """Top-K sketch of prescribed medications or diagnoses for one day.
+
+    ``kind`` is ``medication`` or ``diagnosis``. As in ``daily_metrics``,
+    rows with ``doctor_id`` set to NULL hold the facility-wide sketch for
+    the day, and their presence marks the day as covered.
+    """
+
+    __tablename__ = "trend_sketches"
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)
+    metric_date = db.Column(db.Date, nullable=False, index=True)
+    doctor_id = db.Column(
+        db.Integer, db.ForeignKey("users.id"), nullable=True, index=True
+    )
+    payload = db.Column(db.Text, nullable=False)
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            "kind", "metric_date", "doctor_id", name="uq_trend_sketch_kind_date_doctor"
+        ),
+    )
+
+    @property
+    def data(self):
+        """The serialized sketch as a dict."""
+        return json.loads(self.payload)
+
+    def __repr__(self):
+        return f"<TrendSketch {self.kind} {self.metric_date} doctor={self.doctor_id}>"
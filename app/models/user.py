@@ -39,6 +39,11 @@ class User(UserMixin, db.Model):
     emergency_contact = db.Column(db.String(100), nullable=True)
     emergency_phone = db.Column(db.String(20), nullable=True)
 
+    __table_args__ = (
+        # Doctor lists and patient counts filter on role and active
+        db.Index("ix_users_role_active", "role", "active"),
+    )
+
     # Relationship with password reset tokens
     password_reset_tokens = db.relationship(
         "PasswordResetToken",
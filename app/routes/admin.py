@@ -16,6 +16,7 @@ from app.models.login_attempt import LoginAttempt
 from app.models.email_verification import EmailVerification
 from app.models.contact import Contact
 from app.models.appointment import Appointment, AppointmentStatus
+from app.services.stats_snapshot import StatsSnapshotService
 from datetime import datetime, timedelta
 from sqlalchemy import desc, func
 from functools import wraps
@@ -55,35 +56,8 @@ def dashboard():
     user_timezone = get_user_timezone()
     current_time_local = get_current_time(user_timezone)
 
-    # Get statistics
-    total_users = User.query.count()
-    active_users = User.query.filter_by(active=True).count()
-    inactive_users = total_users - active_users
-
-    # Recent user registrations (last 30 days) - using timezone-aware calculation
-    thirty_days_ago_utc = datetime.utcnow() - timedelta(days=30)
-    recent_registrations = User.query.filter(
-        User.created_at >= thirty_days_ago_utc
-    ).count()
-
-    # Login attempts statistics (last 24 hours) - using timezone-aware calculation
-    twenty_four_hours_ago_utc = datetime.utcnow() - timedelta(hours=24)
-    recent_login_attempts = LoginAttempt.query.filter(
-        LoginAttempt.attempted_at >= twenty_four_hours_ago_utc
-    ).count()
-    failed_login_attempts = LoginAttempt.query.filter(
-        LoginAttempt.attempted_at >= twenty_four_hours_ago_utc,
-        LoginAttempt.success == False,
-    ).count()
-
-    # Email verification statistics
-    verified_emails = EmailVerification.query.filter_by(is_verified=True).count()
-    pending_verifications = EmailVerification.query.filter_by(is_verified=False).count()
-
-    # Contact form submissions (last 30 days)
-    recent_contacts = Contact.query.filter(
-        Contact.created_at >= thirty_days_ago_utc
-    ).count()
+    # Counts come from the shared stats snapshot, refreshed periodically
+    snapshot = StatsSnapshotService.get_snapshot()
 
     # Recent activities with timezone conversion
     recent_users = User.query.order_by(desc(User.created_at)).limit(5).all()
@@ -92,15 +66,15 @@ def dashboard():
     )
 
     stats = {
-        "total_users": total_users,
-        "active_users": active_users,
-        "inactive_users": inactive_users,
-        "recent_registrations": recent_registrations,
-        "recent_login_attempts": recent_login_attempts,
-        "failed_login_attempts": failed_login_attempts,
-        "verified_emails": verified_emails,
-        "pending_verifications": pending_verifications,
-        "recent_contacts": recent_contacts,
+        "total_users": snapshot["total_users"],
+        "active_users": snapshot["active_users"],
+        "inactive_users": snapshot["total_users"] - snapshot["active_users"],
+        "recent_registrations": snapshot["recent_registrations"],
+        "recent_login_attempts": snapshot["recent_login_attempts"],
+        "failed_login_attempts": snapshot["failed_login_attempts"],
+        "verified_emails": snapshot["verified_emails"],
+        "pending_verifications": snapshot["pending_verifications"],
+        "recent_contacts": snapshot["recent_contacts"],
     }
 
     return render_template(
@@ -294,28 +268,16 @@ def api_stats():
     """API endpoint for dashboard statistics with timezone awareness."""
     user_timezone = get_user_timezone()
 
-    # Login attempts over time (last 7 days) - using timezone-aware calculation
-    seven_days_ago_utc = datetime.utcnow() - timedelta(days=7)
+    # Login attempts over the last 7 days, from the shared stats snapshot
     daily_stats = []
-
-    for i in range(7):
-        day_utc = seven_days_ago_utc + timedelta(days=i)
-        day_start_utc = day_utc.replace(hour=0, minute=0, second=0, microsecond=0)
-        day_end_utc = day_start_utc + timedelta(days=1)
-
-        total_attempts = LoginAttempt.query.filter(
-            LoginAttempt.attempted_at >= day_start_utc,
-            LoginAttempt.attempted_at < day_end_utc,
-        ).count()
-
-        failed_attempts = LoginAttempt.query.filter(
-            LoginAttempt.attempted_at >= day_start_utc,
-            LoginAttempt.attempted_at < day_end_utc,
-            LoginAttempt.success == False,
-        ).count()
+    for day in StatsSnapshotService.get_snapshot()["login_days"]:
+        total_attempts = day["total_attempts"]
+        failed_attempts = day["failed_attempts"]
 
         # Convert day to user's timezone for display
-        day_local = localize_datetime(day_start_utc, user_timezone)
+        day_local = localize_datetime(
+            datetime.fromisoformat(day["day_start"]), user_timezone
+        )
 
         daily_stats.append(
             {
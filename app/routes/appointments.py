@@ -19,10 +19,14 @@ from app.utils.email_utils import (
     send_appointment_confirmation,
 )
 from app.utils.sidebar_utils import get_sidebar_stats
+from app.services.scheduling_service import SchedulingService
 import calendar
 
 appointments_bp = Blueprint("appointments", __name__, url_prefix="/appointments")
 
+# Longest range, in days, searched by the availability API
+MAX_AVAILABILITY_DAYS = 31
+
 
 @appointments_bp.route("/")
 @login_required
@@ -398,6 +402,84 @@ def get_available_slots():
         return jsonify({"error": "Internal server error"}), 500
 
 
+@appointments_bp.route("/api/availability")
+@login_required
+def get_availability():
+    """API endpoint to find the earliest free slots across several doctors.
+
+    Doctors are chosen with ``specialization`` or repeated ``doctor_id``
+    parameters (all active doctors by default) and searched over ``days``
+    days from ``date`` (today by default).
+    """
+    specialization = request.args.get("specialization")
+    doctor_ids = request.args.getlist("doctor_id", type=int)
+
+    try:
+        duration = int(request.args.get("duration", 30))
+        days = int(request.args.get("days", 14))
+        limit = int(request.args.get("limit", 20))
+        per_doctor = request.args.get("per_doctor")
+        per_doctor = int(per_doctor) if per_doctor is not None else None
+        current_time = get_current_time().replace(tzinfo=None)
+        date_str = request.args.get("date")
+        start_date = (
+            datetime.strptime(date_str, "%Y-%m-%d").date()
+            if date_str
+            else current_time.date()
+        )
+    except ValueError:
+        return jsonify({"error": "Invalid parameters"}), 400
+
+    if (
+        duration <= 0
+        or limit <= 0
+        or (per_doctor is not None and per_doctor <= 0)
+        or not 0 < days <= MAX_AVAILABILITY_DAYS
+    ):
+        return jsonify({"error": "Invalid parameters"}), 400
+
+    # Don't offer slots in the past
+    start_date = max(start_date, current_time.date())
+
+    try:
+        doctors = User.query.filter_by(role="doctor", active=True)
+        if specialization:
+            doctors = doctors.filter(
+                db.func.lower(User.specialization) == specialization.lower()
+            )
+        if doctor_ids:
+            doctors = doctors.filter(User.id.in_(doctor_ids))
+        doctors = {doctor.id: doctor for doctor in doctors}
+
+        slots = SchedulingService.available_slots(
+            doctors,
+            start_date,
+            start_date + timedelta(days=days - 1),
+            duration,
+            not_before=current_time,
+            limit=limit,
+            per_doctor=per_doctor,
+        )
+
+        return jsonify(
+            {
+                "slots": [
+                    {
+                        "doctor_id": slot["doctor_id"],
+                        "doctor_name": doctors[slot["doctor_id"]].display_name,
+                        "date": slot["start"].strftime("%Y-%m-%d"),
+                        "time": slot["start"].strftime("%H:%M"),
+                    }
+                    for slot in slots
+                ]
+            }
+        )
+
+    except Exception as e:
+        current_app.logger.error(f"Error searching availability: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
 @appointments_bp.route("/<int:appointment_id>/cancel", methods=["POST"])
 @login_required
 def cancel_appointment(appointment_id):
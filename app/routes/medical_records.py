@@ -9,9 +9,14 @@ from flask import (
     current_app,
 )
 from flask_login import login_required, current_user
-from datetime import datetime, date
+from datetime import datetime
 from app import db
-from app.utils.timezone_utils import get_user_timezone, localize_datetime, get_current_time
+from app.utils.timezone_utils import (
+    get_user_timezone,
+    localize_datetime,
+    get_current_time,
+    get_utc_date_bounds,
+)
 from app.models.medical_record import (
     Consultation,
     Prescription,
@@ -23,7 +28,7 @@ from app.models.medical_record import (
 from app.models.user import User
 from app.models.appointment import Appointment
 from app.utils.sidebar_utils import get_sidebar_stats
-from sqlalchemy import or_, and_, desc, func
+from sqlalchemy import or_, and_, desc
 from functools import wraps
 
 medical_records_bp = Blueprint(
@@ -94,8 +99,10 @@ def index():
     # Get statistics
     total_patients = User.query.filter_by(role="patient", active=True).count()
     total_consultations = Consultation.query.count()
+    today_start, today_end = get_utc_date_bounds(get_current_time().date())
     today_consultations = Consultation.query.filter(
-        func.date(Consultation.consultation_date) == date.today()
+        Consultation.consultation_date >= today_start,
+        Consultation.consultation_date < today_end,
     ).count()
 
     dashboard_stats = {
@@ -338,6 +345,23 @@ def search_records():
 
     results = {"consultations": [], "prescriptions": []}
 
+    # Half-open datetime bounds for the optional date filters
+    range_start = None
+    range_end = None
+    if date_from:
+        try:
+            date_from_obj = datetime.strptime(date_from, "%Y-%m-%d").date()
+            range_start, _ = get_utc_date_bounds(date_from_obj)
+        except ValueError:
+            pass
+
+    if date_to:
+        try:
+            date_to_obj = datetime.strptime(date_to, "%Y-%m-%d").date()
+            _, range_end = get_utc_date_bounds(date_to_obj)
+        except ValueError:
+            pass
+
     if query or patient_name or date_from or date_to:
         # Search consultations
         consultation_query = Consultation.query
@@ -362,23 +386,15 @@ def search_records():
                 )
             )
 
-        if date_from:
-            try:
-                date_from_obj = datetime.strptime(date_from, "%Y-%m-%d").date()
-                consultation_query = consultation_query.filter(
-                    Consultation.consultation_date >= date_from_obj
-                )
-            except ValueError:
-                pass
-
-        if date_to:
-            try:
-                date_to_obj = datetime.strptime(date_to, "%Y-%m-%d").date()
-                consultation_query = consultation_query.filter(
-                    Consultation.consultation_date <= date_to_obj
-                )
-            except ValueError:
-                pass
+        if range_start:
+            consultation_query = consultation_query.filter(
+                Consultation.consultation_date >= range_start
+            )
+
+        if range_end:
+            consultation_query = consultation_query.filter(
+                Consultation.consultation_date < range_end
+            )
 
         results["consultations"] = consultation_query.order_by(
             desc(Consultation.consultation_date)
@@ -407,6 +423,16 @@ def search_records():
                     )
                 )
 
+            if range_start:
+                prescription_query = prescription_query.filter(
+                    Prescription.prescribed_date >= range_start
+                )
+
+            if range_end:
+                prescription_query = prescription_query.filter(
+                    Prescription.prescribed_date < range_end
+                )
+
             results["prescriptions"] = prescription_query.order_by(
                 desc(Prescription.prescribed_date)
             ).limit(25).all()
@@ -16,8 +16,12 @@ from app import db, socketio
 from app.utils.timezone_utils import get_user_timezone, localize_datetime, get_current_time
 from app.models.user import User
 from app.models.message import InternalMessage
+from app.services.conversation_service import ConversationService
+from app.services.message_sync import MAX_SYNC_BATCH, MessageSyncService
+from app.services.unread_counters import UnreadCounterService
 from app.utils.sidebar_utils import get_sidebar_stats
-from sqlalchemy import and_, or_
+from app.utils.pagination import DEFAULT_PAGE_SIZE, keyset_page, parse_page_size
+from sqlalchemy import and_
 
 messages_bp = Blueprint("messages", __name__, url_prefix="/messages")
 
@@ -49,6 +53,41 @@ def format_message_for_api(message, user_timezone=None):
     return message_dict
 
 
+def _mailbox_pages(default_size=DEFAULT_PAGE_SIZE):
+    """Pages of the current user's received and sent messages, newest first.
+
+    Each folder is paged independently with ``received_before`` /
+    ``received_after`` and ``sent_before`` / ``sent_after`` cursors and a
+    shared ``limit``. Raises ValueError on malformed parameters.
+    """
+    limit = parse_page_size(request.args.get("limit"), default_size)
+    received_messages, received_paging = keyset_page(
+        [
+            InternalMessage.query.filter(
+                InternalMessage.recipient_id == current_user.id,
+                InternalMessage.is_deleted_by_recipient == False,
+            )
+        ],
+        InternalMessage,
+        before=request.args.get("received_before"),
+        after=request.args.get("received_after"),
+        limit=limit,
+    )
+    sent_messages, sent_paging = keyset_page(
+        [
+            InternalMessage.query.filter(
+                InternalMessage.sender_id == current_user.id,
+                InternalMessage.is_deleted_by_sender == False,
+            )
+        ],
+        InternalMessage,
+        before=request.args.get("sent_before"),
+        after=request.args.get("sent_after"),
+        limit=limit,
+    )
+    return received_messages, received_paging, sent_messages, sent_paging
+
+
 @messages_bp.route("/")
 @login_required
 def inbox():
@@ -64,43 +103,21 @@ def inbox():
     # Get sidebar statistics
     stats = get_sidebar_stats()
 
-    # Get received messages
-    received_messages = (
-        InternalMessage.query.filter(
-            and_(
-                InternalMessage.recipient_id == current_user.id,
-                InternalMessage.is_deleted_by_recipient == False,
-            )
-        )
-        .order_by(InternalMessage.created_at.desc())
-        .all()
-    )
-
-    # Get sent messages
-    sent_messages = (
-        InternalMessage.query.filter(
-            and_(
-                InternalMessage.sender_id == current_user.id,
-                InternalMessage.is_deleted_by_sender == False,
-            )
-        )
-        .order_by(InternalMessage.created_at.desc())
-        .all()
-    )
+    try:
+        received_messages, received_paging, sent_messages, sent_paging = _mailbox_pages()
+    except ValueError:
+        flash("Invalid page requested.", "error")
+        return redirect(url_for("messages.inbox"))
 
     # Count unread messages
-    unread_count = InternalMessage.query.filter(
-        and_(
-            InternalMessage.recipient_id == current_user.id,
-            InternalMessage.is_read == False,
-            InternalMessage.is_deleted_by_recipient == False,
-        )
-    ).count()
+    unread_count = UnreadCounterService.count(current_user.id)
 
     return render_template(
         "messages/inbox.html",
         received_messages=received_messages,
+        received_paging=received_paging,
         sent_messages=sent_messages,
+        sent_paging=sent_paging,
         unread_count=unread_count,
         stats=stats,
         user_timezone=user_timezone,
@@ -130,13 +147,7 @@ def api_unread_count():
     if current_user.role not in ["doctor", "staff"]:
         return jsonify({"count": 0})
 
-    count = InternalMessage.query.filter(
-        and_(
-            InternalMessage.recipient_id == current_user.id,
-            InternalMessage.is_read == False,
-            InternalMessage.is_deleted_by_recipient == False,
-        )
-    ).count()
+    count = UnreadCounterService.count(current_user.id)
 
     return jsonify({"count": count})
 
@@ -177,40 +188,13 @@ def api_latest_messages():
 
     user_timezone = get_user_timezone()
 
-    # Get received messages
-    received_messages = (
-        InternalMessage.query.filter(
-            and_(
-                InternalMessage.recipient_id == current_user.id,
-                InternalMessage.is_deleted_by_recipient == False,
-            )
-        )
-        .order_by(InternalMessage.created_at.desc())
-        .limit(20)  # Limit to recent messages for performance
-        .all()
-    )
-
-    # Get sent messages
-    sent_messages = (
-        InternalMessage.query.filter(
-            and_(
-                InternalMessage.sender_id == current_user.id,
-                InternalMessage.is_deleted_by_sender == False,
-            )
-        )
-        .order_by(InternalMessage.created_at.desc())
-        .limit(20)
-        .all()
-    )
+    try:
+        received_messages, received_paging, sent_messages, sent_paging = _mailbox_pages(20)
+    except ValueError:
+        return jsonify({"error": "Invalid pagination parameters"}), 400
 
     # Count unread messages
-    unread_count = InternalMessage.query.filter(
-        and_(
-            InternalMessage.recipient_id == current_user.id,
-            InternalMessage.is_read == False,
-            InternalMessage.is_deleted_by_recipient == False,
-        )
-    ).count()
+    unread_count = UnreadCounterService.count(current_user.id)
 
     current_time_local = get_current_time(user_timezone)
 
@@ -222,6 +206,8 @@ def api_latest_messages():
             "sent_messages": [
                 format_message_for_api(msg, user_timezone) for msg in sent_messages
             ],
+            "received_paging": received_paging,
+            "sent_paging": sent_paging,
             "unread_count": unread_count,
             "last_updated": current_time_local.isoformat(),
             "timezone": str(user_timezone),
@@ -229,89 +215,86 @@ def api_latest_messages():
     )
 
 
-@messages_bp.route("/api/conversations")
+@messages_bp.route("/api/sync")
 @login_required
-def api_conversations():
-    """Get all conversations for the current user."""
+def api_sync():
+    """Get message changes since a sync token.
+
+    Without a token, or when the token is too old, the response has
+    ``reset`` set and only a fresh token: reload the mailbox, then sync
+    from that token.
+    """
     if current_user.role not in ["doctor", "staff"]:
         return jsonify({"error": "Unauthorized"}), 403
 
     user_timezone = get_user_timezone()
+    token = request.args.get("token")
+    if not token:
+        return jsonify({"reset": True, "sync_token": MessageSyncService.current_token()})
 
-    # Get all unique conversation partners
-    conversations_query = (
-        db.session.query(
-            User.id,
-            User.first_name,
-            User.last_name,
-            User.role,
-            db.func.max(InternalMessage.created_at).label("last_message_time"),
-        )
-        .join(
-            InternalMessage,
-            or_(
-                and_(
-                    InternalMessage.sender_id == User.id,
-                    InternalMessage.recipient_id == current_user.id,
-                ),
-                and_(
-                    InternalMessage.recipient_id == User.id,
-                    InternalMessage.sender_id == current_user.id,
-                ),
-            ),
+    try:
+        limit = min(int(request.args.get("limit", MAX_SYNC_BATCH)), MAX_SYNC_BATCH)
+        if limit < 1:
+            raise ValueError("limit must be positive")
+        changes = MessageSyncService.changes(current_user.id, token, limit)
+    except ValueError:
+        return jsonify({"error": "Invalid sync token"}), 400
+
+    if changes["reset"]:
+        return jsonify(changes)
+
+    read = []
+    for message in changes["read"]:
+        message_dict = format_message_for_api(message, user_timezone)
+        read.append(
+            {
+                key: message_dict[key]
+                for key in ("id", "is_read", "read_at", "read_at_local")
+                if key in message_dict
+            }
         )
-        .filter(User.id != current_user.id)
-        .group_by(User.id, User.first_name, User.last_name, User.role)
-        .order_by(db.func.max(InternalMessage.created_at).desc())
-        .all()
+
+    return jsonify(
+        {
+            "reset": False,
+            "messages": [
+                format_message_for_api(message, user_timezone)
+                for message in changes["created"]
+            ],
+            "read": read,
+            "deleted": changes["deleted"],
+            "unread_count": UnreadCounterService.count(current_user.id),
+            "sync_token": changes["sync_token"],
+            "has_more": changes["has_more"],
+            "timezone": str(user_timezone),
+        }
     )
 
-    conversations = []
-    for conv in conversations_query:
-        # Get last message
-        last_message = (
-            InternalMessage.query.filter(
-                or_(
-                    and_(
-                        InternalMessage.sender_id == conv.id,
-                        InternalMessage.recipient_id == current_user.id,
-                    ),
-                    and_(
-                        InternalMessage.recipient_id == conv.id,
-                        InternalMessage.sender_id == current_user.id,
-                    ),
-                )
-            )
-            .order_by(InternalMessage.created_at.desc())
-            .first()
-        )
 
-        # Count unread messages from this user
-        unread_count = InternalMessage.query.filter(
-            and_(
-                InternalMessage.sender_id == conv.id,
-                InternalMessage.recipient_id == current_user.id,
-                InternalMessage.is_read == False,
-                InternalMessage.is_deleted_by_recipient == False,
-            )
-        ).count()
+@messages_bp.route("/api/conversations")
+@login_required
+def api_conversations():
+    """Get all conversations for the current user."""
+    if current_user.role not in ["doctor", "staff"]:
+        return jsonify({"error": "Unauthorized"}), 403
 
-        conversations.append(
-            {
-                "other_user": {
-                    "id": conv.id,
-                    "first_name": conv.first_name,
-                    "last_name": conv.last_name,
-                    "role": conv.role,
-                },
-                "last_message": (
-                    format_message_for_api(last_message, user_timezone)
-                    if last_message
-                    else None
-                ),
-                "unread_count": unread_count,
-            }
+    user_timezone = get_user_timezone()
+
+    conversations = [
+        {
+            "other_user": {
+                "id": other_user.id,
+                "first_name": other_user.first_name,
+                "last_name": other_user.last_name,
+                "role": other_user.role,
+            },
+            "last_message": format_message_for_api(last_message, user_timezone),
+            "unread_count": unread_count,
+        }
+        for other_user, last_message, unread_count in ConversationService.list_conversations(
+            current_user.id
         )
+    ]
 
     return jsonify({"conversations": conversations, "timezone": str(user_timezone)})
 
@@ -326,29 +309,33 @@ def api_conversation(user_id):
     user_timezone = get_user_timezone()
     other_user = User.query.get_or_404(user_id)
 
-    # Get all messages between current user and specified user
-    messages = (
-        InternalMessage.query.filter(
-            or_(
-                and_(
-                    InternalMessage.sender_id == current_user.id,
-                    InternalMessage.recipient_id == user_id,
-                ),
-                and_(
-                    InternalMessage.sender_id == user_id,
-                    InternalMessage.recipient_id == current_user.id,
-                ),
-            )
-        )
-        .filter(
-            and_(
-                InternalMessage.is_deleted_by_sender == False,
-                InternalMessage.is_deleted_by_recipient == False,
-            )
-        )
-        .order_by(InternalMessage.created_at.asc())
-        .all()
+    # One page of the messages between current user and specified user,
+    # read from each direction's index range and merged
+    visible = and_(
+        InternalMessage.is_deleted_by_sender == False,
+        InternalMessage.is_deleted_by_recipient == False,
     )
+    directions = {(current_user.id, user_id), (user_id, current_user.id)}
+    try:
+        messages, paging = keyset_page(
+            [
+                InternalMessage.query.filter(
+                    InternalMessage.sender_id == sender_id,
+                    InternalMessage.recipient_id == recipient_id,
+                    visible,
+                )
+                for sender_id, recipient_id in directions
+            ],
+            InternalMessage,
+            before=request.args.get("before"),
+            after=request.args.get("after"),
+            limit=parse_page_size(request.args.get("limit")),
+        )
+    except ValueError:
+        return jsonify({"error": "Invalid pagination parameters"}), 400
+
+    # Oldest first, as displayed
+    messages.reverse()
 
     formatted_messages = []
     for msg in messages:
@@ -365,6 +352,7 @@ def api_conversation(user_id):
                 "role": other_user.role,
             },
             "messages": formatted_messages,
+            "paging": paging,
             "timezone": str(user_timezone),
         }
     )
@@ -531,6 +519,8 @@ def on_connect():
     if current_user.is_authenticated and current_user.role in ["doctor", "staff"]:
         join_room(f"user_{current_user.id}")
         emit("connected", {"status": "Connected to messaging system"})
+        # Later changes are pushed to the room as they are committed
+        emit("unread_count_update", {"count": UnreadCounterService.count(current_user.id)})
 
 
 @socketio.on("disconnect")
@@ -584,14 +574,12 @@ def on_typing_stop(data):
 
 @socketio.on("request_unread_count")
 def on_request_unread_count():
-    """Send current unread message count to client."""
+    """Send current unread message count to client.
+
+    Counts are pushed on connect and whenever they change; this serves
+    clients that ask explicitly.
+    """
     if current_user.is_authenticated and current_user.role in ["doctor", "staff"]:
-        count = InternalMessage.query.filter(
-            and_(
-                InternalMessage.recipient_id == current_user.id,
-                InternalMessage.is_read == False,
-                InternalMessage.is_deleted_by_recipient == False,
-            )
-        ).count()
+        count = UnreadCounterService.count(current_user.id)
 
         emit("unread_count_update", {"count": count})
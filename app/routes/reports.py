@@ -7,23 +7,37 @@ from flask import (
     flash,
     jsonify,
     current_app,
-    make_response,
+    Response,
+    stream_with_context,
+    send_file,
 )
 from flask_login import login_required, current_user
 from datetime import datetime, date, timedelta
 from app import db
 from app.utils.timezone_utils import get_user_timezone, localize_datetime, get_current_time
 from app.models.user import User
+from app.models.report_job import JobStatus
 from app.services.analytics_service import AnalyticsService
-from app.utils.sidebar_utils import get_sidebar_stats
+from app.services.analytics_cache import analytics_cache
+from app.services.export_service import (
+    ExportService,
+    EXPORT_DATASETS,
+    EXPORT_FORMATS,
+    REPORT_TYPES,
+)
+from app.services.job_service import JobService
+from app.utils.sidebar_utils import get_sidebar_stats, sidebar_cache_stats
 from functools import wraps
 import json
 import io
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
+import os
+from app.utils.excel_export import iter_file_chunks
 
 reports_bp = Blueprint("reports", __name__, url_prefix="/reports")
 
+# Upper bound on the periods one comparison request may ask for
+MAX_COMPARISON_PERIODS = 12
+
 
 def admin_or_doctor_required(f):
     """Decorator to require admin, doctor, or staff access for reports."""
@@ -104,13 +118,14 @@ def dashboard():
             start_date, end_date, doctor_filter
         )
 
-        # Get today's summary
-        today_summary = AnalyticsService.generate_daily_summary()
-
-        # Get yesterday's summary for comparison
-        yesterday_summary = AnalyticsService.generate_daily_summary(
-            date.today() - timedelta(days=1)
+        # Get today's and yesterday's summaries in one comparison
+        day_comparison = AnalyticsService.compare_periods(
+            AnalyticsService.comparison_periods("day")[:2]
         )
+        today_summary, yesterday_summary = [
+            AnalyticsService._daily_summary_from_bucket(period)
+            for period in day_comparison["periods"]
+        ]
 
     except Exception as e:
         current_app.logger.error(f"Error generating analytics: {e}")
@@ -351,19 +366,17 @@ def api_chart_data(chart_type):
 
         if chart_type == "appointments_timeline":
             # Generate daily appointment counts
-            data = []
-            current_date = start_date
-
-            while current_date <= end_date:
-                daily_summary = AnalyticsService.generate_daily_summary(current_date)
-                data.append(
-                    {
-                        "date": current_date.strftime("%Y-%m-%d"),
-                        "appointments": daily_summary["total_appointments"],
-                        "completed": daily_summary["completed_appointments"],
-                    }
-                )
-                current_date += timedelta(days=1)
+            timeseries = AnalyticsService.generate_timeseries(
+                start_date, end_date, "day", doctor_id
+            )
+            data = [
+                {
+                    "date": bucket["start"],
+                    "appointments": bucket["total_appointments"],
+                    "completed": bucket["completed_appointments"],
+                }
+                for bucket in timeseries
+            ]
 
             return jsonify(data)
 
@@ -405,6 +418,224 @@ def api_chart_data(chart_type):
         return jsonify({"error": "Failed to generate chart data"}), 500
 
 
+@reports_bp.route("/api/compare")
+@admin_or_doctor_required
+def api_compare_periods():
+    """API endpoint comparing activity across several periods.
+
+    Either ``period=day|week|month`` (current vs previous vs a year
+    earlier, ending on ``date``) or explicit ``periods`` given as a comma
+    separated list of ``start:end`` ranges, the first being the current one.
+    """
+    doctor_id = (
+        request.args.get("doctor_id", type=int)
+        if current_user.role == "admin"
+        else current_user.id
+    )
+
+    try:
+        if request.args.get("periods"):
+            periods = []
+            for item in request.args["periods"].split(","):
+                start, _, end = item.partition(":")
+                periods.append(
+                    (
+                        datetime.strptime(start, "%Y-%m-%d").date(),
+                        datetime.strptime(end or start, "%Y-%m-%d").date(),
+                    )
+                )
+        else:
+            anchor = request.args.get("date")
+            periods = AnalyticsService.comparison_periods(
+                request.args.get("period", "week"),
+                datetime.strptime(anchor, "%Y-%m-%d").date() if anchor else None,
+            )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if len(periods) > MAX_COMPARISON_PERIODS:
+        return jsonify({"error": "Too many periods"}), 400
+
+    try:
+        return jsonify(AnalyticsService.compare_periods(periods, doctor_id))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error comparing periods: {e}")
+        return jsonify({"error": "Failed to compare periods"}), 500
+
+
+@reports_bp.route("/api/operational-metrics")
+@admin_or_doctor_required
+def api_operational_metrics():
+    """API endpoint for lead time, latency and utilization metrics."""
+    doctor_id = (
+        request.args.get("doctor_id", type=int)
+        if current_user.role == "admin"
+        else current_user.id
+    )
+
+    try:
+        end_date = request.args.get("end_date")
+        end_date = (
+            datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else date.today()
+        )
+        start_date = request.args.get("start_date")
+        start_date = (
+            datetime.strptime(start_date, "%Y-%m-%d").date()
+            if start_date
+            else end_date - timedelta(days=29)
+        )
+    except ValueError:
+        return jsonify({"error": "Invalid date format"}), 400
+
+    try:
+        metrics = AnalyticsService.generate_operational_metrics(
+            start_date, end_date, doctor_id
+        )
+    except Exception as e:
+        current_app.logger.error(f"Error generating operational metrics: {e}")
+        return jsonify({"error": "Failed to generate operational metrics"}), 500
+
+    return jsonify(
+        dict(
+            metrics,
+            start_date=start_date.strftime("%Y-%m-%d"),
+            end_date=end_date.strftime("%Y-%m-%d"),
+        )
+    )
+
+
+@reports_bp.route("/api/cache-stats")
+@admin_or_doctor_required
+def api_cache_stats():
+    """Hit/miss statistics for the report result cache (admin only)."""
+    if current_user.role != "admin":
+        return jsonify({"error": "Admin privileges required"}), 403
+
+    stats = analytics_cache.stats()
+    stats["sidebar"] = sidebar_cache_stats()
+    return jsonify(stats)
+
+
+def _job_response(job, created):
+    """202 response describing a queued (or shared) background job."""
+    data = job.to_dict()
+    data["deduplicated"] = not created
+    data["status_url"] = url_for("reports.job_status", job_id=job.id)
+    data["download_url"] = url_for("reports.job_download", job_id=job.id)
+    return jsonify(data), 202
+
+
+@reports_bp.route("/jobs/<job_id>")
+@admin_or_doctor_required
+def job_status(job_id):
+    """Status and progress of a background report job."""
+    job = JobService.get_job(job_id, current_user)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    data = job.to_dict()
+    if job.status == JobStatus.COMPLETED:
+        data["download_url"] = url_for("reports.job_download", job_id=job.id)
+    return jsonify(data)
+
+
+@reports_bp.route("/jobs/<job_id>/download")
+@admin_or_doctor_required
+def job_download(job_id):
+    """Download the artifact of a completed background report job."""
+    job = JobService.get_job(job_id, current_user)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    if job.status != JobStatus.COMPLETED:
+        return jsonify({"error": "Job has not completed", "status": job.status.value}), 409
+
+    if not job.artifact_path or not os.path.exists(job.artifact_path):
+        return jsonify({"error": "Job output has expired"}), 410
+
+    return send_file(
+        job.artifact_path,
+        mimetype=job.content_type,
+        as_attachment=True,
+        download_name=job.artifact_name,
+    )
+
+
+@reports_bp.route("/export/raw/<dataset>")
+@admin_or_doctor_required
+def export_raw(dataset):
+    """Stream a row-level extract of appointments, consultations or prescriptions.
+
+    Rows are ordered by id. To resume an interrupted download, request it
+    again with ``cursor`` set to the id of the last complete row received.
+    """
+    if dataset not in EXPORT_DATASETS:
+        return jsonify({"error": f"Unknown dataset: {dataset}"}), 404
+
+    format_type = request.args.get("format", "csv")
+    if format_type not in EXPORT_FORMATS:
+        return jsonify({"error": "Format must be csv or ndjson"}), 400
+
+    try:
+        start_date = end_date = None
+        if request.args.get("start_date"):
+            start_date = datetime.strptime(request.args["start_date"], "%Y-%m-%d").date()
+        if request.args.get("end_date"):
+            end_date = datetime.strptime(request.args["end_date"], "%Y-%m-%d").date()
+        after_id = request.args.get("cursor", type=int)
+    except ValueError:
+        return jsonify({"error": "Dates must be YYYY-MM-DD"}), 400
+
+    if start_date and not end_date:
+        end_date = date.today()
+    if end_date and not start_date:
+        start_date = end_date - timedelta(days=30)
+
+    doctor_id = (
+        request.args.get("doctor_id", type=int)
+        if current_user.role == "admin"
+        else current_user.id
+    )
+    filters = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "doctor_id": doctor_id,
+        "after_id": after_id,
+    }
+
+    if request.args.get("async"):
+        job, created = JobService.submit(
+            "raw_export",
+            {
+                "dataset": dataset,
+                "format": format_type,
+                "start_date": start_date.isoformat() if start_date else None,
+                "end_date": end_date.isoformat() if end_date else None,
+                "doctor_id": doctor_id,
+                "after_id": after_id,
+                "timezone": get_user_timezone().zone,
+            },
+            current_user,
+        )
+        return _job_response(job, created)
+
+    if format_type == "csv":
+        chunks = ExportService.stream_csv(
+            dataset, include_header=after_id is None, **filters
+        )
+    else:
+        chunks = ExportService.stream_ndjson(dataset, **filters)
+
+    response = Response(stream_with_context(chunks), mimetype=EXPORT_FORMATS[format_type])
+    response.headers["Content-Disposition"] = (
+        f"attachment; filename={dataset}_export.{format_type}"
+    )
+    response.headers["X-Export-Cursor-Field"] = "id"
+    return response
+
+
 @reports_bp.route("/export/<report_type>")
 @admin_or_doctor_required
 def export_report(report_type):
@@ -436,215 +667,38 @@ def export_report(report_type):
             flash("Only Excel export format is supported.", "error")
             return redirect(url_for("reports.dashboard"))
 
-        # Create Excel workbook
-        wb = Workbook()
+        if report_type not in REPORT_TYPES:
+            flash(f"Unknown report type: {report_type}", "error")
+            return redirect(url_for("reports.dashboard"))
 
-        if report_type == "appointments":
-            # Create appointments-focused report
-            ws1 = wb.active
-            ws1.title = "Appointment Metrics"
-            
-            # Add appointment metrics
-            appointment_metrics = AnalyticsService.generate_appointment_metrics(
-                start_date, end_date, doctor_id
-            )
-            
-            # Headers with styling for metrics
-            headers = ["Metric", "Value"]
-            for col, header in enumerate(headers, 1):
-                cell = ws1.cell(row=1, column=col, value=header)
-                cell.font = Font(bold=True, color="FFFFFF")
-                cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-                cell.alignment = Alignment(horizontal="center")
-            
-            # Add appointment metrics data
-            metrics_data = [
-                ("Total Appointments", appointment_metrics.get('total_appointments', 0)),
-                ("Completed Appointments", appointment_metrics.get('completed_appointments', 0)),
-                ("Scheduled Appointments", appointment_metrics.get('scheduled_appointments', 0)),
-                ("Confirmed Appointments", appointment_metrics.get('confirmed_appointments', 0)),
-                ("Cancelled Appointments", appointment_metrics.get('cancelled_appointments', 0)),
-                ("Completion Rate (%)", appointment_metrics.get('completion_rate', 0)),
-                ("Cancellation Rate (%)", appointment_metrics.get('cancellation_rate', 0)),
-                ("Unique Patients", appointment_metrics.get('unique_patients', 0)),
-            ]
-            
-            for row, (metric, value) in enumerate(metrics_data, 2):
-                ws1.cell(row=row, column=1, value=metric)
-                ws1.cell(row=row, column=2, value=value)
-
-            # Create daily breakdown sheet
-            ws2 = wb.create_sheet("Daily Breakdown")
-            headers = ["Date", "Total Appointments", "Completed", "Cancelled", "Completion Rate (%)"]
-            for col, header in enumerate(headers, 1):
-                cell = ws2.cell(row=1, column=col, value=header)
-                cell.font = Font(bold=True, color="FFFFFF")
-                cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-                cell.alignment = Alignment(horizontal="center")
-            
-            # Generate daily data
-            current_date = start_date
-            row = 2
-            while current_date <= end_date:
-                daily_summary = AnalyticsService.generate_daily_summary(current_date)
-                ws2.cell(row=row, column=1, value=current_date.strftime("%Y-%m-%d"))
-                ws2.cell(row=row, column=2, value=daily_summary.get("total_appointments", 0))
-                ws2.cell(row=row, column=3, value=daily_summary.get("completed_appointments", 0))
-                ws2.cell(row=row, column=4, value=daily_summary.get("cancelled_appointments", 0))
-                completion_rate = 0
-                if daily_summary.get("total_appointments", 0) > 0:
-                    completion_rate = round((daily_summary.get("completed_appointments", 0) / daily_summary.get("total_appointments", 0)) * 100, 2)
-                ws2.cell(row=row, column=5, value=completion_rate)
-                current_date += timedelta(days=1)
-                row += 1
-
-        elif report_type == "prescriptions":
-            # Create prescriptions-focused report
-            ws1 = wb.active
-            ws1.title = "Prescription Trends"
-            
-            prescription_trends = AnalyticsService.generate_prescription_trends(
-                start_date, end_date, doctor_id, limit=100
-            )
-            
-            # Headers for prescriptions
-            headers = ["Medication", "Total Prescriptions", "Unique Patients", "Average per Patient"]
-            for col, header in enumerate(headers, 1):
-                cell = ws1.cell(row=1, column=col, value=header)
-                cell.font = Font(bold=True, color="FFFFFF")
-                cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-                cell.alignment = Alignment(horizontal="center")
-            
-            # Add prescription data
-            for row, med in enumerate(prescription_trends, 2):
-                ws1.cell(row=row, column=1, value=med.get('medication', ''))
-                ws1.cell(row=row, column=2, value=med.get('total_prescriptions', 0))
-                ws1.cell(row=row, column=3, value=med.get('unique_patients', 0))
-                avg_per_patient = 0
-                if med.get('unique_patients', 0) > 0:
-                    avg_per_patient = round(med.get('total_prescriptions', 0) / med.get('unique_patients', 0), 2)
-                ws1.cell(row=row, column=4, value=avg_per_patient)
-
-        elif report_type == "performance":
-            # Create performance-focused report
-            ws1 = wb.active
-            ws1.title = "Doctor Performance"
-            
-            doctor_performance = AnalyticsService.generate_doctor_performance(
-                start_date, end_date, doctor_id
-            )
-            
-            # Headers for doctor performance
-            headers = ["Doctor Name", "Total Appointments", "Completed", "Cancelled", "Completion Rate (%)", "Cancellation Rate (%)", "Unique Patients"]
-            for col, header in enumerate(headers, 1):
-                cell = ws1.cell(row=1, column=col, value=header)
-                cell.font = Font(bold=True, color="FFFFFF")
-                cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-                cell.alignment = Alignment(horizontal="center")
-            
-            # Add doctor performance data
-            for row, doc in enumerate(doctor_performance, 2):
-                ws1.cell(row=row, column=1, value=doc.get('doctor_name', ''))
-                ws1.cell(row=row, column=2, value=doc.get('total_appointments', 0))
-                ws1.cell(row=row, column=3, value=doc.get('completed_appointments', 0))
-                ws1.cell(row=row, column=4, value=doc.get('cancelled_appointments', 0))
-                ws1.cell(row=row, column=5, value=doc.get('completion_rate', 0))
-                ws1.cell(row=row, column=6, value=doc.get('cancellation_rate', 0))
-                ws1.cell(row=row, column=7, value=doc.get('unique_patients', 0))
-
-        elif report_type == "comprehensive":
-            # Create comprehensive report with multiple sheets
-            # Appointments Summary
-            ws1 = wb.active
-            ws1.title = "Appointments Summary"
-            
-            appointment_metrics = AnalyticsService.generate_appointment_metrics(
-                start_date, end_date, doctor_id
-            )
-            
-            headers = ["Metric", "Value"]
-            for col, header in enumerate(headers, 1):
-                cell = ws1.cell(row=1, column=col, value=header)
-                cell.font = Font(bold=True, color="FFFFFF")
-                cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-                cell.alignment = Alignment(horizontal="center")
-            
-            metrics_data = [
-                ("Total Appointments", appointment_metrics.get('total_appointments', 0)),
-                ("Completed Appointments", appointment_metrics.get('completed_appointments', 0)),
-                ("Cancelled Appointments", appointment_metrics.get('cancelled_appointments', 0)),
-                ("Completion Rate (%)", appointment_metrics.get('completion_rate', 0)),
-                ("Cancellation Rate (%)", appointment_metrics.get('cancellation_rate', 0)),
-                ("Unique Patients", appointment_metrics.get('unique_patients', 0)),
-            ]
-            
-            for row, (metric, value) in enumerate(metrics_data, 2):
-                ws1.cell(row=row, column=1, value=metric)
-                ws1.cell(row=row, column=2, value=value)
-            
-            # Prescriptions Sheet
-            ws2 = wb.create_sheet("Top Prescriptions")
-            prescription_trends = AnalyticsService.generate_prescription_trends(
-                start_date, end_date, doctor_id, limit=50
-            )
-            
-            headers = ["Medication", "Total Prescriptions", "Unique Patients"]
-            for col, header in enumerate(headers, 1):
-                cell = ws2.cell(row=1, column=col, value=header)
-                cell.font = Font(bold=True, color="FFFFFF")
-                cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-                cell.alignment = Alignment(horizontal="center")
-            
-            for row, med in enumerate(prescription_trends, 2):
-                ws2.cell(row=row, column=1, value=med.get('medication', ''))
-                ws2.cell(row=row, column=2, value=med.get('total_prescriptions', 0))
-                ws2.cell(row=row, column=3, value=med.get('unique_patients', 0))
-            
-            # Doctor Performance Sheet
-            ws3 = wb.create_sheet("Doctor Performance")
-            doctor_performance = AnalyticsService.generate_doctor_performance(
-                start_date, end_date, doctor_id
+        # Large reports can be generated in the background instead
+        if request.args.get("async"):
+            job, created = JobService.submit(
+                "report",
+                {
+                    "report_type": report_type,
+                    "start_date": start_date.isoformat(),
+                    "end_date": end_date.isoformat(),
+                    "doctor_id": int(doctor_id) if doctor_id else None,
+                    "timezone": get_user_timezone().zone,
+                },
+                current_user,
             )
-            
-            headers = ["Doctor Name", "Total Appointments", "Completed", "Completion Rate (%)", "Unique Patients"]
-            for col, header in enumerate(headers, 1):
-                cell = ws3.cell(row=1, column=col, value=header)
-                cell.font = Font(bold=True, color="FFFFFF")
-                cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-                cell.alignment = Alignment(horizontal="center")
-            
-            for row, doc in enumerate(doctor_performance, 2):
-                ws3.cell(row=row, column=1, value=doc.get('doctor_name', ''))
-                ws3.cell(row=row, column=2, value=doc.get('total_appointments', 0))
-                ws3.cell(row=row, column=3, value=doc.get('completed_appointments', 0))
-                ws3.cell(row=row, column=4, value=doc.get('completion_rate', 0))
-                ws3.cell(row=row, column=5, value=doc.get('unique_patients', 0))
+            return _job_response(job, created)
 
-        else:
-            flash(f"Unknown report type: {report_type}", "error")
-            return redirect(url_for("reports.dashboard"))
-        
-        # Auto-adjust column widths for all sheets
-        for ws in wb.worksheets:
-            for column in ws.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Save to BytesIO
-        output = io.BytesIO()
-        wb.save(output)
+        # Sheets are streamed row by row in write-only mode
+        workbook = ExportService.build_report_workbook(
+            report_type, start_date, end_date, doctor_id
+        )
+
+        # Save to a spooled temp file and send it in chunks
+        output = workbook.save()
+        size = output.seek(0, io.SEEK_END)
         output.seek(0)
-        
-        response = make_response(output.getvalue())
+
+        response = Response(iter_file_chunks(output), direct_passthrough=True)
         response.headers["Content-Type"] = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        response.headers["Content-Length"] = str(size)
         response.headers["Content-Disposition"] = (
             f"attachment; filename={report_type}_report_{start_date}_{end_date}.xlsx"
         )
@@ -0,0 +1,524 @@
+import inspect as pyinspect
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from functools import wraps
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from app import db
+from app.models.appointment import Appointment
+from app.models.medical_record import Consultation, Prescription
+from app.models.user import User
+from app.utils.timezone_utils import (
+    get_local_date_bounds,
+    get_user_timezone,
+    get_utc_date_bounds,
+)
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Date column each model's rows are reported under, by dependency tag
+MODEL_TAGS = {
+    Appointment: ("appointments", "appointment_date"),
+    Consultation: ("consultations", "consultation_date"),
+    Prescription: ("prescriptions", "prescribed_date"),
+}
+
+# User columns that show up in reports; other changes (e.g. last_login) do not
+REPORTED_USER_ATTRIBUTES = (
+    "role",
+    "active",
+    "created_at",
+    "first_name",
+    "last_name",
+    "specialization",
+)
+
+
+def _timestamp(value):
+    """Seconds since the epoch for a naive UTC datetime."""
+    return (value - _EPOCH).total_seconds()
+
+
+def _range_bounds(start_date, end_date):
+    """UTC datetimes covering the rows an inclusive date range reports on.
+
+    Invalidation moments are UTC timestamps, except appointment times,
+    which are local wall time; the range covers both readings.
+    """
+    utc_start, utc_end = get_utc_date_bounds(start_date, end_date)
+    local_start, local_end = get_local_date_bounds(start_date, end_date)
+    return min(utc_start, local_start), max(utc_end, local_end)
+
+
+def _previous_value(obj, attribute):
+    """An attribute's value before the pending flush."""
+    history = inspect(obj).attrs[attribute].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, attribute)
+
+
+class LRUCacheBackend:
+    """In-process cache holding at most ``max_entries`` results.
+
+    Only suitable for a single worker process: invalidations in one process
+    are not seen by the others.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry["expires_at"] is not None and entry["expires_at"] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry["value"]
+
+    def set(self, key, method, value, ttl, tags, range_start, range_end):
+        with self._lock:
+            self._entries[key] = {
+                "method": method,
+                "value": value,
+                "expires_at": time.time() + ttl if ttl is not None else None,
+                "tags": set(tags),
+                "range_start": range_start,
+                "range_end": range_end,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tag, moment=None):
+        with self._lock:
+            stale = [
+                key
+                for key, entry in self._entries.items()
+                if tag in entry["tags"]
+                and (
+                    moment is None
+                    or entry["range_start"] is None
+                    or entry["range_start"] <= moment < entry["range_end"]
+                )
+            ]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def invalidate_range(self, range_start, range_end):
+        with self._lock:
+            stale = [
+                key
+                for key, entry in self._entries.items()
+                if entry["range_start"] is None
+                or (entry["range_start"] < range_end and range_start < entry["range_end"])
+            ]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._stats.clear()
+
+    def record(self, method, hit):
+        with self._lock:
+            counts = self._stats.setdefault(method, {"hits": 0, "misses": 0})
+            counts["hits" if hit else "misses"] += 1
+
+    def stats(self):
+        with self._lock:
+            return len(self._entries), {
+                method: dict(counts) for method, counts in self._stats.items()
+            }
+
+
+class SQLiteCacheBackend:
+    """Cache stored in a local SQLite file shared by every worker process.
+
+    Entries, invalidations and hit/miss statistics are visible to all
+    gunicorn workers on the host. When the file grows past ``max_entries``
+    the oldest entries are evicted first.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path, max_entries=5000):
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    method TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    expires_at REAL,
+                    tags TEXT NOT NULL,
+                    range_start REAL,
+                    range_end REAL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_stats (
+                    method TEXT PRIMARY KEY,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    misses INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection and commit when the block succeeds."""
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return row[0]
+
+    def set(self, key, method, value, ttl, tags, range_start, range_end):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries "
+                "(key, method, value, expires_at, tags, range_start, range_end, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    method,
+                    value,
+                    now + ttl if ttl is not None else None,
+                    "," + ",".join(sorted(tags)) + ",",
+                    range_start,
+                    range_end,
+                    now,
+                ),
+            )
+            conn.execute(
+                "DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (now,),
+            )
+            conn.execute(
+                "DELETE FROM cache_entries WHERE key IN ("
+                "SELECT key FROM cache_entries ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def invalidate(self, tag, moment=None):
+        query = "DELETE FROM cache_entries WHERE tags LIKE ?"
+        params = [f"%,{tag},%"]
+        if moment is not None:
+            query += " AND (range_start IS NULL OR (range_start <= ? AND ? < range_end))"
+            params.extend([moment, moment])
+        with self._connect() as conn:
+            return conn.execute(query, params).rowcount
+
+    def invalidate_range(self, range_start, range_end):
+        with self._connect() as conn:
+            return conn.execute(
+                "DELETE FROM cache_entries WHERE range_start IS NULL "
+                "OR (range_start < ? AND ? < range_end)",
+                (range_end, range_start),
+            ).rowcount
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache_entries")
+            conn.execute("DELETE FROM cache_stats")
+
+    def record(self, method, hit):
+        column = "hits" if hit else "misses"
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT INTO cache_stats (method, {column}) VALUES (?, 1) "
+                f"ON CONFLICT(method) DO UPDATE SET {column} = {column} + 1",
+                (method,),
+            )
+
+    def stats(self):
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+            rows = conn.execute("SELECT method, hits, misses FROM cache_stats").fetchall()
+        return entries, {
+            method: {"hits": hits, "misses": misses} for method, hits, misses in rows
+        }
+
+
+class AnalyticsCache:
+    """Result cache for ``AnalyticsService`` with per-method TTLs.
+
+    Results are keyed by method, arguments and the user's timezone and
+    tagged with the tables they were computed from and the UTC time range
+    they cover. Committed writes to those tables invalidate the entries
+    whose range contains the changed rows, so ranges that have already
+    closed are kept for the longer ``ANALYTICS_CACHE_CLOSED_TTL``. That
+    TTL still bounds them: bulk and raw SQL writes, and writes committed
+    by another process with the memory backend, invalidate nothing.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend_name = app.config.get("ANALYTICS_CACHE_BACKEND", "memory")
+        max_entries = app.config.get("ANALYTICS_CACHE_MAX_ENTRIES", 512)
+
+        if app.config.get("DISABLE_DATABASE", False) or backend_name == "none":
+            backend = None
+        elif backend_name == "sqlite":
+            backend = SQLiteCacheBackend(
+                app.config.get("ANALYTICS_CACHE_PATH")
+                or os.path.join(app.instance_path, "analytics_cache.db"),
+                max_entries=max_entries,
+            )
+        elif backend_name == "memory":
+            backend = LRUCacheBackend(max_entries=max_entries)
+        else:
+            raise ValueError(f"Unknown analytics cache backend: {backend_name}")
+
+        app.extensions["analytics_cache"] = backend
+
+        if backend is not None and not event.contains(
+            db.session, "after_flush", AnalyticsCache._after_flush
+        ):
+            event.listen(db.session, "after_flush", AnalyticsCache._after_flush)
+            event.listen(db.session, "after_commit", AnalyticsCache._after_commit)
+            event.listen(db.session, "after_rollback", AnalyticsCache._after_rollback)
+
+    @staticmethod
+    def _backend():
+        if not has_app_context():
+            return None
+        return current_app.extensions.get("analytics_cache")
+
+    def fetch(self, method, key, compute, ttl, tags, start_date=None, end_date=None):
+        """Return a cached result, or compute, store and return it.
+
+        Without a date range the entry is only invalidated by its tags as a
+        whole (and by any ``invalidate_dates``), never by a moment.
+        """
+        backend = self._backend()
+        if backend is None:
+            return compute()
+
+        ttl = current_app.config.get("ANALYTICS_CACHE_TTLS", {}).get(method, ttl)
+        if start_date is None and end_date is None:
+            range_start = range_end = None
+        else:
+            range_start, range_end = _range_bounds(start_date, end_date)
+        try:
+            cached = backend.get(key)
+            backend.record(method, cached is not None)
+        except sqlite3.Error as e:
+            current_app.logger.warning(f"Analytics cache read failed: {e}")
+            return compute()
+
+        if cached is not None:
+            return pickle.loads(cached)
+
+        result = compute()
+
+        # Ranges that ended before now mostly change through writes, which
+        # invalidate them, so they are kept longer
+        if range_end is not None and range_end <= datetime.utcnow():
+            ttl = max(ttl, current_app.config.get("ANALYTICS_CACHE_CLOSED_TTL", 3600))
+        try:
+            backend.set(
+                key,
+                method,
+                pickle.dumps(result),
+                ttl,
+                tags,
+                _timestamp(range_start) if range_start is not None else None,
+                _timestamp(range_end) if range_end is not None else None,
+            )
+        except sqlite3.Error as e:
+            current_app.logger.warning(f"Analytics cache write failed: {e}")
+        return result
+
+    def invalidate(self, tag, moment=None):
+        """Drop entries for ``tag`` whose range contains ``moment`` (or all)."""
+        backend = self._backend()
+        if backend is None:
+            return 0
+        return backend.invalidate(
+            tag, _timestamp(moment) if moment is not None else None
+        )
+
+    def invalidate_dates(self, start_date, end_date):
+        """Drop entries of any tag whose range overlaps an inclusive date range."""
+        backend = self._backend()
+        if backend is None:
+            return 0
+        range_start, range_end = _range_bounds(start_date, end_date)
+        return backend.invalidate_range(_timestamp(range_start), _timestamp(range_end))
+
+    def clear(self):
+        """Drop every entry and reset the statistics."""
+        backend = self._backend()
+        if backend is not None:
+            backend.clear()
+
+    def stats(self):
+        """Hit/miss statistics, overall and per method."""
+        backend = self._backend()
+        if backend is None:
+            return {
+                "backend": None,
+                "entries": 0,
+                "hits": 0,
+                "misses": 0,
+                "hit_rate": 0,
+                "methods": {},
+            }
+
+        entries, methods = backend.stats()
+        hits = sum(counts["hits"] for counts in methods.values())
+        misses = sum(counts["misses"] for counts in methods.values())
+        return {
+            "backend": backend.name,
+            "entries": entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses) * 100, 2) if hits + misses else 0,
+            "methods": methods,
+        }
+
+    @staticmethod
+    def _touched(obj, previous):
+        """(tag, moment) pairs a row affects; a None moment means any range."""
+        if type(obj) in MODEL_TAGS:
+            tag, attribute = MODEL_TAGS[type(obj)]
+            when = _previous_value(obj, attribute) if previous else getattr(obj, attribute)
+            return [(tag, when)]
+
+        if isinstance(obj, User):
+            role = _previous_value(obj, "role") if previous else obj.role
+            if role == "doctor":
+                return [("doctors", None)]
+            if role == "patient":
+                when = _previous_value(obj, "created_at") if previous else obj.created_at
+                return [("patients", when)]
+        return []
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        """Collect what the flush changed; entries are dropped on commit."""
+        touched = session.info.setdefault("analytics_cache_touched", set())
+
+        for obj in session.new:
+            touched.update(AnalyticsCache._touched(obj, previous=False))
+
+        for obj in session.dirty:
+            if isinstance(obj, User):
+                state = inspect(obj)
+                if not any(
+                    state.attrs[attribute].history.has_changes()
+                    for attribute in REPORTED_USER_ATTRIBUTES
+                ):
+                    continue
+            touched.update(AnalyticsCache._touched(obj, previous=False))
+            touched.update(AnalyticsCache._touched(obj, previous=True))
+
+        for obj in session.deleted:
+            touched.update(AnalyticsCache._touched(obj, previous=True))
+
+    @staticmethod
+    def _after_commit(session):
+        touched = session.info.pop("analytics_cache_touched", None)
+        if not touched or AnalyticsCache._backend() is None:
+            return
+        for tag, moment in touched:
+            try:
+                analytics_cache.invalidate(tag, moment)
+            except sqlite3.Error as e:
+                current_app.logger.warning(f"Analytics cache invalidation failed: {e}")
+
+    @staticmethod
+    def _after_rollback(session):
+        session.info.pop("analytics_cache_touched", None)
+
+
+analytics_cache = AnalyticsCache()
+
+
+def init_analytics_cache(app):
+    """Initialize the analytics result cache with the Flask app."""
+    analytics_cache.init_app(app)
+
+
+def cached_result(ttl, tags, default_days=30):
+    """Cache an ``AnalyticsService`` method taking ``start_date``/``end_date``.
+
+    Missing dates default to the last ``default_days`` days, as the methods
+    themselves do, so that equivalent calls share one entry. ``ttl`` is in
+    seconds; ranges that have ended keep at least ``ANALYTICS_CACHE_CLOSED_TTL``.
+    """
+
+    def decorator(func):
+        signature = pyinspect.signature(func)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = bound.arguments
+            if not arguments.get("end_date"):
+                arguments["end_date"] = date.today()
+            if not arguments.get("start_date"):
+                arguments["start_date"] = date.today() - timedelta(days=default_days)
+
+            key = repr(
+                (
+                    func.__name__,
+                    get_user_timezone().zone,
+                    sorted(arguments.items()),
+                )
+            )
+            return analytics_cache.fetch(
+                func.__name__,
+                key,
+                lambda: func(**arguments),
+                ttl,
+                tags,
+                arguments["start_date"],
+                arguments["end_date"],
+            )
+
+        return wrapper
+
+    return decorator
@@ -1,5 +1,5 @@
-from datetime import datetime, date, timedelta
-from sqlalchemy import func, desc, and_, or_
+from datetime import datetime, date, time, timedelta
+from sqlalchemy import func, desc, and_, or_, case
 from app import db
 from app.models.appointment import Appointment, AppointmentStatus
 from app.models.medical_record import (
@@ -7,14 +7,314 @@ from app.models.medical_record import (
     Prescription,
     ConsultationStatus,
     PrescriptionStatus,
+    Diagnosis,
 )
 from app.models.user import User
+from app.models.daily_metric import DailyMetric
+from app.services.analytics_cache import analytics_cache, cached_result
+from app.services.stats_snapshot import StatsSnapshotService
+from app.services.trend_sketches import TrendSketchService
+from app.utils.sketches import TDigest
+from app.utils.timezone_utils import (
+    get_user_timezone,
+    get_utc_date_bounds,
+    get_local_date_bounds,
+    get_reporting_timezone,
+    localize_datetime,
+)
+from flask import current_app
 import json
 
 
+def _date_bounds(date_column, start_date, end_date=None, timezone=None):
+    """Half-open bounds selecting a column's rows on an inclusive date range.
+
+    ``Appointment.appointment_date`` holds the clinic-local wall time the
+    appointment was booked for, so its bounds are plain local midnights;
+    the other date columns default to ``utcnow`` and get the UTC bounds of
+    the local days in ``timezone``.
+    """
+    if date_column is Appointment.appointment_date:
+        return get_local_date_bounds(start_date, end_date)
+    return get_utc_date_bounds(start_date, end_date, timezone)
+
+
+def _date_range_filter(date_column, start_date, end_date, timezone=None):
+    """Build the filter clauses restricting a date column to a range.
+
+    The column is compared against half-open datetime bounds instead of
+    being wrapped in ``func.date`` so the database can use its index.
+    """
+    range_start, range_end = _date_bounds(date_column, start_date, end_date, timezone)
+    return [date_column >= range_start, date_column < range_end]
+
+
+def _aggregate_columns(model, statuses):
+    """Build the aggregate columns shared by the analytics count queries."""
+    columns = [
+        func.count(model.id).label("total"),
+        func.count(func.distinct(model.patient_id)).label("unique_patients"),
+    ]
+    for status in statuses:
+        columns.append(
+            func.coalesce(
+                func.sum(case((model.status == status, 1), else_=0)), 0
+            ).label(status.value)
+        )
+    return columns
+
+
+def _row_to_counts(row, statuses):
+    """Convert an aggregate result row into a counts dict."""
+    counts = {"total": row.total, "unique_patients": row.unique_patients}
+    for status in statuses:
+        counts[status] = int(getattr(row, status.value))
+    return counts
+
+
+def _empty_counts(statuses):
+    """Counts dict for a group that has no rows in the range."""
+    counts = {"total": 0, "unique_patients": 0}
+    for status in statuses:
+        counts[status] = 0
+    return counts
+
+
+def _aggregate(model, date_column, start_date, end_date, doctor_id=None, statuses=()):
+    """Count rows of a model in a date range with a single aggregate query.
+
+    Returns a dict holding the overall ``total``, the number of distinct
+    ``unique_patients`` and one count per requested status (keyed by the
+    status enum member), computed with conditional aggregates so no rows
+    are loaded into memory.
+    """
+    query = db.session.query(*_aggregate_columns(model, statuses)).filter(
+        *_date_range_filter(date_column, start_date, end_date)
+    )
+    if doctor_id:
+        query = query.filter(model.doctor_id == doctor_id)
+
+    return _row_to_counts(query.one(), statuses)
+
+
+def _aggregate_by_doctor(
+    model, date_column, start_date, end_date, doctor_ids=None, statuses=()
+):
+    """Like ``_aggregate`` but grouped by ``doctor_id`` in one query.
+
+    Returns a dict mapping each doctor id that has rows in the range to its
+    counts dict. Doctors without rows are omitted; use ``_empty_counts`` as
+    the default when merging.
+    """
+    query = db.session.query(
+        model.doctor_id, *_aggregate_columns(model, statuses)
+    ).filter(*_date_range_filter(date_column, start_date, end_date))
+    if doctor_ids is not None:
+        query = query.filter(model.doctor_id.in_(doctor_ids))
+
+    return {
+        row.doctor_id: _row_to_counts(row, statuses)
+        for row in query.group_by(model.doctor_id)
+    }
+
+
+def _bucket_bounds(start_date, end_date, bucket):
+    """Split an inclusive date range into consecutive (start, end) buckets.
+
+    Day buckets cover a single date, week buckets are 7-day windows anchored
+    at ``start_date`` and month buckets follow calendar months. The first and
+    last buckets are clipped to the requested range.
+    """
+    if bucket not in ("day", "week", "month"):
+        raise ValueError(f"Unknown bucket size: {bucket}")
+
+    bounds = []
+    current = start_date
+    while current <= end_date:
+        if bucket == "day":
+            next_start = current + timedelta(days=1)
+        elif bucket == "week":
+            next_start = current + timedelta(days=7)
+        else:
+            next_start = (current.replace(day=1) + timedelta(days=32)).replace(day=1)
+        bounds.append((current, min(next_start - timedelta(days=1), end_date)))
+        current = next_start
+    return bounds
+
+
+def _bucket_column(date_column, bounds, timezone=None):
+    """Map a datetime column to the index of the bucket it falls into."""
+    return case(
+        *[
+            (date_column < _date_bounds(date_column, bucket_end, timezone=timezone)[1], index)
+            for index, (_, bucket_end) in enumerate(bounds)
+        ],
+        else_=len(bounds) - 1,
+    ).label("bucket")
+
+
+def _bucketed_query(date_column, bounds, columns, filters=(), group_by=(), timezone=None):
+    """Build a query aggregating ``columns`` per bucket (and extra groups)."""
+    bucket = _bucket_column(date_column, bounds, timezone)
+    query = db.session.query(bucket, *group_by, *columns).filter(
+        *_date_range_filter(date_column, bounds[0][0], bounds[-1][1], timezone),
+        *filters,
+    )
+    return query.group_by("bucket", *group_by)
+
+
+def _bucketed_rows(date_column, bounds, columns, filters=()):
+    """Run one grouped query returning aggregate rows keyed by bucket index."""
+    return {
+        row.bucket: row
+        for row in _bucketed_query(date_column, bounds, columns, filters)
+    }
+
+
+def _period_column(date_column, periods, timezone=None):
+    """Map a datetime column to the index of the period it falls into.
+
+    Unlike ``_bucket_column`` the periods need not be contiguous, so each
+    branch checks both bounds; rows outside every period map to NULL.
+    """
+    whens = []
+    for index, (period_start, period_end) in enumerate(periods):
+        range_start, range_end = _date_bounds(date_column, period_start, period_end, timezone)
+        whens.append(
+            (and_(date_column >= range_start, date_column < range_end), index)
+        )
+    return case(*whens, else_=None).label("bucket")
+
+
+def _period_rows(date_column, periods, columns, filters=()):
+    """Aggregate rows for several periods with one grouped query.
+
+    Returns the rows keyed by period index; periods without rows are
+    omitted. Periods must not overlap, as each row is counted once.
+    """
+    period = _period_column(date_column, periods)
+    ranges = [
+        and_(*_date_range_filter(date_column, period_start, period_end))
+        for period_start, period_end in periods
+    ]
+    query = (
+        db.session.query(period, *columns)
+        .filter(or_(*ranges), *filters)
+        .group_by("bucket")
+    )
+    return {row.bucket: row for row in query}
+
+
+def _distinct_patient_columns():
+    """Aggregate columns counting distinct patients with appointments."""
+    return [
+        func.count(func.distinct(Appointment.patient_id)).label("unique_patients"),
+        func.count(
+            func.distinct(
+                case(
+                    (
+                        Appointment.status == AppointmentStatus.COMPLETED,
+                        Appointment.patient_id,
+                    )
+                )
+            )
+        ).label("unique_patients_seen"),
+    ]
+
+
+def _appointment_count_columns():
+    """Aggregate columns describing appointments: totals, statuses, patients."""
+    columns = [func.count(Appointment.id).label("total")]
+    for status in AppointmentStatus:
+        columns.append(
+            func.sum(case((Appointment.status == status, 1), else_=0)).label(
+                status.value
+            )
+        )
+    return columns + _distinct_patient_columns()
+
+
+def _consultation_count_columns():
+    """Aggregate columns describing consultations."""
+    return [
+        func.count(Consultation.id).label("total"),
+        func.sum(
+            case((Consultation.status == ConsultationStatus.COMPLETED, 1), else_=0)
+        ).label("completed"),
+    ]
+
+
+def _duration_summary(digest, total_hours):
+    """Count, mean and p50/p90/p99 (in hours) of a duration digest."""
+    def quantile(q):
+        value = digest.quantile(q)
+        return round(value, 2) if value is not None else None
+
+    return {
+        "count": digest.count,
+        "mean_hours": round(total_hours / digest.count, 2) if digest.count else None,
+        "p50_hours": quantile(0.5),
+        "p90_hours": quantile(0.9),
+        "p99_hours": quantile(0.99),
+    }
+
+
+def _bucket_counts(
+    appointment_row=None,
+    consultation_row=None,
+    prescription_total=0,
+    new_patients=0,
+):
+    """Combine aggregate rows for one bucket into a flat counts dict."""
+    counts = {
+        "total_appointments": appointment_row.total if appointment_row else 0,
+    }
+    for status in AppointmentStatus:
+        counts[f"{status.value}_appointments"] = (
+            int(getattr(appointment_row, status.value)) if appointment_row else 0
+        )
+    counts["unique_patients"] = (
+        appointment_row.unique_patients if appointment_row else 0
+    )
+    counts["unique_patients_seen"] = (
+        appointment_row.unique_patients_seen if appointment_row else 0
+    )
+    counts["total_consultations"] = consultation_row.total if consultation_row else 0
+    counts["completed_consultations"] = (
+        int(consultation_row.completed) if consultation_row else 0
+    )
+    counts["total_prescriptions"] = prescription_total
+    counts["new_patients"] = new_patients
+    return counts
+
+
+def _one_year_earlier(day):
+    """The same calendar date a year earlier (Feb 29 maps to Feb 28)."""
+    try:
+        return day.replace(year=day.year - 1)
+    except ValueError:
+        return day.replace(year=day.year - 1, day=28)
+
+
+# Durations summarized by generate_operational_metrics
+_OPERATIONAL_DURATIONS = (
+    "booking_lead_time",
+    "confirmation_latency",
+    "cancellation_lead_time",
+)
+
+# Counts that can be summed across days; distinct patient counts cannot.
+_ADDITIVE_FIELDS = [
+    field
+    for field in DailyMetric.COUNT_FIELDS
+    if field not in ("unique_patients", "unique_patients_seen")
+]
+
+
 class AnalyticsService:
 
     @staticmethod
+    @cached_result(ttl=300, tags=("appointments",))
     def generate_appointment_metrics(start_date=None, end_date=None, doctor_id=None):
         """Generate appointment metrics for a date range."""
         if not start_date:
@@ -22,43 +322,31 @@ class AnalyticsService:
         if not end_date:
             end_date = date.today()
 
-        # Base query
-        query = Appointment.query.filter(
-            func.date(Appointment.appointment_date) >= start_date,
-            func.date(Appointment.appointment_date) <= end_date,
-        )
-
-        if doctor_id:
-            query = query.filter(Appointment.doctor_id == doctor_id)
-
-        appointments = query.all()
-
-        # Calculate metrics
-        total = len(appointments)
-        scheduled = len(
-            [a for a in appointments if a.status == AppointmentStatus.SCHEDULED]
-        )
-        confirmed = len(
-            [a for a in appointments if a.status == AppointmentStatus.CONFIRMED]
-        )
-        completed = len(
-            [a for a in appointments if a.status == AppointmentStatus.COMPLETED]
-        )
-        cancelled = len(
-            [a for a in appointments if a.status == AppointmentStatus.CANCELLED]
+        counts = _aggregate(
+            Appointment,
+            Appointment.appointment_date,
+            start_date,
+            end_date,
+            doctor_id=doctor_id,
+            statuses=[
+                AppointmentStatus.SCHEDULED,
+                AppointmentStatus.CONFIRMED,
+                AppointmentStatus.COMPLETED,
+                AppointmentStatus.CANCELLED,
+            ],
         )
 
-        # Calculate patient metrics
-        patient_ids = [a.patient_id for a in appointments]
-        unique_patients = len(set(patient_ids))
+        total = counts["total"]
+        completed = counts[AppointmentStatus.COMPLETED]
+        cancelled = counts[AppointmentStatus.CANCELLED]
 
         return {
             "total_appointments": total,
-            "scheduled_appointments": scheduled,
-            "confirmed_appointments": confirmed,
+            "scheduled_appointments": counts[AppointmentStatus.SCHEDULED],
+            "confirmed_appointments": counts[AppointmentStatus.CONFIRMED],
             "completed_appointments": completed,
             "cancelled_appointments": cancelled,
-            "unique_patients": unique_patients,
+            "unique_patients": counts["unique_patients"],
             "completion_rate": round((completed / total * 100) if total > 0 else 0, 2),
             "cancellation_rate": round(
                 (cancelled / total * 100) if total > 0 else 0, 2
@@ -66,23 +354,43 @@ class AnalyticsService:
         }
 
     @staticmethod
+    @cached_result(ttl=900, tags=("prescriptions",))
     def generate_prescription_trends(
-        start_date=None, end_date=None, doctor_id=None, limit=10
+        start_date=None, end_date=None, doctor_id=None, limit=10, exact=False
     ):
-        """Generate prescription trends and most prescribed medications."""
+        """Generate prescription trends and most prescribed medications.
+
+        Unless ``exact`` is set, the result is merged from the per-day trend
+        sketches when they cover the range; counts are then exact until a
+        day has more distinct medications than the sketch capacity, and
+        unique patients are HyperLogLog estimates.
+        """
         if not start_date:
             start_date = date.today() - timedelta(days=30)
         if not end_date:
             end_date = date.today()
 
+        if not exact:
+            top = TrendSketchService.top_items(
+                "medication", start_date, end_date, doctor_id, limit
+            )
+            if top is not None:
+                return [
+                    {
+                        "medication": medication,
+                        "total_prescriptions": count,
+                        "unique_patients": patients,
+                    }
+                    for medication, count, patients in top
+                ]
+
         # Query prescriptions with counts
         query = db.session.query(
             Prescription.medication_name,
             func.count(Prescription.id).label("count"),
             func.count(func.distinct(Prescription.patient_id)).label("unique_patients"),
         ).filter(
-            func.date(Prescription.prescribed_date) >= start_date,
-            func.date(Prescription.prescribed_date) <= end_date,
+            *_date_range_filter(Prescription.prescribed_date, start_date, end_date)
         )
 
         if doctor_id:
@@ -105,40 +413,71 @@ class AnalyticsService:
         ]
 
     @staticmethod
+    @cached_result(ttl=900, tags=("consultations",))
     def generate_diagnosis_trends(
-        start_date=None, end_date=None, doctor_id=None, limit=10
+        start_date=None, end_date=None, doctor_id=None, limit=10, exact=False
     ):
-        """Generate common diagnosis trends from consultations."""
+        """Generate common diagnosis trends from consultations.
+
+        Served from the trend sketches like ``generate_prescription_trends``
+        unless ``exact`` is set.
+        """
         if not start_date:
             start_date = date.today() - timedelta(days=30)
         if not end_date:
             end_date = date.today()
 
-        # Query consultations for assessment/diagnosis data
+        if not exact:
+            top = TrendSketchService.top_items(
+                "diagnosis", start_date, end_date, doctor_id, limit
+            )
+            if top is not None:
+                codes = [int(code) for code, _, _ in top]
+                names = dict(
+                    db.session.query(Diagnosis.id, Diagnosis.display_name).filter(
+                        Diagnosis.id.in_(codes)
+                    )
+                )
+                return [
+                    {
+                        "diagnosis": names.get(int(code), ""),
+                        "total_cases": count,
+                        "unique_patients": patients,
+                    }
+                    for code, count, patients in top
+                ]
+
+        # Group consultations on the interned diagnosis code
         query = db.session.query(
-            Consultation.assessment,
+            Consultation.diagnosis_code,
             func.count(Consultation.id).label("count"),
             func.count(func.distinct(Consultation.patient_id)).label("unique_patients"),
         ).filter(
-            func.date(Consultation.consultation_date) >= start_date,
-            func.date(Consultation.consultation_date) <= end_date,
-            Consultation.assessment.isnot(None),
-            Consultation.assessment != "",
+            *_date_range_filter(Consultation.consultation_date, start_date, end_date),
+            Consultation.diagnosis_code.isnot(None),
         )
 
         if doctor_id:
             query = query.filter(Consultation.doctor_id == doctor_id)
 
-        results = (
-            query.group_by(Consultation.assessment)
+        counts = (
+            query.group_by(Consultation.diagnosis_code)
             .order_by(desc("count"))
             .limit(limit)
+            .subquery()
+        )
+        results = (
+            db.session.query(
+                Diagnosis.display_name, counts.c.count, counts.c.unique_patients
+            )
+            .join(counts, counts.c.diagnosis_code == Diagnosis.id)
+            .order_by(desc(counts.c.count))
             .all()
         )
 
         return [
             {
-                "diagnosis": r.assessment,
+                "diagnosis": r.display_name,
                 "total_cases": r.count,
                 "unique_patients": r.unique_patients,
             }
@@ -146,6 +485,9 @@ class AnalyticsService:
         ]
 
     @staticmethod
+    @cached_result(
+        ttl=600, tags=("appointments", "consultations", "prescriptions", "doctors")
+    )
     def generate_doctor_performance(start_date=None, end_date=None, doctor_id=None):
         """Generate doctor performance metrics from existing data."""
         if not start_date:
@@ -159,43 +501,55 @@ class AnalyticsService:
             doctors_query = doctors_query.filter_by(id=doctor_id)
 
         doctors = doctors_query.all()
+        doctor_ids = [doctor.id for doctor in doctors]
         performance_data = []
 
-        for doctor in doctors:
-            # Appointment metrics
-            appointments = Appointment.query.filter(
-                Appointment.doctor_id == doctor.id,
-                func.date(Appointment.appointment_date) >= start_date,
-                func.date(Appointment.appointment_date) <= end_date,
-            ).all()
-
-            # Consultation metrics
-            consultations = Consultation.query.filter(
-                Consultation.doctor_id == doctor.id,
-                func.date(Consultation.consultation_date) >= start_date,
-                func.date(Consultation.consultation_date) <= end_date,
-            ).all()
-
-            # Prescription metrics
-            prescriptions = Prescription.query.filter(
-                Prescription.doctor_id == doctor.id,
-                func.date(Prescription.prescribed_date) >= start_date,
-                func.date(Prescription.prescribed_date) <= end_date,
-            ).all()
+        if not doctor_ids:
+            return performance_data
+
+        # One grouped query per table covers every doctor at once
+        appointment_counts = _aggregate_by_doctor(
+            Appointment,
+            Appointment.appointment_date,
+            start_date,
+            end_date,
+            doctor_ids=doctor_ids,
+            statuses=[AppointmentStatus.COMPLETED],
+        )
+        consultation_counts = _aggregate_by_doctor(
+            Consultation,
+            Consultation.consultation_date,
+            start_date,
+            end_date,
+            doctor_ids=doctor_ids,
+            statuses=[ConsultationStatus.COMPLETED],
+        )
+        prescription_counts = _aggregate_by_doctor(
+            Prescription,
+            Prescription.prescribed_date,
+            start_date,
+            end_date,
+            doctor_ids=doctor_ids,
+        )
 
-            # Calculate performance metrics
-            total_appointments = len(appointments)
-            completed_appointments = len(
-                [a for a in appointments if a.status == AppointmentStatus.COMPLETED]
+        for doctor in doctors:
+            appointments = appointment_counts.get(
+                doctor.id, _empty_counts([AppointmentStatus.COMPLETED])
             )
-            total_consultations = len(consultations)
-            completed_consultations = len(
-                [c for c in consultations if c.status == ConsultationStatus.COMPLETED]
+            consultations = consultation_counts.get(
+                doctor.id, _empty_counts([ConsultationStatus.COMPLETED])
             )
-            total_prescriptions = len(prescriptions)
+            prescriptions = prescription_counts.get(doctor.id, _empty_counts([]))
+
+            # Calculate performance metrics
+            total_appointments = appointments["total"]
+            completed_appointments = appointments[AppointmentStatus.COMPLETED]
+            total_consultations = consultations["total"]
+            completed_consultations = consultations[ConsultationStatus.COMPLETED]
+            total_prescriptions = prescriptions["total"]
 
             # Patient metrics
-            unique_patients = len(set([a.patient_id for a in appointments]))
+            unique_patients = appointments["unique_patients"]
 
             performance_data.append(
                 {
@@ -225,75 +579,616 @@ class AnalyticsService:
         return performance_data
 
     @staticmethod
-    def generate_daily_summary(target_date=None):
-        """Generate daily summary metrics from existing data."""
-        if not target_date:
-            target_date = date.today()
+    @cached_result(ttl=600, tags=("appointments", "doctors"))
+    def generate_operational_metrics(start_date=None, end_date=None, doctor_id=None):
+        """Booking lead time, confirmation latency, cancellation lead time
+        and slot utilization for appointments in a date range.
+
+        Appointments are streamed once with a narrow query, and durations
+        go into t-digests, so p50/p90/p99 need neither sorting nor holding
+        every row. Negative durations (e.g. an appointment recorded after
+        it took place) count as zero. Lead times are measured on the clinic
+        clock: ``created_at`` and ``cancelled_at`` are UTC and are converted
+        to the reporting timezone before subtracting them from the local
+        ``appointment_date``. Utilization is booked minutes inside
+        ``Appointment.WORKING_HOURS`` over the working minutes of every
+        active doctor on every day of the range; cancelled appointments
+        are not booked time.
+        """
+        if not start_date:
+            start_date = date.today() - timedelta(days=30)
+        if not end_date:
+            end_date = date.today()
 
-        # Appointment metrics for the day
-        appointments = Appointment.query.filter(
-            func.date(Appointment.appointment_date) == target_date
-        ).all()
+        start_hour, end_hour = Appointment.WORKING_HOURS
+        days = (end_date - start_date).days + 1
 
-        # Consultation metrics for the day
-        consultations = Consultation.query.filter(
-            func.date(Consultation.consultation_date) == target_date
-        ).all()
+        doctors_query = User.query.filter_by(role="doctor", active=True)
+        if doctor_id:
+            doctors_query = doctors_query.filter_by(id=doctor_id)
+        doctors = {doctor.id: doctor for doctor in doctors_query}
 
-        # Prescription metrics for the day
-        prescriptions = Prescription.query.filter(
-            func.date(Prescription.prescribed_date) == target_date
-        ).all()
+        query = db.session.query(
+            Appointment.doctor_id,
+            Appointment.appointment_date,
+            Appointment.duration_minutes,
+            Appointment.created_at,
+            Appointment.confirmed_at,
+            Appointment.cancelled_at,
+            Appointment.status,
+        ).filter(*_date_range_filter(Appointment.appointment_date, start_date, end_date))
+        if doctor_id:
+            query = query.filter(Appointment.doctor_id == doctor_id)
 
-        # New patient registrations
-        new_patients = User.query.filter(
-            User.role == "patient", func.date(User.created_at) == target_date
-        ).count()
+        digests = {name: TDigest() for name in _OPERATIONAL_DURATIONS}
+        totals = dict.fromkeys(_OPERATIONAL_DURATIONS, 0.0)
+        booked_minutes = {}
+        clinic_timezone = get_reporting_timezone()
+
+        def record(name, seconds):
+            hours = max(seconds, 0) / 3600
+            digests[name].add(hours)
+            totals[name] += hours
+
+        def clinic_time(moment):
+            # UTC timestamps as clinic wall time, the clock appointment_date is on
+            return localize_datetime(moment, clinic_timezone).replace(tzinfo=None)
+
+        for row in query.execution_options(yield_per=1000):
+            if row.created_at:
+                record(
+                    "booking_lead_time",
+                    (row.appointment_date - clinic_time(row.created_at)).total_seconds(),
+                )
+            if row.confirmed_at and row.created_at:
+                record(
+                    "confirmation_latency",
+                    (row.confirmed_at - row.created_at).total_seconds(),
+                )
+            if row.cancelled_at:
+                record(
+                    "cancellation_lead_time",
+                    (row.appointment_date - clinic_time(row.cancelled_at)).total_seconds(),
+                )
 
-        return {
-            "date": target_date.strftime("%Y-%m-%d"),
-            "total_appointments": len(appointments),
-            "completed_appointments": len(
-                [a for a in appointments if a.status == AppointmentStatus.COMPLETED]
-            ),
-            "total_consultations": len(consultations),
-            "completed_consultations": len(
-                [c for c in consultations if c.status == ConsultationStatus.COMPLETED]
-            ),
-            "total_prescriptions": len(prescriptions),
-            "new_patients": new_patients,
-            "unique_patients_seen": len(
-                set(
-                    [
-                        a.patient_id
-                        for a in appointments
-                        if a.status == AppointmentStatus.COMPLETED
-                    ]
+            if row.status == AppointmentStatus.CANCELLED or row.doctor_id not in doctors:
+                continue
+            # Working hours apply to the stored appointment times, as in
+            # Appointment.get_available_slots
+            window_start = datetime.combine(
+                row.appointment_date.date(), time(hour=start_hour)
+            )
+            window_end = datetime.combine(row.appointment_date.date(), time(hour=end_hour))
+            end_time = row.appointment_date + timedelta(minutes=row.duration_minutes)
+            overlap = (
+                min(end_time, window_end) - max(row.appointment_date, window_start)
+            ).total_seconds()
+            if overlap > 0:
+                booked_minutes[row.doctor_id] = (
+                    booked_minutes.get(row.doctor_id, 0) + overlap / 60
                 )
+
+        capacity = days * (end_hour - start_hour) * 60
+        utilization = [
+            {
+                "doctor_id": doctor.id,
+                "doctor_name": doctor.display_name,
+                "booked_minutes": round(booked_minutes.get(doctor.id, 0)),
+                "capacity_minutes": capacity,
+                "utilization_rate": round(
+                    booked_minutes.get(doctor.id, 0) / capacity * 100, 2
+                ),
+            }
+            for doctor in doctors.values()
+        ]
+        utilization.sort(key=lambda entry: entry["utilization_rate"], reverse=True)
+
+        total_booked = sum(booked_minutes.values())
+        total_capacity = capacity * len(doctors)
+        return {
+            **{
+                name: _duration_summary(digests[name], totals[name])
+                for name in _OPERATIONAL_DURATIONS
+            },
+            "utilization_rate": round(
+                (total_booked / total_capacity * 100) if total_capacity else 0, 2
             ),
+            "doctor_utilization": utilization,
         }
 
     @staticmethod
-    def generate_weekly_summary(start_date=None):
-        """Generate weekly summary metrics."""
+    @cached_result(
+        ttl=120,
+        tags=("appointments", "consultations", "prescriptions", "patients"),
+    )
+    def generate_timeseries(start_date=None, end_date=None, bucket="day", doctor_id=None):
+        """Generate per-bucket activity counts for a date range.
+
+        Every bucket is produced from one grouped query per table, so the
+        number of queries does not depend on the length of the range. Days
+        covered by the ``daily_metrics`` rollup are read from it instead.
+        """
         if not start_date:
-            start_date = date.today() - timedelta(days=7)
-        end_date = start_date + timedelta(days=6)
+            start_date = date.today() - timedelta(days=30)
+        if not end_date:
+            end_date = date.today()
+
+        bounds = _bucket_bounds(start_date, end_date, bucket)
+        if not bounds:
+            return []
+
+        days = AnalyticsService._rollup_days(start_date, end_date, doctor_id)
+        if days is None:
+            return AnalyticsService._live_timeseries(bounds, doctor_id)
+
+        if bucket == "day":
+            return days
+
+        # Sum the additive day counts into each bucket. Distinct patient
+        # counts cannot be summed, so they come from one narrow live query.
+        filters = []
+        if doctor_id:
+            filters.append(Appointment.doctor_id == doctor_id)
+        distinct_rows = _bucketed_rows(
+            Appointment.appointment_date,
+            bounds,
+            _distinct_patient_columns(),
+            filters,
+        )
+
+        series = []
+        for index, (bucket_start, bucket_end) in enumerate(bounds):
+            first = (bucket_start - start_date).days
+            last = (bucket_end - start_date).days
+            entry = {
+                "start": bucket_start.strftime("%Y-%m-%d"),
+                "end": bucket_end.strftime("%Y-%m-%d"),
+            }
+            for field in _ADDITIVE_FIELDS:
+                entry[field] = sum(day[field] for day in days[first : last + 1])
+            distinct_row = distinct_rows.get(index)
+            entry["unique_patients"] = (
+                distinct_row.unique_patients if distinct_row else 0
+            )
+            entry["unique_patients_seen"] = (
+                distinct_row.unique_patients_seen if distinct_row else 0
+            )
+            series.append(entry)
+
+        return series
+
+    @staticmethod
+    def compare_periods(periods, doctor_id=None):
+        """Compare activity counts across several date periods.
+
+        ``periods`` is a list of inclusive ``(start_date, end_date)`` tuples
+        that must not overlap; the first one is the period of interest and
+        every other period is compared against it. All periods are counted
+        by one grouped query per table, however many there are.
+
+        Returns the counts of each period and, for every later period, the
+        ``delta`` and ``percent_change`` of each count relative to it
+        (``percent_change`` is None when the earlier count is zero).
+        """
+        periods = [tuple(period) for period in periods]
+        if not periods:
+            return {"periods": [], "comparisons": []}
+
+        sorted_periods = sorted(periods)
+        for (_, previous_end), (next_start, _) in zip(sorted_periods, sorted_periods[1:]):
+            if next_start <= previous_end:
+                raise ValueError("Comparison periods must not overlap")
+        if any(start > end for start, end in periods):
+            raise ValueError("Comparison period starts after it ends")
+
+        key = repr(
+            (
+                "compare_periods",
+                get_user_timezone().zone,
+                periods,
+                doctor_id,
+            )
+        )
+        return analytics_cache.fetch(
+            "compare_periods",
+            key,
+            lambda: AnalyticsService._compare_periods(periods, doctor_id),
+            120,
+            ("appointments", "consultations", "prescriptions", "patients"),
+            sorted_periods[0][0],
+            sorted_periods[-1][1],
+        )
+
+    @staticmethod
+    def _compare_periods(periods, doctor_id=None):
+        """Uncached ``compare_periods``."""
+        appointment_filters = []
+        consultation_filters = []
+        prescription_filters = []
+        if doctor_id:
+            appointment_filters.append(Appointment.doctor_id == doctor_id)
+            consultation_filters.append(Consultation.doctor_id == doctor_id)
+            prescription_filters.append(Prescription.doctor_id == doctor_id)
+
+        appointments = _period_rows(
+            Appointment.appointment_date,
+            periods,
+            _appointment_count_columns(),
+            appointment_filters,
+        )
+        consultations = _period_rows(
+            Consultation.consultation_date,
+            periods,
+            _consultation_count_columns(),
+            consultation_filters,
+        )
+        prescriptions = _period_rows(
+            Prescription.prescribed_date,
+            periods,
+            [func.count(Prescription.id).label("total")],
+            prescription_filters,
+        )
+        new_patients = _period_rows(
+            User.created_at,
+            periods,
+            [func.count(User.id).label("total")],
+            [User.role == "patient"],
+        )
+
+        results = []
+        for index, (period_start, period_end) in enumerate(periods):
+            prescription_row = prescriptions.get(index)
+            new_patient_row = new_patients.get(index)
+
+            entry = {
+                "start": period_start.strftime("%Y-%m-%d"),
+                "end": period_end.strftime("%Y-%m-%d"),
+                "days": (period_end - period_start).days + 1,
+            }
+            entry.update(
+                _bucket_counts(
+                    appointments.get(index),
+                    consultations.get(index),
+                    prescription_row.total if prescription_row else 0,
+                    new_patient_row.total if new_patient_row else 0,
+                )
+            )
+            results.append(entry)
+
+        current = results[0]
+        comparisons = []
+        for other in results[1:]:
+            changes = {}
+            for field, value in current.items():
+                if field in ("start", "end", "days"):
+                    continue
+                delta = value - other[field]
+                changes[field] = {
+                    "current": value,
+                    "previous": other[field],
+                    "delta": delta,
+                    "percent_change": (
+                        round(delta / other[field] * 100, 1) if other[field] else None
+                    ),
+                }
+            comparisons.append(
+                {"start": other["start"], "end": other["end"], "changes": changes}
+            )
+
+        return {"periods": results, "comparisons": comparisons}
+
+    @staticmethod
+    def comparison_periods(period="week", anchor_date=None):
+        """Current, previous and year-earlier periods ending on a date.
+
+        ``period`` is ``day``, ``week`` (the 7 days ending on the anchor) or
+        ``month`` (the calendar month up to the anchor). The result can be
+        passed straight to ``compare_periods``.
+        """
+        if not anchor_date:
+            anchor_date = date.today()
+
+        if period == "day":
+            current = (anchor_date, anchor_date)
+            previous_end = anchor_date - timedelta(days=1)
+            previous = (previous_end, previous_end)
+        elif period == "week":
+            current = (anchor_date - timedelta(days=6), anchor_date)
+            previous = (
+                anchor_date - timedelta(days=13),
+                anchor_date - timedelta(days=7),
+            )
+        elif period == "month":
+            current = (anchor_date.replace(day=1), anchor_date)
+            previous_end = current[0] - timedelta(days=1)
+            previous = (
+                previous_end.replace(day=1),
+                previous_end.replace(day=min(anchor_date.day, previous_end.day)),
+            )
+        else:
+            raise ValueError(f"Unknown comparison period: {period}")
+
+        return [current, previous, tuple(_one_year_earlier(day) for day in current)]
+
+    @staticmethod
+    def _live_timeseries(bounds, doctor_id=None):
+        """Compute time series buckets directly from the raw tables."""
+        appointment_filters = []
+        consultation_filters = []
+        prescription_filters = []
+        if doctor_id:
+            appointment_filters.append(Appointment.doctor_id == doctor_id)
+            consultation_filters.append(Consultation.doctor_id == doctor_id)
+            prescription_filters.append(Prescription.doctor_id == doctor_id)
+
+        appointments = _bucketed_rows(
+            Appointment.appointment_date,
+            bounds,
+            _appointment_count_columns(),
+            appointment_filters,
+        )
+
+        consultations = _bucketed_rows(
+            Consultation.consultation_date,
+            bounds,
+            _consultation_count_columns(),
+            consultation_filters,
+        )
+
+        prescriptions = _bucketed_rows(
+            Prescription.prescribed_date,
+            bounds,
+            [func.count(Prescription.id).label("total")],
+            prescription_filters,
+        )
+
+        new_patients = _bucketed_rows(
+            User.created_at,
+            bounds,
+            [func.count(User.id).label("total")],
+            [User.role == "patient"],
+        )
+
+        series = []
+        for index, (bucket_start, bucket_end) in enumerate(bounds):
+            prescription_row = prescriptions.get(index)
+            new_patient_row = new_patients.get(index)
+
+            entry = {
+                "start": bucket_start.strftime("%Y-%m-%d"),
+                "end": bucket_end.strftime("%Y-%m-%d"),
+            }
+            entry.update(
+                _bucket_counts(
+                    appointments.get(index),
+                    consultations.get(index),
+                    prescription_row.total if prescription_row else 0,
+                    new_patient_row.total if new_patient_row else 0,
+                )
+            )
+            series.append(entry)
+
+        return series
+
+    @staticmethod
+    def _rollup_days(start_date, end_date, doctor_id=None):
+        """Per-day counts for a range, read from the rollup where possible.
+
+        Days are read from ``daily_metrics`` up to the first day that has not
+        been rolled up; that day and everything after it is computed live.
+        Returns None when the rollup cannot serve the start of the range:
+        it is disabled, the user views reports in a different timezone, or
+        the first day has not been rolled up.
+        """
+        if not current_app.config.get("ANALYTICS_ROLLUP_ENABLED", True):
+            return None
+
+        if get_user_timezone().zone != get_reporting_timezone().zone:
+            return None
+
+        doctor_filter = DailyMetric.doctor_id.is_(None)
+        if doctor_id:
+            doctor_filter = or_(doctor_filter, DailyMetric.doctor_id == doctor_id)
+
+        metrics = DailyMetric.query.filter(
+            DailyMetric.metric_date >= start_date,
+            DailyMetric.metric_date <= end_date,
+            doctor_filter,
+        ).all()
+
+        facility_rows = {m.metric_date: m for m in metrics if m.doctor_id is None}
+        doctor_rows = {m.metric_date: m for m in metrics if m.doctor_id is not None}
+
+        days = []
+        for day_start, _ in _bucket_bounds(start_date, end_date, "day"):
+            facility_row = facility_rows.get(day_start)
+            if facility_row is None:
+                break
+            row = doctor_rows.get(day_start) if doctor_id else facility_row
 
-        # Generate daily summaries for the week
-        daily_summaries = []
-        current_date = start_date
+            entry = {
+                "start": day_start.strftime("%Y-%m-%d"),
+                "end": day_start.strftime("%Y-%m-%d"),
+            }
+            for field in DailyMetric.COUNT_FIELDS:
+                entry[field] = getattr(row, field) if row else 0
+            # New patient registrations are only tracked facility-wide
+            entry["new_patients"] = facility_row.new_patients
+            days.append(entry)
+
+        if not days:
+            return None
+
+        live_start = start_date + timedelta(days=len(days))
+        if live_start <= end_date:
+            days.extend(
+                AnalyticsService._live_timeseries(
+                    _bucket_bounds(live_start, end_date, "day"), doctor_id
+                )
+            )
+
+        return days
+
+    @staticmethod
+    def refresh_daily_metrics(start_date, end_date):
+        """Recompute the ``daily_metrics`` rollup for an inclusive date range.
+
+        The range is processed one calendar month at a time; each month's
+        rows are replaced in a single transaction. Returns the number of
+        days refreshed.
+        """
+        rollup_timezone = get_reporting_timezone()
+        refreshed_days = 0
+
+        for chunk_start, chunk_end in _bucket_bounds(start_date, end_date, "month"):
+            metrics = AnalyticsService.compute_daily_metrics(
+                chunk_start, chunk_end, rollup_timezone
+            )
+
+            DailyMetric.query.filter(
+                DailyMetric.metric_date >= chunk_start,
+                DailyMetric.metric_date <= chunk_end,
+            ).delete(synchronize_session=False)
+            db.session.add_all(metrics)
+            db.session.commit()
+            # The bulk delete bypasses the cache's flush listener
+            analytics_cache.invalidate_dates(chunk_start, chunk_end)
+
+            refreshed_days += (chunk_end - chunk_start).days + 1
+
+        return refreshed_days
+
+    @staticmethod
+    def compute_daily_metrics(start_date, end_date, timezone=None):
+        """Build ``DailyMetric`` rows for every day and doctor in a range."""
+        if timezone is None:
+            timezone = get_reporting_timezone()
+
+        bounds = _bucket_bounds(start_date, end_date, "day")
+
+        appointments_by_doctor = _bucketed_query(
+            Appointment.appointment_date,
+            bounds,
+            _appointment_count_columns(),
+            group_by=[Appointment.doctor_id],
+            timezone=timezone,
+        ).all()
+        appointments = {
+            row.bucket: row
+            for row in _bucketed_query(
+                Appointment.appointment_date,
+                bounds,
+                _appointment_count_columns(),
+                timezone=timezone,
+            )
+        }
+        consultations_by_doctor = _bucketed_query(
+            Consultation.consultation_date,
+            bounds,
+            _consultation_count_columns(),
+            group_by=[Consultation.doctor_id],
+            timezone=timezone,
+        ).all()
+        prescriptions_by_doctor = _bucketed_query(
+            Prescription.prescribed_date,
+            bounds,
+            [func.count(Prescription.id).label("total")],
+            group_by=[Prescription.doctor_id],
+            timezone=timezone,
+        ).all()
+        new_patients = {
+            row.bucket: row.total
+            for row in _bucketed_query(
+                User.created_at,
+                bounds,
+                [func.count(User.id).label("total")],
+                filters=[User.role == "patient"],
+                timezone=timezone,
+            )
+        }
+
+        # Collect every (day, doctor) pair that has any activity, and total
+        # the additive consultation and prescription counts per day.
+        keys = set()
+        appointment_rows = {}
+        consultation_rows = {}
+        prescription_totals = {}
+        daily_consultations = {}
+        daily_prescriptions = {}
+        for row in appointments_by_doctor:
+            appointment_rows[(row.bucket, row.doctor_id)] = row
+            keys.add((row.bucket, row.doctor_id))
+        for row in consultations_by_doctor:
+            consultation_rows[(row.bucket, row.doctor_id)] = row
+            keys.add((row.bucket, row.doctor_id))
+            total, completed = daily_consultations.get(row.bucket, (0, 0))
+            daily_consultations[row.bucket] = (
+                total + row.total,
+                completed + int(row.completed),
+            )
+        for row in prescriptions_by_doctor:
+            prescription_totals[(row.bucket, row.doctor_id)] = row.total
+            keys.add((row.bucket, row.doctor_id))
+            daily_prescriptions[row.bucket] = (
+                daily_prescriptions.get(row.bucket, 0) + row.total
+            )
 
-        while current_date <= end_date:
-            daily_summaries.append(
-                AnalyticsService.generate_daily_summary(current_date)
+        now = datetime.utcnow()
+        metrics = []
+        for index, doctor_id in sorted(keys):
+            counts = _bucket_counts(
+                appointment_rows.get((index, doctor_id)),
+                consultation_rows.get((index, doctor_id)),
+                prescription_totals.get((index, doctor_id), 0),
+            )
+            metrics.append(
+                DailyMetric(
+                    metric_date=bounds[index][0],
+                    doctor_id=doctor_id,
+                    refreshed_at=now,
+                    **counts,
+                )
+            )
+
+        # Facility-wide rows, written for every day to mark it as covered
+        for index, (day, _) in enumerate(bounds):
+            counts = _bucket_counts(
+                appointments.get(index),
+                prescription_total=daily_prescriptions.get(index, 0),
+                new_patients=new_patients.get(index, 0),
+            )
+            (
+                counts["total_consultations"],
+                counts["completed_consultations"],
+            ) = daily_consultations.get(index, (0, 0))
+            metrics.append(
+                DailyMetric(
+                    metric_date=day, doctor_id=None, refreshed_at=now, **counts
+                )
             )
-            current_date += timedelta(days=1)
 
-        # Calculate weekly totals
-        weekly_totals = {
-            "week_start": start_date.strftime("%Y-%m-%d"),
-            "week_end": end_date.strftime("%Y-%m-%d"),
+        return metrics
+
+    @staticmethod
+    def _daily_summary_from_bucket(bucket):
+        """Shape a day bucket from ``generate_timeseries`` as a daily summary."""
+        return {
+            "date": bucket["start"],
+            "total_appointments": bucket["total_appointments"],
+            "completed_appointments": bucket["completed_appointments"],
+            "total_consultations": bucket["total_consultations"],
+            "completed_consultations": bucket["completed_consultations"],
+            "total_prescriptions": bucket["total_prescriptions"],
+            "new_patients": bucket["new_patients"],
+            "unique_patients_seen": bucket["unique_patients_seen"],
+        }
+
+    @staticmethod
+    def _weekly_summary_from_days(daily_summaries):
+        """Total a list of seven daily summaries into a weekly summary."""
+        return {
+            "week_start": daily_summaries[0]["date"],
+            "week_end": daily_summaries[-1]["date"],
             "total_appointments": sum(d["total_appointments"] for d in daily_summaries),
             "completed_appointments": sum(
                 d["completed_appointments"] for d in daily_summaries
@@ -311,7 +1206,29 @@ class AnalyticsService:
             "daily_breakdown": daily_summaries,
         }
 
-        return weekly_totals
+    @staticmethod
+    def generate_daily_summary(target_date=None):
+        """Generate daily summary metrics from existing data."""
+        if not target_date:
+            target_date = date.today()
+
+        bucket = AnalyticsService.generate_timeseries(target_date, target_date)[0]
+        return AnalyticsService._daily_summary_from_bucket(bucket)
+
+    @staticmethod
+    def generate_weekly_summary(start_date=None):
+        """Generate weekly summary metrics."""
+        if not start_date:
+            start_date = date.today() - timedelta(days=7)
+        end_date = start_date + timedelta(days=6)
+
+        # Daily summaries for the week come from a single time series
+        daily_summaries = [
+            AnalyticsService._daily_summary_from_bucket(bucket)
+            for bucket in AnalyticsService.generate_timeseries(start_date, end_date)
+        ]
+
+        return AnalyticsService._weekly_summary_from_days(daily_summaries)
 
     @staticmethod
     def generate_monthly_summary(year=None, month=None):
@@ -327,74 +1244,54 @@ class AnalyticsService:
         else:
             end_date = date(year, month + 1, 1) - timedelta(days=1)
 
-        # Get monthly metrics directly from existing models
-        appointments = Appointment.query.filter(
-            func.date(Appointment.appointment_date) >= start_date,
-            func.date(Appointment.appointment_date) <= end_date,
-        ).all()
-
-        consultations = Consultation.query.filter(
-            func.date(Consultation.consultation_date) >= start_date,
-            func.date(Consultation.consultation_date) <= end_date,
-        ).all()
-
-        prescriptions = Prescription.query.filter(
-            func.date(Prescription.prescribed_date) >= start_date,
-            func.date(Prescription.prescribed_date) <= end_date,
-        ).all()
+        # Weekly breakdowns start on the 1st, 8th, ... and span 7 full days,
+        # so the last week may run into the following month.
+        weeks = (end_date - start_date).days // 7 + 1
+        series_end = start_date + timedelta(days=weeks * 7 - 1)
+        daily_summaries = [
+            AnalyticsService._daily_summary_from_bucket(bucket)
+            for bucket in AnalyticsService.generate_timeseries(start_date, series_end)
+        ]
 
-        # Calculate weekly breakdowns
-        weekly_summaries = []
-        current_week_start = start_date
+        weekly_summaries = [
+            AnalyticsService._weekly_summary_from_days(daily_summaries[i : i + 7])
+            for i in range(0, len(daily_summaries), 7)
+        ]
 
-        while current_week_start <= end_date:
-            weekly_summaries.append(
-                AnalyticsService.generate_weekly_summary(current_week_start)
-            )
-            current_week_start += timedelta(days=7)
+        month_days = daily_summaries[: (end_date - start_date).days + 1]
+        appointment_counts = _aggregate(
+            Appointment, Appointment.appointment_date, start_date, end_date
+        )
 
         return {
             "month": f"{year}-{month:02d}",
             "month_name": start_date.strftime("%B %Y"),
-            "total_appointments": len(appointments),
-            "completed_appointments": len(
-                [a for a in appointments if a.status == AppointmentStatus.COMPLETED]
+            "total_appointments": sum(d["total_appointments"] for d in month_days),
+            "completed_appointments": sum(
+                d["completed_appointments"] for d in month_days
             ),
-            "total_consultations": len(consultations),
-            "completed_consultations": len(
-                [c for c in consultations if c.status == ConsultationStatus.COMPLETED]
+            "total_consultations": sum(d["total_consultations"] for d in month_days),
+            "completed_consultations": sum(
+                d["completed_consultations"] for d in month_days
             ),
-            "total_prescriptions": len(prescriptions),
-            "unique_patients": len(set([a.patient_id for a in appointments])),
+            "total_prescriptions": sum(d["total_prescriptions"] for d in month_days),
+            "unique_patients": appointment_counts["unique_patients"],
             "weekly_breakdown": weekly_summaries,
         }
 
     @staticmethod
     def get_system_statistics():
-        """Get overall system statistics."""
-        # Total counts
-        total_patients = User.query.filter_by(role="patient", active=True).count()
-        total_doctors = User.query.filter_by(role="doctor", active=True).count()
-        total_appointments = Appointment.query.count()
-        total_consultations = Consultation.query.count()
-        total_prescriptions = Prescription.query.count()
-
-        # Recent activity (last 30 days)
-        thirty_days_ago = date.today() - timedelta(days=30)
-        recent_appointments = Appointment.query.filter(
-            func.date(Appointment.appointment_date) >= thirty_days_ago
-        ).count()
-
-        recent_consultations = Consultation.query.filter(
-            func.date(Consultation.consultation_date) >= thirty_days_ago
-        ).count()
+        """Get overall system statistics from the shared stats snapshot."""
+        snapshot = StatsSnapshotService.get_snapshot()
+        recent_appointments = snapshot["recent_appointments"]
+        recent_consultations = snapshot["recent_consultations"]
 
         return {
-            "total_patients": total_patients,
-            "total_doctors": total_doctors,
-            "total_appointments": total_appointments,
-            "total_consultations": total_consultations,
-            "total_prescriptions": total_prescriptions,
+            "total_patients": snapshot["total_patients"],
+            "total_doctors": snapshot["total_doctors"],
+            "total_appointments": snapshot["total_appointments"],
+            "total_consultations": snapshot["total_consultations"],
+            "total_prescriptions": snapshot["total_prescriptions"],
             "recent_appointments": recent_appointments,
             "recent_consultations": recent_consultations,
             "avg_appointments_per_day": round(recent_appointments / 30, 1),
@@ -459,25 +1356,3 @@ class AnalyticsService:
                 writer.writerows(data)
 
         return output.getvalue()
-
-    @staticmethod
-    def _convert_to_csv(data, report_type):
-        """Convert data to CSV format."""
-        import csv
-        import io
-
-        output = io.StringIO()
-
-        if report_type == "appointments" and isinstance(data, dict):
-            writer = csv.writer(output)
-            writer.writerow(["Metric", "Value"])
-            for key, value in data.items():
-                writer.writerow([key.replace("_", " ").title(), value])
-
-        elif report_type in ["prescriptions", "performance"] and isinstance(data, list):
-            if data:
-                writer = csv.DictWriter(output, fieldnames=data[0].keys())
-                writer.writeheader()
-                writer.writerows(data)
-
-        return output.getvalue()
@@ -0,0 +1,273 @@
+from datetime import timedelta
+from sqlalchemy import select, type_coerce
+from app import db
+from app.models.appointment import Appointment, AppointmentStatus
+from app.utils.timezone_utils import (
+    get_local_date_bounds,
+    get_reporting_timezone,
+    localize_datetime,
+)
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; see ColumnarAnalyticsService.available
+    np = None
+
+# Status enum members in code order; column arrays hold indexes into this list
+STATUSES = list(AppointmentStatus)
+_STATUS_CODES = {status.name: code for code, status in enumerate(STATUSES)}
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("The columnar analytics backend requires NumPy")
+
+
+def _percentage(numerator, denominator):
+    """Element-wise ``numerator / denominator * 100``, 0 where nothing counted."""
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    rates = np.zeros(np.broadcast(numerator, denominator).shape)
+    np.divide(numerator * 100, denominator, out=rates, where=denominator > 0)
+    return np.round(rates, 2)
+
+
+def _clinic_time(values, timezone):
+    """UTC ``datetime64`` values as naive wall time in ``timezone``.
+
+    The UTC offset is looked up once per distinct hour rather than per row.
+    """
+    hours, hour_index = np.unique(values.astype("datetime64[h]"), return_inverse=True)
+    offsets = np.array(
+        [
+            localize_datetime(hour.item(), timezone).utcoffset() // timedelta(minutes=1)
+            for hour in hours
+        ],
+        dtype="timedelta64[m]",
+    )
+    return values + offsets[hour_index.reshape(-1)]
+
+
+class AppointmentColumns:
+    """Appointments of a date range held as parallel NumPy arrays.
+
+    ``day`` is the index of the local day each row falls on, ``status``
+    the index of its status in ``STATUSES``, and ``lead_minutes`` the time
+    from booking to the appointment.
+    """
+
+    def __init__(self, start_date, end_date, timezone, columns):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.timezone = timezone
+        self.days = (end_date - start_date).days + 1
+        for name, values in columns.items():
+            setattr(self, name, values)
+
+    def __len__(self):
+        return len(self.doctor_id)
+
+    @classmethod
+    def load(cls, start_date, end_date, doctor_id=None, timezone=None):
+        """Read the range with one narrow query and convert it to arrays."""
+        _require_numpy()
+        timezone = timezone or get_reporting_timezone()
+        range_start, range_end = get_local_date_bounds(start_date, end_date)
+
+        # Raw column values skip per-row enum and datetime object creation;
+        # NumPy parses the ISO timestamps in bulk.
+        query = select(
+            type_coerce(Appointment.appointment_date, db.String),
+            type_coerce(Appointment.created_at, db.String),
+            type_coerce(Appointment.status, db.String),
+            Appointment.doctor_id,
+            Appointment.patient_id,
+            Appointment.duration_minutes,
+        ).where(
+            Appointment.appointment_date >= range_start,
+            Appointment.appointment_date < range_end,
+        )
+        if doctor_id:
+            query = query.where(Appointment.doctor_id == doctor_id)
+
+        rows = db.session.execute(query).all()
+        if rows:
+            appointment_dates, created, statuses, doctors, patients, durations = zip(*rows)
+        else:
+            appointment_dates = created = statuses = doctors = patients = durations = ()
+
+        appointment_date = np.array(appointment_dates, dtype="datetime64[us]")
+        created_at = np.array(created, dtype="datetime64[us]")
+        status_names, status_index = np.unique(
+            np.array(statuses, dtype=str), return_inverse=True
+        )
+        status_lookup = np.array(
+            [_STATUS_CODES[name] for name in status_names], dtype=np.int8
+        )
+
+        columns = {
+            "appointment_date": appointment_date,
+            "created_at": created_at,
+            "status": status_lookup[status_index].reshape(-1),
+            "doctor_id": np.array(doctors, dtype=np.int64),
+            "patient_id": np.array(patients, dtype=np.int64),
+            "duration_minutes": np.array(durations, dtype=np.int32),
+            # Appointment times are local wall time, so the stored date is the day
+            "day": (
+                appointment_date.astype("datetime64[D]") - np.datetime64(start_date, "D")
+            ).astype(np.int32),
+            # created_at is UTC; compare it on the clinic clock
+            "lead_minutes": (appointment_date - _clinic_time(created_at, timezone))
+            .astype("timedelta64[m]")
+            .astype(np.int64
+            ),
+        }
+        return cls(start_date, end_date, timezone, columns)
+
+    def status_mask(self, status):
+        return self.status == STATUSES.index(status)
+
+    def doctors(self):
+        """Sorted doctor ids present, and each row's index into them."""
+        return np.unique(self.doctor_id, return_inverse=True)
+
+    def dates(self):
+        return [self.start_date + timedelta(days=i) for i in range(self.days)]
+
+
+class ColumnarAnalyticsService:
+    """Vectorized appointment analytics over ``AppointmentColumns``.
+
+    An optional backend for ad-hoc analysis of long ranges: rows are read
+    once with a narrow query and every grouped count, rate, rolling window
+    and percentile is computed with NumPy instead of Python loops. Requires
+    NumPy; check ``available()`` first.
+    """
+
+    @staticmethod
+    def available():
+        return np is not None
+
+    @staticmethod
+    def load(start_date, end_date, doctor_id=None, timezone=None):
+        return AppointmentColumns.load(start_date, end_date, doctor_id, timezone)
+
+    @staticmethod
+    def appointment_metrics(columns):
+        """Same result as ``AnalyticsService.generate_appointment_metrics``."""
+        status_counts = np.bincount(columns.status, minlength=len(STATUSES))
+        total = len(columns)
+        completed = int(status_counts[STATUSES.index(AppointmentStatus.COMPLETED)])
+        cancelled = int(status_counts[STATUSES.index(AppointmentStatus.CANCELLED)])
+
+        return {
+            "total_appointments": total,
+            "scheduled_appointments": int(
+                status_counts[STATUSES.index(AppointmentStatus.SCHEDULED)]
+            ),
+            "confirmed_appointments": int(
+                status_counts[STATUSES.index(AppointmentStatus.CONFIRMED)]
+            ),
+            "completed_appointments": completed,
+            "cancelled_appointments": cancelled,
+            "unique_patients": int(len(np.unique(columns.patient_id))),
+            "completion_rate": float(_percentage(completed, total)),
+            "cancellation_rate": float(_percentage(cancelled, total)),
+        }
+
+    @staticmethod
+    def daily_counts(columns, status=None, by_doctor=False):
+        """Appointments per day, optionally only one status.
+
+        Returns an array of length ``columns.days``, or with ``by_doctor``
+        a ``(doctor_ids, counts)`` pair where ``counts`` has one row per
+        doctor id.
+        """
+        mask = columns.status_mask(status) if status else np.ones(len(columns), bool)
+        if not by_doctor:
+            return np.bincount(columns.day[mask], minlength=columns.days)
+
+        doctor_ids, doctor_index = columns.doctors()
+        cells = doctor_index[mask] * columns.days + columns.day[mask]
+        counts = np.bincount(cells, minlength=len(doctor_ids) * columns.days)
+        return doctor_ids, counts.reshape(len(doctor_ids), columns.days)
+
+    @staticmethod
+    def daily_rates(columns, status=AppointmentStatus.COMPLETED, by_doctor=False):
+        """Percentage of each day's appointments that have ``status``."""
+        if by_doctor:
+            doctor_ids, totals = ColumnarAnalyticsService.daily_counts(
+                columns, by_doctor=True
+            )
+            _, matching = ColumnarAnalyticsService.daily_counts(
+                columns, status, by_doctor=True
+            )
+            return doctor_ids, _percentage(matching, totals)
+
+        totals = ColumnarAnalyticsService.daily_counts(columns)
+        matching = ColumnarAnalyticsService.daily_counts(columns, status)
+        return _percentage(matching, totals)
+
+    @staticmethod
+    def rolling_mean(values, window=7):
+        """Trailing mean over ``window`` days along the last axis.
+
+        The first ``window - 1`` days average over the days available.
+        """
+        values = np.asarray(values, dtype=float)
+        cumulative = np.cumsum(values, axis=-1)
+        shifted = np.zeros_like(cumulative)
+        shifted[..., window:] = cumulative[..., :-window]
+        counts = np.minimum(np.arange(1, values.shape[-1] + 1), window)
+        return (cumulative - shifted) / counts
+
+    @staticmethod
+    def lead_time_percentiles(columns, percentiles=(50, 90, 95), by_doctor=False):
+        """Percentiles of booking lead time, in hours.
+
+        Returns ``{percentile: hours}``, or with ``by_doctor`` a dict of
+        those keyed by doctor id. Lead times are clipped at zero for
+        appointments recorded after they took place.
+        """
+        hours = np.maximum(columns.lead_minutes, 0) / 60
+
+        def summarize(values):
+            if not len(values):
+                return {p: None for p in percentiles}
+            return {
+                p: round(float(value), 2)
+                for p, value in zip(percentiles, np.percentile(values, percentiles))
+            }
+
+        if not by_doctor:
+            return summarize(hours)
+
+        doctor_ids, doctor_index = columns.doctors()
+        order = np.argsort(doctor_index, kind="stable")
+        splits = np.cumsum(np.bincount(doctor_index, minlength=len(doctor_ids)))[:-1]
+        return {
+            int(doctor_id): summarize(group)
+            for doctor_id, group in zip(doctor_ids, np.split(hours[order], splits))
+        }
+
+    @staticmethod
+    def doctor_daily_report(start_date, end_date, doctor_id=None, window=7):
+        """Per-doctor daily appointments, completion rates and rolling means."""
+        columns = ColumnarAnalyticsService.load(start_date, end_date, doctor_id)
+        doctor_ids, totals = ColumnarAnalyticsService.daily_counts(
+            columns, by_doctor=True
+        )
+        _, rates = ColumnarAnalyticsService.daily_rates(columns, by_doctor=True)
+        rolling = ColumnarAnalyticsService.rolling_mean(totals, window)
+        dates = [day.strftime("%Y-%m-%d") for day in columns.dates()]
+
+        return [
+            {
+                "doctor_id": int(doctor),
+                "dates": dates,
+                "appointments": totals[row].tolist(),
+                "completion_rate": rates[row].tolist(),
+                "rolling_appointments": np.round(rolling[row], 2).tolist(),
+            }
+            for row, doctor in enumerate(doctor_ids)
+        ]
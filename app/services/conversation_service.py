@@ -0,0 +1,282 @@
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import (
+    and_,
+    case,
+    delete,
+    event,
+    func,
+    insert,
+    inspect,
+    literal,
+    or_,
+    select,
+    union_all,
+    update,
+)
+from app import db
+from app.models.message import ConversationSummary, InternalMessage
+from app.models.user import User
+from app.utils.session_events import track_previous_values
+
+# Message attributes that decide whether it counts as unread
+UNREAD_ATTRIBUTES = ("is_read", "is_deleted_by_recipient")
+
+
+def _unread(message, previous=False):
+    """1 if the recipient has neither read nor deleted the message, else 0."""
+    values = []
+    for attribute in UNREAD_ATTRIBUTES:
+        history = inspect(message).attrs[attribute].history
+        if previous and history.deleted:
+            values.append(history.deleted[0])
+        else:
+            values.append(getattr(message, attribute))
+    return 0 if any(values) else 1
+
+
+def _summary_rows(user_id=None, peer_id=None):
+    """SELECT computing conversation summaries from ``internal_messages``.
+
+    Every message appears once for its sender and once for its recipient;
+    a window partitioned by ``(user_id, peer_id)`` picks the latest
+    message and sums the unread ones. Pass both ids to compute a single
+    conversation from the pair index.
+    """
+    unread = case(
+        (
+            and_(
+                InternalMessage.is_read == False,
+                InternalMessage.is_deleted_by_recipient == False,
+            ),
+            1,
+        ),
+        else_=0,
+    )
+    sent = select(
+        InternalMessage.sender_id.label("user_id"),
+        InternalMessage.recipient_id.label("peer_id"),
+        InternalMessage.id.label("message_id"),
+        InternalMessage.created_at.label("created_at"),
+        literal(0).label("unread"),
+    )
+    received = select(
+        InternalMessage.recipient_id,
+        InternalMessage.sender_id,
+        InternalMessage.id,
+        InternalMessage.created_at,
+        unread,
+    )
+    if user_id is not None:
+        sent = sent.where(
+            InternalMessage.sender_id == user_id, InternalMessage.recipient_id == peer_id
+        )
+        received = received.where(
+            InternalMessage.recipient_id == user_id, InternalMessage.sender_id == peer_id
+        )
+    sides = union_all(sent, received).subquery()
+
+    conversation = (sides.c.user_id, sides.c.peer_id)
+    ranked = select(
+        sides.c.user_id,
+        sides.c.peer_id,
+        sides.c.message_id,
+        sides.c.created_at,
+        func.row_number()
+        .over(
+            partition_by=conversation,
+            order_by=(sides.c.created_at.desc(), sides.c.message_id.desc()),
+        )
+        .label("position"),
+        func.sum(sides.c.unread).over(partition_by=conversation).label("unread_count"),
+    ).subquery()
+
+    return select(
+        ranked.c.user_id,
+        ranked.c.peer_id,
+        ranked.c.message_id.label("last_message_id"),
+        ranked.c.created_at.label("last_message_at"),
+        ranked.c.unread_count,
+    ).where(ranked.c.position == 1)
+
+
+def _insert_summaries(executor, rows):
+    """INSERT ... SELECT of computed summaries into ``conversation_summaries``."""
+    executor.execute(
+        insert(ConversationSummary.__table__).from_select(
+            ["user_id", "peer_id", "last_message_id", "last_message_at", "unread_count", "updated_at"],
+            rows.add_columns(literal(datetime.utcnow(), db.DateTime)),
+        )
+    )
+
+
+def _pair_filter(table, user_id, peer_id):
+    return (table.c.user_id == user_id, table.c.peer_id == peer_id)
+
+
+class ConversationService:
+    """Chat conversations of a user, one per message partner.
+
+    Conversations are read from ``conversation_summaries``, which the flush
+    listener keeps current in the same transaction as every message write:
+    new messages move the latest message forward and add to the
+    recipient's unread count, reads and deletions adjust the count, and a
+    conversation with no summary row yet (or with a hard-deleted message)
+    is recomputed from its messages.
+    """
+
+    @staticmethod
+    def register():
+        """Attach the flush listener to the database session (idempotent)."""
+        if event.contains(db.session, "after_flush", ConversationService._after_flush):
+            return
+
+        track_previous_values(InternalMessage, UNREAD_ATTRIBUTES)
+
+        event.listen(db.session, "after_flush", ConversationService._after_flush)
+
+    @staticmethod
+    def list_conversations(user_id):
+        """Every conversation of a user, most recent first.
+
+        Returns ``(peer, last_message, unread_count)`` tuples from one
+        range read of the user's summaries; the peer users are loaded by
+        the same query, so serializing the messages needs no further
+        lookups.
+        """
+        rows = db.session.execute(
+            select(User, InternalMessage, ConversationSummary.unread_count)
+            .join(ConversationSummary, ConversationSummary.peer_id == User.id)
+            .join(InternalMessage, InternalMessage.id == ConversationSummary.last_message_id)
+            .where(
+                ConversationSummary.user_id == user_id,
+                ConversationSummary.peer_id != user_id,
+            )
+            .order_by(
+                ConversationSummary.last_message_at.desc(),
+                ConversationSummary.last_message_id.desc(),
+            )
+        )
+        return [tuple(row) for row in rows]
+
+    @staticmethod
+    def unread_count(user_id):
+        """Messages the user has neither read nor deleted."""
+        return (
+            db.session.query(func.coalesce(func.sum(ConversationSummary.unread_count), 0))
+            .filter(ConversationSummary.user_id == user_id)
+            .scalar()
+        )
+
+    @staticmethod
+    def rebuild():
+        """Recompute every summary from the messages. Returns the row count."""
+        db.session.execute(delete(ConversationSummary.__table__))
+        _insert_summaries(db.session, _summary_rows())
+        db.session.commit()
+        return ConversationSummary.query.count()
+
+    @staticmethod
+    def check_consistency():
+        """Compare the stored summaries against a full recompute.
+
+        Returns a list of mismatches, each a dict naming the conversation,
+        the field and both values; a missing or extra row is reported with
+        ``None`` for the side that lacks it.
+        """
+        expected = {
+            (row.user_id, row.peer_id): row for row in db.session.execute(_summary_rows())
+        }
+        stored = {
+            (summary.user_id, summary.peer_id): summary
+            for summary in ConversationSummary.query
+        }
+
+        mismatches = []
+        for user_id, peer_id in sorted(set(expected) | set(stored)):
+            for field in ConversationSummary.SUMMARY_FIELDS:
+                expected_value = getattr(expected.get((user_id, peer_id)), field, None)
+                stored_value = getattr(stored.get((user_id, peer_id)), field, None)
+                if expected_value != stored_value:
+                    mismatches.append(
+                        {
+                            "user_id": user_id,
+                            "peer_id": peer_id,
+                            "field": field,
+                            "stored": stored_value,
+                            "expected": expected_value,
+                        }
+                    )
+        return mismatches
+
+    @staticmethod
+    def _refresh_pair(connection, user_id, peer_id):
+        """Recompute one conversation's summary from its messages."""
+        table = ConversationSummary.__table__
+        connection.execute(delete(table).where(*_pair_filter(table, user_id, peer_id)))
+        _insert_summaries(connection, _summary_rows(user_id, peer_id))
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        """Apply the flushed message changes to the affected summaries."""
+        latest = {}
+        unread = Counter()
+        refresh = set()
+
+        for obj in session.new:
+            if not isinstance(obj, InternalMessage):
+                continue
+            for pair in ((obj.sender_id, obj.recipient_id), (obj.recipient_id, obj.sender_id)):
+                current = latest.get(pair)
+                if current is None or (obj.created_at, obj.id) > (current.created_at, current.id):
+                    latest[pair] = obj
+            unread[(obj.recipient_id, obj.sender_id)] += _unread(obj)
+
+        for obj in session.dirty:
+            if isinstance(obj, InternalMessage):
+                delta = _unread(obj) - _unread(obj, previous=True)
+                if delta:
+                    unread[(obj.recipient_id, obj.sender_id)] += delta
+
+        for obj in session.deleted:
+            if isinstance(obj, InternalMessage):
+                refresh.update(
+                    [(obj.sender_id, obj.recipient_id), (obj.recipient_id, obj.sender_id)]
+                )
+
+        pairs = (set(latest) | {pair for pair, delta in unread.items() if delta}) - refresh
+        if not pairs and not refresh:
+            return
+
+        connection = session.connection()
+        table = ConversationSummary.__table__
+        now = datetime.utcnow()
+        for user_id, peer_id in pairs:
+            pair_filter = _pair_filter(table, user_id, peer_id)
+            values = {"updated_at": now}
+            if unread[(user_id, peer_id)]:
+                values["unread_count"] = table.c.unread_count + unread[(user_id, peer_id)]
+            if not connection.execute(update(table).where(*pair_filter).values(**values)).rowcount:
+                # First message of the conversation, or never summarized
+                refresh.add((user_id, peer_id))
+                continue
+
+            message = latest.get((user_id, peer_id))
+            if message is not None:
+                connection.execute(
+                    update(table)
+                    .where(
+                        *pair_filter,
+                        or_(
+                            table.c.last_message_at < message.created_at,
+                            and_(
+                                table.c.last_message_at == message.created_at,
+                                table.c.last_message_id < message.id,
+                            ),
+                        ),
+                    )
+                    .values(last_message_id=message.id, last_message_at=message.created_at)
+                )
+
+        for user_id, peer_id in refresh:
+            ConversationService._refresh_pair(connection, user_id, peer_id)
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import re
+from flask import current_app
+from sqlalchemy import event
+from app import db
+from app.models.medical_record import Consultation, Diagnosis
+
+# Built-in synonyms, folded into the configured DIAGNOSIS_SYNONYMS map
+DEFAULT_DIAGNOSIS_SYNONYMS = {
+    "URTI": "Upper respiratory tract infection",
+    "Common cold": "Upper respiratory tract infection",
+    "UTI": "Urinary tract infection",
+    "HTN": "Hypertension",
+    "High blood pressure": "Hypertension",
+    "T2DM": "Type 2 diabetes mellitus",
+    "DM type 2": "Type 2 diabetes mellitus",
+    "AGE": "Acute gastroenteritis",
+    "CAP": "Community-acquired pneumonia",
+    "GERD": "Gastroesophageal reflux disease",
+}
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Diagnosis ids by key hash, filled once the diagnoses looked up are committed
+_interned_codes = {}
+
+
+def normalize_assessment(text):
+    """Fold case and whitespace and trim surrounding punctuation."""
+    if not text:
+        return None
+    normalized = _WHITESPACE.sub(" ", text).strip(" .,;:-").lower()
+    return normalized or None
+
+
+def _key_hash(normalized):
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class DiagnosisService:
+    """Maps free-text assessments to interned ``diagnosis_code`` values.
+
+    Assessments are normalized, folded through the synonym map and looked
+    up in the ``diagnoses`` table, creating a new entry the first time a
+    diagnosis is seen. Codes are assigned whenever a consultation's
+    assessment is written, and ``backfill`` assigns them to older rows.
+    """
+
+    @staticmethod
+    def register():
+        """Attach the session listeners (idempotent)."""
+        if event.contains(db.session, "before_flush", DiagnosisService._before_flush):
+            return
+        event.listen(db.session, "before_flush", DiagnosisService._before_flush)
+        event.listen(db.session, "after_commit", DiagnosisService._after_commit)
+        event.listen(db.session, "after_rollback", DiagnosisService._after_rollback)
+
+    @staticmethod
+    def get_synonyms():
+        """Normalized synonym -> canonical display name map for the app."""
+        synonyms = current_app.extensions.get("diagnosis_synonyms")
+        if synonyms is not None:
+            return synonyms
+
+        configured = dict(DEFAULT_DIAGNOSIS_SYNONYMS)
+        configured.update(current_app.config.get("DIAGNOSIS_SYNONYMS") or {})
+        synonyms_file = current_app.config.get("DIAGNOSIS_SYNONYMS_FILE")
+        if synonyms_file:
+            with open(synonyms_file, encoding="utf-8") as f:
+                configured.update(json.load(f))
+
+        synonyms = {
+            normalize_assessment(synonym): canonical
+            for synonym, canonical in configured.items()
+            if normalize_assessment(synonym)
+        }
+        current_app.extensions["diagnosis_synonyms"] = synonyms
+        return synonyms
+
+    @staticmethod
+    def canonicalize(assessment):
+        """``(normalized_name, display_name)`` for an assessment, or None."""
+        normalized = normalize_assessment(assessment)
+        if normalized is None:
+            return None
+
+        canonical = DiagnosisService.get_synonyms().get(normalized)
+        if canonical:
+            return normalize_assessment(canonical), canonical
+        return normalized, _WHITESPACE.sub(" ", assessment).strip(" .,;:-")
+
+    @staticmethod
+    def lookup(assessment, session=None):
+        """The Diagnosis for an assessment, creating it if needed.
+
+        New diagnoses are added to the session and get their code when it
+        is flushed. Returns None for empty assessments.
+        """
+        session = session or db.session
+        canonical = DiagnosisService.canonicalize(assessment)
+        if canonical is None:
+            return None
+
+        normalized, display_name = canonical
+        key_hash = _key_hash(normalized)
+
+        code = _interned_codes.get(key_hash)
+        if code is not None:
+            diagnosis = session.get(Diagnosis, code)
+            if diagnosis is not None and diagnosis.key_hash == key_hash:
+                return diagnosis
+            # The code was deleted or now belongs to another diagnosis
+            _interned_codes.pop(key_hash, None)
+
+        # Diagnoses created earlier in the same flush are not queryable yet
+        pending = session.info.setdefault("pending_diagnoses", {})
+        if key_hash in pending:
+            return pending[key_hash]
+
+        with session.no_autoflush:
+            diagnosis = (
+                session.query(Diagnosis).filter(Diagnosis.key_hash == key_hash).first()
+            )
+        if diagnosis is None:
+            diagnosis = Diagnosis(
+                key_hash=key_hash, normalized_name=normalized, display_name=display_name
+            )
+            session.add(diagnosis)
+            pending[key_hash] = diagnosis
+
+        # The row may still be uncommitted; intern it only once it is not
+        session.info.setdefault("uncommitted_diagnoses", {})[key_hash] = diagnosis
+        return diagnosis
+
+    @staticmethod
+    def _before_flush(session, flush_context, instances):
+        """Assign diagnosis codes to consultations whose assessment changed."""
+        consultations = [obj for obj in session.new if isinstance(obj, Consultation)]
+        consultations.extend(
+            obj
+            for obj in session.dirty
+            if isinstance(obj, Consultation)
+            and db.inspect(obj).attrs.assessment.history.has_changes()
+        )
+
+        for consultation in consultations:
+            consultation.diagnosis = DiagnosisService.lookup(
+                consultation.assessment, session
+            )
+        session.info.pop("pending_diagnoses", None)
+
+    @staticmethod
+    def _after_commit(session):
+        """Intern the codes of the diagnoses the committed transaction used."""
+        for key_hash, diagnosis in session.info.pop("uncommitted_diagnoses", {}).items():
+            identity = db.inspect(diagnosis).identity
+            if identity is not None:
+                _interned_codes[key_hash] = identity[0]
+
+    @staticmethod
+    def _after_rollback(session):
+        session.info.pop("uncommitted_diagnoses", None)
+
+    @staticmethod
+    def backfill(recompute=False, batch_size=1000):
+        """Assign diagnosis codes to existing consultations.
+
+        Only consultations without a code are processed unless
+        ``recompute`` is set, e.g. after the synonym map changed. Each batch
+        is committed separately. Returns the number of consultations coded.
+        """
+        query = Consultation.query.filter(Consultation.assessment.isnot(None))
+        if not recompute:
+            query = query.filter(Consultation.diagnosis_code.is_(None))
+
+        updated = 0
+        last_id = 0
+        while True:
+            batch = (
+                query.filter(Consultation.id > last_id)
+                .order_by(Consultation.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                break
+
+            for consultation in batch:
+                diagnosis = DiagnosisService.lookup(consultation.assessment)
+                if consultation.diagnosis is not diagnosis:
+                    consultation.diagnosis = diagnosis
+                    updated += 1
+            last_id = batch[-1].id
+            db.session.commit()
+
+        return updated
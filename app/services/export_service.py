@@ -0,0 +1,355 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from enum import Enum
+from sqlalchemy import func
+from app import db
+from app.models.appointment import Appointment
+from app.models.medical_record import Consultation, Prescription
+from app.services.analytics_service import AnalyticsService, _date_bounds
+from app.utils.excel_export import StreamingWorkbook
+
+# Rows fetched from the database per round trip while streaming
+YIELD_PER = 1000
+
+# Columns included in each raw extract, keyed by dataset name
+EXPORT_DATASETS = {
+    "appointments": (
+        Appointment,
+        Appointment.appointment_date,
+        (
+            "id",
+            "patient_id",
+            "doctor_id",
+            "appointment_date",
+            "duration_minutes",
+            "appointment_type",
+            "status",
+            "chief_complaint",
+            "created_at",
+            "updated_at",
+            "confirmed_at",
+            "cancelled_at",
+            "cancellation_reason",
+        ),
+    ),
+    "consultations": (
+        Consultation,
+        Consultation.consultation_date,
+        (
+            "id",
+            "patient_id",
+            "doctor_id",
+            "appointment_id",
+            "consultation_date",
+            "status",
+            "chief_complaint",
+            "assessment",
+            "diagnosis_code",
+            "treatment_plan",
+            "created_at",
+            "updated_at",
+        ),
+    ),
+    "prescriptions": (
+        Prescription,
+        Prescription.prescribed_date,
+        (
+            "id",
+            "patient_id",
+            "doctor_id",
+            "consultation_id",
+            "medication_name",
+            "generic_name",
+            "dosage",
+            "frequency",
+            "duration",
+            "quantity",
+            "status",
+            "prescribed_date",
+            "start_date",
+            "end_date",
+            "created_at",
+        ),
+    ),
+}
+
+REPORT_TYPES = ("appointments", "prescriptions", "performance", "comprehensive")
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _export_value(value):
+    """Convert a column value to a plain, serializable value."""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _percentage(part, total):
+    """Share of ``part`` in ``total`` as a percentage rounded to 2 places."""
+    return round(part / total * 100, 2) if total > 0 else 0
+
+
+class ExportService:
+    """Excel report workbooks and row-level extracts of clinical tables.
+
+    Extracts stream in constant memory: rows are read with ``yield_per`` so
+    only one batch is held at a time, and are ordered by primary key. A
+    download that stops part-way can resume by passing the id of the last
+    complete row as ``after_id``.
+    """
+
+    @staticmethod
+    def get_columns(dataset):
+        """Column names exported for a dataset."""
+        if dataset not in EXPORT_DATASETS:
+            raise ValueError(f"Unknown export dataset: {dataset}")
+        return EXPORT_DATASETS[dataset][2]
+
+    @staticmethod
+    def _export_query(
+        dataset, columns, start_date=None, end_date=None, doctor_id=None, after_id=None
+    ):
+        """Query over a dataset's rows with the export filters applied."""
+        model, date_column, _ = EXPORT_DATASETS[dataset]
+
+        query = db.session.query(*columns)
+        if start_date and end_date:
+            range_start, range_end = _date_bounds(date_column, start_date, end_date)
+            query = query.filter(date_column >= range_start, date_column < range_end)
+        if doctor_id:
+            query = query.filter(model.doctor_id == doctor_id)
+        if after_id:
+            query = query.filter(model.id > after_id)
+        return query
+
+    @staticmethod
+    def count_rows(dataset, **filters):
+        """Number of rows an export with these filters will produce."""
+        ExportService.get_columns(dataset)
+        model = EXPORT_DATASETS[dataset][0]
+        return ExportService._export_query(
+            dataset, [func.count(model.id)], **filters
+        ).scalar()
+
+    @staticmethod
+    def iter_rows(dataset, **filters):
+        """Yield export rows as tuples ordered by id."""
+        columns = ExportService.get_columns(dataset)
+        model = EXPORT_DATASETS[dataset][0]
+
+        query = ExportService._export_query(
+            dataset, [getattr(model, column) for column in columns], **filters
+        )
+        rows = query.order_by(model.id).execution_options(yield_per=YIELD_PER)
+        for row in rows:
+            yield tuple(_export_value(value) for value in row)
+
+    @staticmethod
+    def stream_csv(dataset, include_header=True, **filters):
+        """Yield the extract as CSV text, one batch of rows per chunk."""
+        columns = ExportService.get_columns(dataset)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        if include_header:
+            writer.writerow(columns)
+
+        for index, row in enumerate(ExportService.iter_rows(dataset, **filters), 1):
+            writer.writerow(row)
+            if index % YIELD_PER == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    @staticmethod
+    def stream_ndjson(dataset, **filters):
+        """Yield the extract as newline-delimited JSON, one batch per chunk."""
+        columns = ExportService.get_columns(dataset)
+        lines = []
+
+        for row in ExportService.iter_rows(dataset, **filters):
+            lines.append(json.dumps(dict(zip(columns, row))))
+            if len(lines) == YIELD_PER:
+                yield "\n".join(lines) + "\n"
+                lines = []
+
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+    @staticmethod
+    def write_raw_export(dataset, fileobj, format_type="csv", progress=None, **filters):
+        """Write a full extract to a binary file, reporting percent done."""
+        total = ExportService.count_rows(dataset, **filters) if progress else 0
+        if format_type == "csv":
+            chunks = ExportService.stream_csv(dataset, **filters)
+        else:
+            chunks = ExportService.stream_ndjson(dataset, **filters)
+
+        for index, chunk in enumerate(chunks, 1):
+            fileobj.write(chunk.encode("utf-8"))
+            if progress and total:
+                progress(min(index * YIELD_PER * 100 // total, 99))
+
+    @staticmethod
+    def build_report_workbook(report_type, start_date, end_date, doctor_id=None, progress=None):
+        """Build the Excel workbook for one of ``REPORT_TYPES``.
+
+        ``progress`` is called with a percentage as sheets are completed.
+        """
+        report_progress = progress or (lambda percent: None)
+        workbook = StreamingWorkbook()
+
+        if report_type == "appointments":
+            # Create appointments-focused report
+            appointment_metrics = AnalyticsService.generate_appointment_metrics(
+                start_date, end_date, doctor_id
+            )
+            metrics_data = [
+                ("Total Appointments", appointment_metrics.get('total_appointments', 0)),
+                ("Completed Appointments", appointment_metrics.get('completed_appointments', 0)),
+                ("Scheduled Appointments", appointment_metrics.get('scheduled_appointments', 0)),
+                ("Confirmed Appointments", appointment_metrics.get('confirmed_appointments', 0)),
+                ("Cancelled Appointments", appointment_metrics.get('cancelled_appointments', 0)),
+                ("Completion Rate (%)", appointment_metrics.get('completion_rate', 0)),
+                ("Cancellation Rate (%)", appointment_metrics.get('cancellation_rate', 0)),
+                ("Unique Patients", appointment_metrics.get('unique_patients', 0)),
+            ]
+            workbook.add_sheet("Appointment Metrics", ["Metric", "Value"], metrics_data)
+            report_progress(50)
+
+            # Create daily breakdown sheet
+            timeseries = AnalyticsService.generate_timeseries(
+                start_date, end_date, "day", doctor_id
+            )
+            daily_rows = (
+                (
+                    daily_summary["start"],
+                    daily_summary.get("total_appointments", 0),
+                    daily_summary.get("completed_appointments", 0),
+                    daily_summary.get("cancelled_appointments", 0),
+                    _percentage(
+                        daily_summary.get("completed_appointments", 0),
+                        daily_summary.get("total_appointments", 0),
+                    ),
+                )
+                for daily_summary in timeseries
+            )
+            workbook.add_sheet(
+                "Daily Breakdown",
+                ["Date", "Total Appointments", "Completed", "Cancelled", "Completion Rate (%)"],
+                daily_rows,
+            )
+
+        elif report_type == "prescriptions":
+            # Create prescriptions-focused report
+            prescription_trends = AnalyticsService.generate_prescription_trends(
+                start_date, end_date, doctor_id, limit=100, exact=True
+            )
+            prescription_rows = (
+                (
+                    med.get('medication', ''),
+                    med.get('total_prescriptions', 0),
+                    med.get('unique_patients', 0),
+                    round(med.get('total_prescriptions', 0) / med['unique_patients'], 2)
+                    if med.get('unique_patients', 0) > 0
+                    else 0,
+                )
+                for med in prescription_trends
+            )
+            workbook.add_sheet(
+                "Prescription Trends",
+                ["Medication", "Total Prescriptions", "Unique Patients", "Average per Patient"],
+                prescription_rows,
+            )
+
+        elif report_type == "performance":
+            # Create performance-focused report
+            doctor_performance = AnalyticsService.generate_doctor_performance(
+                start_date, end_date, doctor_id
+            )
+            performance_rows = (
+                (
+                    doc.get('doctor_name', ''),
+                    doc.get('total_appointments', 0),
+                    doc.get('completed_appointments', 0),
+                    doc.get('cancelled_appointments', 0),
+                    doc.get('completion_rate', 0),
+                    doc.get('cancellation_rate', 0),
+                    doc.get('unique_patients', 0),
+                )
+                for doc in doctor_performance
+            )
+            workbook.add_sheet(
+                "Doctor Performance",
+                ["Doctor Name", "Total Appointments", "Completed", "Cancelled", "Completion Rate (%)", "Cancellation Rate (%)", "Unique Patients"],
+                performance_rows,
+            )
+
+        elif report_type == "comprehensive":
+            # Create comprehensive report with multiple sheets
+            appointment_metrics = AnalyticsService.generate_appointment_metrics(
+                start_date, end_date, doctor_id
+            )
+            metrics_data = [
+                ("Total Appointments", appointment_metrics.get('total_appointments', 0)),
+                ("Completed Appointments", appointment_metrics.get('completed_appointments', 0)),
+                ("Cancelled Appointments", appointment_metrics.get('cancelled_appointments', 0)),
+                ("Completion Rate (%)", appointment_metrics.get('completion_rate', 0)),
+                ("Cancellation Rate (%)", appointment_metrics.get('cancellation_rate', 0)),
+                ("Unique Patients", appointment_metrics.get('unique_patients', 0)),
+            ]
+            workbook.add_sheet("Appointments Summary", ["Metric", "Value"], metrics_data)
+            report_progress(33)
+
+            # Prescriptions Sheet
+            prescription_trends = AnalyticsService.generate_prescription_trends(
+                start_date, end_date, doctor_id, limit=50, exact=True
+            )
+            workbook.add_sheet(
+                "Top Prescriptions",
+                ["Medication", "Total Prescriptions", "Unique Patients"],
+                (
+                    (
+                        med.get('medication', ''),
+                        med.get('total_prescriptions', 0),
+                        med.get('unique_patients', 0),
+                    )
+                    for med in prescription_trends
+                ),
+            )
+            report_progress(66)
+
+            # Doctor Performance Sheet
+            doctor_performance = AnalyticsService.generate_doctor_performance(
+                start_date, end_date, doctor_id
+            )
+            workbook.add_sheet(
+                "Doctor Performance",
+                ["Doctor Name", "Total Appointments", "Completed", "Completion Rate (%)", "Unique Patients"],
+                (
+                    (
+                        doc.get('doctor_name', ''),
+                        doc.get('total_appointments', 0),
+                        doc.get('completed_appointments', 0),
+                        doc.get('completion_rate', 0),
+                        doc.get('unique_patients', 0),
+                    )
+                    for doc in doctor_performance
+                ),
+            )
+
+        else:
+            raise ValueError(f"Unknown report type: {report_type}")
+
+        return workbook
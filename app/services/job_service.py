@@ -0,0 +1,241 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app, g
+from app import db
+from app.models.report_job import ReportJob, JobStatus
+from app.services.export_service import ExportService, EXPORT_FORMATS
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(app):
+    """The process-wide worker pool, created on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config.get("REPORT_JOB_WORKERS", 2),
+                thread_name_prefix="report-job",
+            )
+    return _executor
+
+
+def _artifact_dir(app):
+    """Directory holding finished job artifacts."""
+    directory = app.config.get("REPORT_JOB_DIR") or os.path.join(
+        app.instance_path, "report_jobs"
+    )
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def _job_key(job_type, params, user):
+    """Hash identifying identical requests that may share one job.
+
+    Admins share jobs with each other; everyone else only with themselves,
+    since they may only download their own jobs.
+    """
+    scope = "admin" if user.role == "admin" else f"user:{user.id}"
+    payload = json.dumps([job_type, params, scope], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+
+
+def _run_report(job, params, progress):
+    """Generate an Excel report workbook."""
+    app = current_app._get_current_object()
+    workbook = ExportService.build_report_workbook(
+        params["report_type"],
+        _parse_date(params["start_date"]),
+        _parse_date(params["end_date"]),
+        params.get("doctor_id"),
+        progress=lambda percent: progress(percent * 9 // 10),
+    )
+
+    path = os.path.join(_artifact_dir(app), f"{job.id}.xlsx")
+    workbook.save(path)
+
+    job.artifact_path = path
+    job.artifact_name = (
+        f"{params['report_type']}_report_{params['start_date']}_{params['end_date']}.xlsx"
+    )
+    job.content_type = XLSX_CONTENT_TYPE
+
+
+def _run_raw_export(job, params, progress):
+    """Write a row-level CSV or NDJSON extract."""
+    app = current_app._get_current_object()
+    format_type = params["format"]
+    path = os.path.join(_artifact_dir(app), f"{job.id}.{format_type}")
+
+    with open(path, "wb") as output:
+        ExportService.write_raw_export(
+            params["dataset"],
+            output,
+            format_type=format_type,
+            progress=progress,
+            start_date=_parse_date(params.get("start_date")),
+            end_date=_parse_date(params.get("end_date")),
+            doctor_id=params.get("doctor_id"),
+            after_id=params.get("after_id"),
+        )
+
+    job.artifact_path = path
+    job.artifact_name = f"{params['dataset']}_export.{format_type}"
+    job.content_type = EXPORT_FORMATS[format_type]
+
+
+# Job types and the functions that produce their artifacts
+JOB_HANDLERS = {
+    "report": _run_report,
+    "raw_export": _run_raw_export,
+}
+
+
+class JobService:
+    """Runs report and export generation off the request thread.
+
+    Jobs are stored in ``report_jobs`` and executed by a thread pool in the
+    web process. Requests return the job id immediately; clients poll the
+    status endpoint and fetch the artifact once the job has completed.
+    """
+
+    @staticmethod
+    def submit(job_type, params, user):
+        """Queue a job, or return the active job for an identical request.
+
+        Returns ``(job, created)``. ``params`` must be JSON serializable.
+        """
+        if job_type not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job type: {job_type}")
+
+        JobService.expire_stale_jobs()
+
+        job_key = _job_key(job_type, params, user)
+        existing = (
+            ReportJob.query.filter(
+                ReportJob.job_key == job_key,
+                ReportJob.status.in_([JobStatus.PENDING, JobStatus.RUNNING]),
+            )
+            .order_by(ReportJob.created_at.desc())
+            .first()
+        )
+        if existing:
+            return existing, False
+
+        job = ReportJob(
+            id=uuid.uuid4().hex,
+            job_key=job_key,
+            job_type=job_type,
+            params=json.dumps(params, sort_keys=True),
+            requested_by=user.id,
+            message="Waiting to start",
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        app = current_app._get_current_object()
+        if app.config.get("REPORT_JOB_WORKERS", 2) > 0:
+            _get_executor(app).submit(JobService._execute, app, job.id)
+        else:
+            JobService._execute(app, job.id)
+            db.session.refresh(job)
+
+        return job, True
+
+    @staticmethod
+    def _execute(app, job_id):
+        """Run a job in its own application context and record the outcome."""
+        with app.app_context():
+            job = db.session.get(ReportJob, job_id)
+            if job is None or job.status != JobStatus.PENDING:
+                return
+
+            params = job.parameters
+            g.user_timezone = params.get("timezone")
+
+            job.status = JobStatus.RUNNING
+            job.started_at = datetime.utcnow()
+            job.message = "Running"
+            db.session.commit()
+
+            def progress(percent):
+                if percent != job.progress:
+                    job.progress = percent
+                    db.session.commit()
+
+            try:
+                JOB_HANDLERS[job.job_type](job, params, progress)
+                job.status = JobStatus.COMPLETED
+                job.progress = 100
+                job.message = "Completed"
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f"Report job {job_id} failed: {e}")
+                job.status = JobStatus.FAILED
+                job.message = "Failed"
+                job.error = str(e)
+
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+
+    @staticmethod
+    def get_job(job_id, user):
+        """A job the user may see: admins see all jobs, others their own."""
+        job = db.session.get(ReportJob, job_id)
+        if job is None:
+            return None
+        if user.role != "admin" and job.requested_by != user.id:
+            return None
+        return job
+
+    @staticmethod
+    def expire_stale_jobs():
+        """Fail active jobs that stopped reporting progress.
+
+        A job left pending or running by a worker that was restarted would
+        otherwise block identical requests forever.
+        """
+        timeout = current_app.config.get("REPORT_JOB_TIMEOUT_MINUTES", 30)
+        cutoff = datetime.utcnow() - timedelta(minutes=timeout)
+        stale = ReportJob.query.filter(
+            ReportJob.status.in_([JobStatus.PENDING, JobStatus.RUNNING]),
+            ReportJob.updated_at < cutoff,
+        ).all()
+        for job in stale:
+            job.status = JobStatus.FAILED
+            job.message = "Failed"
+            job.error = "Job was interrupted before it finished"
+            job.finished_at = datetime.utcnow()
+        if stale:
+            db.session.commit()
+        return len(stale)
+
+    @staticmethod
+    def prune_jobs(older_than_hours=None):
+        """Delete finished jobs and their artifacts past the retention period."""
+        if older_than_hours is None:
+            older_than_hours = current_app.config.get("REPORT_JOB_RETENTION_HOURS", 24)
+        cutoff = datetime.utcnow() - timedelta(hours=older_than_hours)
+
+        jobs = ReportJob.query.filter(
+            ReportJob.status.in_([JobStatus.COMPLETED, JobStatus.FAILED]),
+            ReportJob.finished_at < cutoff,
+        ).all()
+        for job in jobs:
+            if job.artifact_path and os.path.exists(job.artifact_path):
+                os.remove(job.artifact_path)
+            db.session.delete(job)
+        db.session.commit()
+        return len(jobs)
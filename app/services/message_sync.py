@@ -0,0 +1,234 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event, func, insert, inspect, update
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models.message import InternalMessage, MessageEvent, MessageSyncState
+from app.utils.session_events import track_previous_values
+
+# Message attributes whose changes are logged
+LOGGED_ATTRIBUTES = ("is_read", "is_deleted_by_sender", "is_deleted_by_recipient")
+
+# Most events replayed by one sync call
+MAX_SYNC_BATCH = 500
+
+
+def _flag_change(message, attribute):
+    """``(before, after)`` values of a flag changed by this flush, else None."""
+    history = inspect(message).attrs[attribute].history
+    if not history.added:
+        return None
+    before = history.deleted[0] if history.deleted else None
+    after = history.added[0]
+    return None if bool(before) == bool(after) else (before, after)
+
+
+def _deleted_for(message, user_id):
+    """Whether the user has deleted the message from their own view."""
+    if message.recipient_id == user_id and message.is_deleted_by_recipient:
+        return True
+    return message.sender_id == user_id and message.is_deleted_by_sender
+
+
+def _pruned_through():
+    """Highest event id removed by pruning, 0 if nothing was pruned."""
+    pruned_through = (
+        db.session.query(MessageSyncState.pruned_through)
+        .filter(MessageSyncState.id == MessageSyncState.ROW_ID)
+        .scalar()
+    )
+    return pruned_through or 0
+
+
+def _lock_event_log(connection, now):
+    """Hold the sync state row's lock until the transaction ends.
+
+    Transactions that log events take turns from here to their commit, so
+    event ids become visible in id order and a client's token can never
+    pass an id that is still uncommitted. SQLite serializes writers anyway.
+    """
+    table = MessageSyncState.__table__
+    locked = connection.execute(
+        update(table)
+        .where(table.c.id == MessageSyncState.ROW_ID)
+        .values(last_logged_at=now)
+    ).rowcount
+    if not locked:
+        # Tables created by db.create_all() start without the row
+        connection.execute(
+            insert(table).values(
+                id=MessageSyncState.ROW_ID, pruned_through=0, last_logged_at=now
+            )
+        )
+
+
+def parse_sync_token(token):
+    """Event id from a sync token; raises ValueError if malformed."""
+    event_id = int(token)
+    if event_id < 0:
+        raise ValueError(f"Invalid sync token '{token}'")
+    return event_id
+
+
+class MessageSyncService:
+    """Per-user change log of messages for incremental inbox sync.
+
+    Every message write appends ``message_events`` rows for the users
+    whose view changed: both participants when a message is sent or its
+    read state changes, only the deleting side when a user deletes it.
+    A client keeps the id of the last event it has seen as its sync token
+    and asks for the events after it, so polling costs grow with the
+    number of changes rather than the size of the mailbox. Event ids are
+    assigned in commit order (see ``_lock_event_log``), so no event can
+    appear behind a token already handed out.
+    """
+
+    @staticmethod
+    def register():
+        """Attach the flush listener to the database session (idempotent)."""
+        if event.contains(db.session, "after_flush", MessageSyncService._after_flush):
+            return
+
+        track_previous_values(InternalMessage, LOGGED_ATTRIBUTES)
+
+        event.listen(db.session, "after_flush", MessageSyncService._after_flush)
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        """Log the flushed message changes for each affected user."""
+        events = set()
+
+        for obj in session.new:
+            if isinstance(obj, InternalMessage):
+                for user_id in (obj.sender_id, obj.recipient_id):
+                    events.add((user_id, obj.id, MessageEvent.CREATED))
+
+        for obj in session.dirty:
+            if not isinstance(obj, InternalMessage):
+                continue
+            if _flag_change(obj, "is_read"):
+                for user_id in (obj.sender_id, obj.recipient_id):
+                    events.add((user_id, obj.id, MessageEvent.READ))
+            if _flag_change(obj, "is_deleted_by_sender"):
+                events.add((obj.sender_id, obj.id, MessageEvent.DELETED))
+            if _flag_change(obj, "is_deleted_by_recipient"):
+                events.add((obj.recipient_id, obj.id, MessageEvent.DELETED))
+
+        for obj in session.deleted:
+            if isinstance(obj, InternalMessage):
+                for user_id in (obj.sender_id, obj.recipient_id):
+                    events.add((user_id, obj.id, MessageEvent.DELETED))
+
+        if not events:
+            return
+
+        now = datetime.utcnow()
+        _lock_event_log(session.connection(), now)
+        session.connection().execute(
+            insert(MessageEvent.__table__),
+            [
+                {"user_id": user_id, "message_id": message_id, "kind": kind, "created_at": now}
+                for user_id, message_id, kind in sorted(events)
+            ],
+        )
+
+    @staticmethod
+    def current_token():
+        """Sync token positioned after every event logged so far."""
+        latest = db.session.query(func.coalesce(func.max(MessageEvent.id), 0)).scalar()
+        pruned_through = _pruned_through()
+        return str(max(latest, pruned_through))
+
+    @staticmethod
+    def changes(user_id, token, limit=MAX_SYNC_BATCH):
+        """A user's message changes after a sync token.
+
+        Events are folded per message: ``created`` holds messages new to
+        the user, ``read`` messages the user already had whose read state
+        changed, and ``deleted`` the ids of messages the user should drop
+        (tombstones). Returns those with the next ``sync_token`` and
+        ``has_more`` when the batch was cut at ``limit`` events. When the
+        token predates pruned events, only ``reset`` and a fresh token are
+        returned and the client should reload its mailbox.
+        """
+        since = parse_sync_token(token)
+        pruned_through = _pruned_through()
+        if since < pruned_through:
+            return {"reset": True, "sync_token": MessageSyncService.current_token()}
+
+        events = (
+            MessageEvent.query.filter(
+                MessageEvent.user_id == user_id, MessageEvent.id > since
+            )
+            .order_by(MessageEvent.id)
+            .limit(limit + 1)
+            .all()
+        )
+        has_more = len(events) > limit
+        events = events[:limit]
+
+        kinds = {}
+        for change in events:
+            kinds.setdefault(change.message_id, set()).add(change.kind)
+
+        live_ids = [
+            message_id for message_id, seen in kinds.items() if MessageEvent.DELETED not in seen
+        ]
+        messages = {}
+        if live_ids:
+            messages = {
+                message.id: message
+                for message in InternalMessage.query.options(
+                    joinedload(InternalMessage.sender),
+                    joinedload(InternalMessage.recipient),
+                ).filter(InternalMessage.id.in_(live_ids))
+            }
+
+        created, read, deleted = [], [], []
+        for message_id, seen in kinds.items():
+            message = messages.get(message_id)
+            if message is None or _deleted_for(message, user_id):
+                deleted.append(message_id)
+            elif MessageEvent.CREATED in seen:
+                created.append(message)
+            else:
+                read.append(message)
+
+        return {
+            "reset": False,
+            "created": created,
+            "read": read,
+            "deleted": deleted,
+            "sync_token": str(events[-1].id) if events else str(since),
+            "has_more": has_more,
+        }
+
+    @staticmethod
+    def prune(older_than_days=None):
+        """Delete events past the retention period. Returns the number removed.
+
+        The highest removed id is recorded so tokens older than it are
+        told to reset instead of silently missing changes.
+        """
+        if older_than_days is None:
+            older_than_days = current_app.config.get("MESSAGE_EVENT_RETENTION_DAYS", 30)
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+
+        pruned_through = (
+            db.session.query(func.max(MessageEvent.id))
+            .filter(MessageEvent.created_at < cutoff)
+            .scalar()
+        )
+        if pruned_through is None:
+            return 0
+
+        removed = MessageEvent.query.filter(MessageEvent.id <= pruned_through).delete(
+            synchronize_session=False
+        )
+        state = db.session.get(MessageSyncState, MessageSyncState.ROW_ID)
+        if state is None:
+            state = MessageSyncState(id=MessageSyncState.ROW_ID)
+            db.session.add(state)
+        state.pruned_through = pruned_through
+        db.session.commit()
+        return removed
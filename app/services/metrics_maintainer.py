@@ -0,0 +1,335 @@
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import event, inspect, select, update, insert, func
+from app import db
+from app.models.appointment import Appointment
+from app.models.medical_record import (
+    Consultation,
+    Prescription,
+    ConsultationStatus,
+)
+from app.models.user import User
+from app.models.daily_metric import DailyMetric, MetricCounter
+from app.services.analytics_service import AnalyticsService, _distinct_patient_columns
+from app.utils.session_events import track_previous_values
+from app.utils.timezone_utils import (
+    get_local_date_bounds,
+    get_reporting_timezone,
+    localize_datetime,
+)
+
+
+# Attributes whose previous values are needed to compute deltas
+TRACKED_ATTRIBUTES = {
+    Appointment: ("appointment_date", "doctor_id", "patient_id", "status"),
+    Consultation: ("consultation_date", "doctor_id", "status"),
+    Prescription: ("prescribed_date", "doctor_id"),
+    User: ("created_at", "role"),
+}
+
+# System-wide running totals kept in ``metric_counters``
+SYSTEM_COUNTERS = {
+    Appointment: "appointments",
+    Consultation: "consultations",
+    Prescription: "prescriptions",
+}
+
+
+def _value(obj, attribute, previous):
+    """Read an attribute's current value, or its value before the flush."""
+    if previous:
+        history = inspect(obj).attrs[attribute].history
+        if history.deleted:
+            return history.deleted[0]
+    return getattr(obj, attribute)
+
+
+class MetricsMaintainer:
+    """Keeps ``daily_metrics`` and ``metric_counters`` current on every flush.
+
+    Inserts, status changes and deletes of appointments, consultations,
+    prescriptions and patient accounts are turned into +1/-1 deltas that are
+    applied to the affected rollup rows in the same transaction. Days that
+    have never been rolled up are skipped; ``flask refresh-daily-metrics``
+    fills those in.
+    """
+
+    @staticmethod
+    def register():
+        """Attach the flush listener to the database session (idempotent)."""
+        if event.contains(db.session, "after_flush", MetricsMaintainer._after_flush):
+            return
+
+        for model, attributes in TRACKED_ATTRIBUTES.items():
+            track_previous_values(model, attributes)
+
+        event.listen(db.session, "after_flush", MetricsMaintainer._after_flush)
+
+    @staticmethod
+    def _contributions(obj, previous=False):
+        """Rollup counters a row adds to, as (metric_date, doctor_id, field) keys."""
+        if isinstance(obj, Appointment):
+            when = _value(obj, "appointment_date", previous)
+            status = _value(obj, "status", previous)
+            fields = ["total_appointments"]
+            if status is not None:
+                fields.append(f"{status.value}_appointments")
+        elif isinstance(obj, Consultation):
+            when = _value(obj, "consultation_date", previous)
+            fields = ["total_consultations"]
+            if _value(obj, "status", previous) == ConsultationStatus.COMPLETED:
+                fields.append("completed_consultations")
+        elif isinstance(obj, Prescription):
+            when = _value(obj, "prescribed_date", previous)
+            fields = ["total_prescriptions"]
+        elif isinstance(obj, User):
+            # New patient registrations are only tracked facility-wide
+            if _value(obj, "role", previous) != "patient":
+                return []
+            when = _value(obj, "created_at", previous)
+            if when is None:
+                return []
+            return [(MetricsMaintainer._local_date(when), None, "new_patients")]
+        else:
+            return []
+
+        if when is None:
+            return []
+
+        if isinstance(obj, Appointment):
+            # Appointment times are stored as local wall time already
+            day = when.date()
+        else:
+            day = MetricsMaintainer._local_date(when)
+        doctor_id = _value(obj, "doctor_id", previous)
+        keys = []
+        for field in fields:
+            keys.append((day, None, field))
+            if doctor_id is not None:
+                keys.append((day, doctor_id, field))
+        return keys
+
+    @staticmethod
+    def _local_date(when):
+        """Reporting-timezone date of a naive UTC datetime."""
+        return localize_datetime(when, get_reporting_timezone()).date()
+
+    @staticmethod
+    def _appointment_key(obj, previous=False):
+        """The (day, doctor) slice whose distinct patient counts a row affects."""
+        when = _value(obj, "appointment_date", previous)
+        if when is None:
+            return None
+        return (
+            when.date(),
+            _value(obj, "doctor_id", previous),
+            _value(obj, "patient_id", previous),
+            _value(obj, "status", previous),
+        )
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        """Translate the flushed changes into rollup and counter deltas."""
+        deltas = Counter()
+        counter_deltas = Counter()
+        distinct_keys = set()
+
+        for obj in session.new:
+            if type(obj) not in TRACKED_ATTRIBUTES:
+                continue
+            deltas.update(MetricsMaintainer._contributions(obj))
+            if type(obj) in SYSTEM_COUNTERS:
+                counter_deltas[SYSTEM_COUNTERS[type(obj)]] += 1
+            if isinstance(obj, Appointment):
+                distinct_keys.add(MetricsMaintainer._appointment_key(obj))
+
+        for obj in session.dirty:
+            if type(obj) not in TRACKED_ATTRIBUTES:
+                continue
+            deltas.update(MetricsMaintainer._contributions(obj))
+            deltas.subtract(MetricsMaintainer._contributions(obj, previous=True))
+            if isinstance(obj, Appointment):
+                current = MetricsMaintainer._appointment_key(obj)
+                before = MetricsMaintainer._appointment_key(obj, previous=True)
+                if current != before:
+                    distinct_keys.update([current, before])
+
+        for obj in session.deleted:
+            if type(obj) not in TRACKED_ATTRIBUTES:
+                continue
+            deltas.subtract(MetricsMaintainer._contributions(obj, previous=True))
+            if type(obj) in SYSTEM_COUNTERS:
+                counter_deltas[SYSTEM_COUNTERS[type(obj)]] -= 1
+            if isinstance(obj, Appointment):
+                distinct_keys.add(MetricsMaintainer._appointment_key(obj, previous=True))
+
+        distinct_keys.discard(None)
+        if not any(deltas.values()) and not any(counter_deltas.values()) and not distinct_keys:
+            return
+
+        connection = session.connection()
+        MetricsMaintainer._apply_deltas(connection, deltas)
+        MetricsMaintainer._refresh_distinct_counts(connection, distinct_keys)
+        MetricsMaintainer._apply_counter_deltas(connection, counter_deltas)
+
+    @staticmethod
+    def _row_filter(table, day, doctor_id):
+        """WHERE clause selecting one rollup row."""
+        if doctor_id is None:
+            return (table.c.metric_date == day, table.c.doctor_id.is_(None))
+        return (table.c.metric_date == day, table.c.doctor_id == doctor_id)
+
+    @staticmethod
+    def _apply_deltas(connection, deltas):
+        """Add field deltas to their rollup rows, creating doctor rows as needed."""
+        table = DailyMetric.__table__
+        grouped = {}
+        for (day, doctor_id, field), delta in deltas.items():
+            if delta:
+                grouped.setdefault((day, doctor_id), {})[field] = delta
+
+        now = datetime.utcnow()
+        for (day, doctor_id), fields in grouped.items():
+            result = connection.execute(
+                update(table)
+                .where(*MetricsMaintainer._row_filter(table, day, doctor_id))
+                .values(
+                    refreshed_at=now,
+                    **{field: table.c[field] + delta for field, delta in fields.items()},
+                )
+            )
+            if result.rowcount or doctor_id is None:
+                continue
+
+            # A doctor's first activity on a day that is already rolled up
+            covered = connection.execute(
+                select(table.c.id).where(
+                    *MetricsMaintainer._row_filter(table, day, None)
+                )
+            ).first()
+            if covered:
+                connection.execute(
+                    insert(table).values(
+                        metric_date=day, doctor_id=doctor_id, refreshed_at=now, **fields
+                    )
+                )
+
+    @staticmethod
+    def _refresh_distinct_counts(connection, distinct_keys):
+        """Recount distinct patients for the day slices touched by the flush.
+
+        Distinct counts cannot be maintained with +1/-1 deltas, so each
+        affected (day, doctor) row and its facility-wide row are recounted
+        from the appointments of that single day.
+        """
+        table = DailyMetric.__table__
+        slices = set()
+        for day, doctor_id, _, _ in distinct_keys:
+            slices.add((day, None))
+            if doctor_id is not None:
+                slices.add((day, doctor_id))
+
+        for day, doctor_id in slices:
+            day_start, day_end = get_local_date_bounds(day)
+            query = select(*_distinct_patient_columns()).where(
+                Appointment.appointment_date >= day_start,
+                Appointment.appointment_date < day_end,
+            )
+            if doctor_id is not None:
+                query = query.where(Appointment.doctor_id == doctor_id)
+            counts = connection.execute(query).one()
+
+            connection.execute(
+                update(table)
+                .where(*MetricsMaintainer._row_filter(table, day, doctor_id))
+                .values(
+                    unique_patients=counts.unique_patients,
+                    unique_patients_seen=counts.unique_patients_seen,
+                )
+            )
+
+    @staticmethod
+    def _apply_counter_deltas(connection, counter_deltas):
+        """Add deltas to the system-wide counters that have been initialised."""
+        table = MetricCounter.__table__
+        for name, delta in counter_deltas.items():
+            if delta:
+                connection.execute(
+                    update(table)
+                    .where(table.c.name == name)
+                    .values(value=table.c.value + delta, updated_at=datetime.utcnow())
+                )
+
+    @staticmethod
+    def _count_totals():
+        """Full COUNT(*) of every table with a system-wide counter."""
+        return {
+            name: db.session.query(func.count(model.id)).scalar()
+            for model, name in SYSTEM_COUNTERS.items()
+        }
+
+    @staticmethod
+    def rebuild_counters():
+        """Recompute the system-wide counters from the raw tables."""
+        for name, value in MetricsMaintainer._count_totals().items():
+            counter = db.session.get(MetricCounter, name)
+            if counter is None:
+                counter = MetricCounter(name=name)
+                db.session.add(counter)
+            counter.value = value
+        db.session.commit()
+
+    @staticmethod
+    def check_consistency(start_date, end_date):
+        """Compare the stored rollup and counters against a full recompute.
+
+        Only days that have been rolled up are compared. Returns a list of
+        mismatches, each a dict naming the row, the field and both values.
+        """
+        expected = {
+            (metric.metric_date, metric.doctor_id): metric
+            for metric in AnalyticsService.compute_daily_metrics(start_date, end_date)
+        }
+        stored = {
+            (metric.metric_date, metric.doctor_id): metric
+            for metric in DailyMetric.query.filter(
+                DailyMetric.metric_date >= start_date,
+                DailyMetric.metric_date <= end_date,
+            )
+        }
+        covered_days = {day for day, doctor_id in stored if doctor_id is None}
+
+        mismatches = []
+        for day, doctor_id in sorted(
+            set(expected) | set(stored), key=lambda key: (key[0], key[1] or 0)
+        ):
+            if day not in covered_days:
+                continue
+            for field in DailyMetric.COUNT_FIELDS:
+                expected_value = getattr(expected.get((day, doctor_id)), field, 0)
+                stored_value = getattr(stored.get((day, doctor_id)), field, 0)
+                if expected_value != stored_value:
+                    mismatches.append(
+                        {
+                            "date": day.strftime("%Y-%m-%d"),
+                            "doctor_id": doctor_id,
+                            "field": field,
+                            "stored": stored_value,
+                            "expected": expected_value,
+                        }
+                    )
+
+        counters = MetricCounter.get_values(list(SYSTEM_COUNTERS.values())) or {}
+        for name, expected_value in MetricsMaintainer._count_totals().items():
+            if name in counters and counters[name] != expected_value:
+                mismatches.append(
+                    {
+                        "date": None,
+                        "doctor_id": None,
+                        "field": name,
+                        "stored": counters[name],
+                        "expected": expected_value,
+                    }
+                )
+
+        return mismatches
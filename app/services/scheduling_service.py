@@ -0,0 +1,171 @@
+from datetime import datetime, time, timedelta
+from sqlalchemy import select
+from app import db
+from app.models.appointment import Appointment
+from app.utils.intervals import IntervalIndex
+
+
+def _busy_spans(index):
+    """Disjoint ``[start, end]`` lists covering an index's intervals, in order."""
+    spans = []
+    for start, end, _ in index.intervals:
+        if spans and start <= spans[-1][1]:
+            spans[-1][1] = max(spans[-1][1], end)
+        else:
+            spans.append([start, end])
+    return spans
+
+
+def _working_window(day):
+    start_hour, end_hour = Appointment.WORKING_HOURS
+    return (
+        datetime.combine(day, time(hour=start_hour)),
+        datetime.combine(day, time(hour=end_hour)),
+    )
+
+
+class SchedulingService:
+    """Bulk overlap checks against doctors' booked appointments.
+
+    The busy intervals of every doctor involved are read with one query on
+    ``ix_appointments_doctor_end`` and held in an ``IntervalIndex`` per
+    doctor, so each proposed slot is answered by bisection instead of a
+    query or a scan of the doctor's appointments.
+    """
+
+    @staticmethod
+    def busy_intervals(doctor_ids, start, end, exclude_appointment_id=None):
+        """Active appointments overlapping ``[start, end)`` for each doctor.
+
+        Returns ``{doctor_id: IntervalIndex}`` with the appointment id as
+        each interval's key; doctors with nothing booked get an empty index.
+        """
+        doctor_ids = set(doctor_ids)
+        query = select(
+            Appointment.doctor_id,
+            Appointment.appointment_date,
+            Appointment.end_time,
+            Appointment.id,
+        ).where(
+            Appointment.doctor_id.in_(doctor_ids),
+            Appointment.end_time > start,
+            Appointment.appointment_date < end,
+            Appointment.status.in_(Appointment.ACTIVE_STATUSES),
+        )
+        if exclude_appointment_id:
+            query = query.where(Appointment.id != exclude_appointment_id)
+
+        intervals = {doctor_id: [] for doctor_id in doctor_ids}
+        for doctor_id, appointment_start, appointment_end, appointment_id in db.session.execute(
+            query
+        ):
+            intervals[doctor_id].append((appointment_start, appointment_end, appointment_id))
+
+        return {
+            doctor_id: IntervalIndex(doctor_intervals)
+            for doctor_id, doctor_intervals in intervals.items()
+        }
+
+    @staticmethod
+    def check_slots(slots, exclude_appointment_id=None):
+        """Conflicts of many proposed slots, checked with one query.
+
+        ``slots`` is a list of ``(doctor_id, start, duration_minutes)``
+        tuples. Returns, in the same order, the ids of the active
+        appointments each slot overlaps; an empty list means the slot is
+        free. Slots are checked against booked appointments only, not
+        against each other.
+        """
+        slots = [
+            (doctor_id, start, start + timedelta(minutes=duration_minutes))
+            for doctor_id, start, duration_minutes in slots
+        ]
+        if not slots:
+            return []
+
+        busy = SchedulingService.busy_intervals(
+            {doctor_id for doctor_id, _, _ in slots},
+            min(start for _, start, _ in slots),
+            max(end for _, _, end in slots),
+            exclude_appointment_id,
+        )
+        return [busy[doctor_id].overlapping(start, end) for doctor_id, start, end in slots]
+
+    @staticmethod
+    def available_slots(
+        doctor_ids,
+        start_date,
+        end_date,
+        duration_minutes=30,
+        not_before=None,
+        limit=None,
+        per_doctor=None,
+        exclude_appointment_id=None,
+    ):
+        """Free slots of many doctors over an inclusive date range, ranked.
+
+        Candidate slots follow ``Appointment.get_available_slots``: steps of
+        ``duration_minutes`` from the start of ``Appointment.WORKING_HOURS``
+        that end by its close. Busy intervals for every doctor and day come
+        from one query; each doctor's are merged into disjoint spans and
+        swept alongside the slot grid, so the cost is linear in slots plus
+        appointments.
+
+        Returns ``{"doctor_id", "start", "end", "booked_minutes"}`` dicts
+        ranked by start time, then by the minutes the doctor already has
+        booked that day (least busy first), then doctor id. ``not_before``
+        drops slots starting earlier, ``per_doctor`` keeps each doctor's
+        first slots only and ``limit`` truncates the ranking.
+        """
+        doctor_ids = set(doctor_ids)
+        if not doctor_ids or start_date > end_date:
+            return []
+
+        days = [
+            start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)
+        ]
+        windows = [_working_window(day) for day in days]
+        busy = SchedulingService.busy_intervals(
+            doctor_ids, windows[0][0], windows[-1][1], exclude_appointment_id
+        )
+        step = timedelta(minutes=duration_minutes)
+
+        slots = []
+        for doctor_id, index in busy.items():
+            spans = _busy_spans(index)
+            booked = {}
+            for start, end, _ in index.intervals:
+                booked[start.date()] = booked.get(start.date(), 0) + int(
+                    (end - start).total_seconds() // 60
+                )
+
+            found = 0
+            position = 0
+            for day, (slot_start, close) in zip(days, windows):
+                while slot_start + step <= close:
+                    slot_end = slot_start + step
+                    # Spans end in order, so the first one ending after the
+                    # slot starts is the only one that can overlap it
+                    while position < len(spans) and spans[position][1] <= slot_start:
+                        position += 1
+                    free = position == len(spans) or not (
+                        spans[position][0] < slot_end and spans[position][1] > slot_start
+                    )
+                    if free and (not_before is None or slot_start >= not_before):
+                        slots.append(
+                            {
+                                "doctor_id": doctor_id,
+                                "start": slot_start,
+                                "end": slot_end,
+                                "booked_minutes": booked.get(day, 0),
+                            }
+                        )
+                        found += 1
+                        if per_doctor and found >= per_doctor:
+                            break
+                    slot_start = slot_end
+                if per_doctor and found >= per_doctor:
+                    break
+
+        slots.sort(key=lambda slot: (slot["start"], slot["booked_minutes"], slot["doctor_id"]))
+        return slots[:limit] if limit else slots
@@ -0,0 +1,257 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, select
+from app import db
+from app.models.appointment import Appointment
+from app.models.contact import Contact
+from app.models.daily_metric import MetricCounter
+from app.models.email_verification import EmailVerification
+from app.models.login_attempt import LoginAttempt
+from app.models.medical_record import Consultation, Prescription
+from app.models.user import User
+from app.utils.timezone_utils import (
+    get_current_time,
+    get_local_date_bounds,
+    get_reporting_timezone,
+    get_utc_date_bounds,
+)
+
+# Name of the one snapshot stored in the shared file
+SNAPSHOT_NAME = "system_stats"
+
+
+def _count(model, *conditions):
+    """Scalar subquery counting the rows of a model."""
+    return select(func.count()).select_from(model).where(*conditions).scalar_subquery()
+
+
+def _counter_or_count(name, model):
+    """Maintained counter value, falling back to counting the table.
+
+    SQLite and PostgreSQL evaluate COALESCE lazily, so the table is only
+    counted when the counter has not been initialized.
+    """
+    counter = (
+        select(MetricCounter.value)
+        .where(MetricCounter.name == name)
+        .scalar_subquery()
+    )
+    return func.coalesce(counter, _count(model))
+
+
+class SnapshotStore:
+    """Latest snapshot in a local SQLite file shared by every worker.
+
+    Besides the payload the file records when it was computed and until
+    when a worker holds the lease to recompute it, so only one process
+    refreshes an expired snapshot while the others keep serving the
+    previous one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    name TEXT PRIMARY KEY,
+                    payload TEXT,
+                    computed_at REAL NOT NULL DEFAULT 0,
+                    refreshing_until REAL NOT NULL DEFAULT 0
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection and commit when the block succeeds."""
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def read(self, name):
+        """``(payload, computed_at)`` of a snapshot, or ``(None, 0)``."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload, computed_at FROM snapshots WHERE name = ?", (name,)
+            ).fetchone()
+        if row is None or row[0] is None:
+            return None, 0
+        return json.loads(row[0]), row[1]
+
+    def claim(self, name, max_age, lease):
+        """Take the lease to refresh a snapshot older than ``max_age``.
+
+        The check and the update run in one write transaction, so exactly
+        one caller wins until the snapshot is stored or the lease runs out.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("INSERT OR IGNORE INTO snapshots (name) VALUES (?)", (name,))
+            claimed = conn.execute(
+                "UPDATE snapshots SET refreshing_until = ? "
+                "WHERE name = ? AND computed_at <= ? AND refreshing_until <= ?",
+                (now + lease, name, now - max_age, now),
+            ).rowcount
+        return claimed == 1
+
+    def store(self, name, payload):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE snapshots SET payload = ?, computed_at = ?, refreshing_until = 0 "
+                "WHERE name = ?",
+                (json.dumps(payload), time.time(), name),
+            )
+
+    def release(self, name):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE snapshots SET refreshing_until = 0 WHERE name = ?", (name,)
+            )
+
+
+class StatsSnapshotService:
+    """System-wide counts for the admin dashboard and system statistics.
+
+    All counts are computed by one SELECT of scalar subqueries and kept
+    in a ``SnapshotStore`` for ``STATS_SNAPSHOT_INTERVAL`` seconds.
+    Requests read the stored snapshot; when it has expired one worker
+    recomputes it while the others return the previous one, so polling
+    causes at most one recompute per interval across all workers.
+    """
+
+    @staticmethod
+    def _store():
+        store = current_app.extensions.get("stats_snapshot")
+        if store is None:
+            store = SnapshotStore(
+                current_app.config.get("STATS_SNAPSHOT_PATH")
+                or os.path.join(current_app.instance_path, "stats_snapshot.db")
+            )
+            current_app.extensions["stats_snapshot"] = store
+        return store
+
+    @staticmethod
+    def compute():
+        """Compute every count with a single query."""
+        now = datetime.utcnow()
+        thirty_days_ago = now - timedelta(days=30)
+        twenty_four_hours_ago = now - timedelta(hours=24)
+        recent_day = get_current_time(get_reporting_timezone()).date() - timedelta(days=30)
+        recent_start, _ = get_utc_date_bounds(recent_day, timezone=get_reporting_timezone())
+        # Appointment times are stored as local wall time
+        recent_appointments_start, _ = get_local_date_bounds(recent_day)
+
+        columns = {
+            # System statistics
+            "total_patients": _count(User, User.role == "patient", User.active == True),
+            "total_doctors": _count(User, User.role == "doctor", User.active == True),
+            "total_appointments": _counter_or_count("appointments", Appointment),
+            "total_consultations": _counter_or_count("consultations", Consultation),
+            "total_prescriptions": _counter_or_count("prescriptions", Prescription),
+            "recent_appointments": _count(
+                Appointment, Appointment.appointment_date >= recent_appointments_start
+            ),
+            "recent_consultations": _count(
+                Consultation, Consultation.consultation_date >= recent_start
+            ),
+            # Admin dashboard
+            "total_users": _count(User),
+            "active_users": _count(User, User.active == True),
+            "recent_registrations": _count(User, User.created_at >= thirty_days_ago),
+            "recent_login_attempts": _count(
+                LoginAttempt, LoginAttempt.attempted_at >= twenty_four_hours_ago
+            ),
+            "failed_login_attempts": _count(
+                LoginAttempt,
+                LoginAttempt.attempted_at >= twenty_four_hours_ago,
+                LoginAttempt.success == False,
+            ),
+            "verified_emails": _count(
+                EmailVerification, EmailVerification.is_verified == True
+            ),
+            "pending_verifications": _count(
+                EmailVerification, EmailVerification.is_verified == False
+            ),
+            "recent_contacts": _count(Contact, Contact.created_at >= thirty_days_ago),
+        }
+
+        # Login attempts on each of the last seven UTC days
+        first_day = (now - timedelta(days=7)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        day_starts = [first_day + timedelta(days=i) for i in range(7)]
+        for i, day_start in enumerate(day_starts):
+            in_day = (
+                LoginAttempt.attempted_at >= day_start,
+                LoginAttempt.attempted_at < day_start + timedelta(days=1),
+            )
+            columns[f"login_day_{i}_total"] = _count(LoginAttempt, *in_day)
+            columns[f"login_day_{i}_failed"] = _count(
+                LoginAttempt, *in_day, LoginAttempt.success == False
+            )
+
+        row = db.session.execute(
+            select(*[column.label(name) for name, column in columns.items()])
+        ).one()
+        values = row._asdict()
+
+        snapshot = {
+            name: values[name] for name in columns if not name.startswith("login_day_")
+        }
+        snapshot["login_days"] = [
+            {
+                "day_start": day_start.isoformat(),
+                "total_attempts": values[f"login_day_{i}_total"],
+                "failed_attempts": values[f"login_day_{i}_failed"],
+            }
+            for i, day_start in enumerate(day_starts)
+        ]
+        snapshot["computed_at"] = now.isoformat()
+        return snapshot
+
+    @staticmethod
+    def get_snapshot():
+        """The current snapshot, recomputing it if this caller wins the lease."""
+        interval = current_app.config.get("STATS_SNAPSHOT_INTERVAL", 30)
+        if interval <= 0:
+            return StatsSnapshotService.compute()
+
+        store = StatsSnapshotService._store()
+        payload, computed_at = store.read(SNAPSHOT_NAME)
+        if payload is not None and computed_at > time.time() - interval:
+            return payload
+
+        lease = current_app.config.get("STATS_SNAPSHOT_LEASE", 30)
+        if store.claim(SNAPSHOT_NAME, interval, lease):
+            try:
+                payload = StatsSnapshotService.compute()
+            except Exception:
+                store.release(SNAPSHOT_NAME)
+                raise
+            store.store(SNAPSHOT_NAME, payload)
+            return payload
+
+        if payload is not None:
+            return payload
+
+        # First snapshot is being computed by another worker; wait for it
+        # rather than piling another recompute onto the database.
+        deadline = time.time() + lease
+        while time.time() < deadline:
+            time.sleep(0.1)
+            payload, _ = store.read(SNAPSHOT_NAME)
+            if payload is not None:
+                return payload
+        return StatsSnapshotService.compute()
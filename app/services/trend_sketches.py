@@ -0,0 +1,237 @@
+import json
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event, inspect, select, delete, insert
+from app import db
+from app.models.medical_record import Consultation, Prescription
+from app.models.trend_sketch import TrendSketch
+from app.utils.session_events import track_previous_values
+from app.utils.sketches import SpaceSavingSketch
+from app.utils.timezone_utils import (
+    get_user_timezone,
+    get_reporting_timezone,
+    get_utc_date_bounds,
+    localize_datetime,
+)
+
+# Sketched tables: kind -> (model, date attribute, item attribute)
+SKETCH_SOURCES = {
+    "medication": (Prescription, "prescribed_date", "medication_name"),
+    "diagnosis": (Consultation, "consultation_date", "diagnosis_code"),
+}
+
+# Number of items tracked per sketch; trend lists are at most this long
+DEFAULT_CAPACITY = 200
+
+
+def _capacity():
+    return current_app.config.get("TREND_SKETCH_CAPACITY", DEFAULT_CAPACITY)
+
+
+class TrendSketchService:
+    """Per-day, per-doctor top-K sketches of medications and diagnoses.
+
+    Each day has one sketch per doctor plus a facility-wide sketch, stored
+    in ``trend_sketches``. Trend queries merge the sketches of the days in
+    a range instead of grouping the raw rows. Whenever a prescription or
+    consultation is written, the sketches of the day it falls on (before
+    and after the change) are rebuilt in the same transaction.
+    """
+
+    @staticmethod
+    def register():
+        """Attach the flush listener to the database session (idempotent)."""
+        if event.contains(db.session, "after_flush", TrendSketchService._after_flush):
+            return
+
+        for model, date_attribute, _ in SKETCH_SOURCES.values():
+            track_previous_values(model, (date_attribute,))
+
+        event.listen(db.session, "after_flush", TrendSketchService._after_flush)
+
+    @staticmethod
+    def build_sketches(kind, start_date, end_date, timezone=None, executor=None):
+        """Build sketches from the raw rows of an inclusive date range.
+
+        Returns ``{(metric_date, doctor_id): sketch}`` with a facility-wide
+        sketch (``doctor_id`` None) for every day in the range.
+        """
+        model, date_attribute, item_attribute = SKETCH_SOURCES[kind]
+        date_column = getattr(model, date_attribute)
+        item_column = getattr(model, item_attribute)
+        timezone = timezone or get_reporting_timezone()
+        executor = executor or db.session
+        capacity = _capacity()
+
+        range_start, range_end = get_utc_date_bounds(start_date, end_date, timezone)
+        rows = executor.execute(
+            select(date_column, model.doctor_id, item_column, model.patient_id)
+            .where(
+                date_column >= range_start,
+                date_column < range_end,
+                item_column.isnot(None),
+            )
+            .order_by(date_column)
+        )
+
+        sketches = {}
+        day = start_date
+        while day <= end_date:
+            sketches[(day, None)] = SpaceSavingSketch(capacity)
+            day += timedelta(days=1)
+
+        for when, doctor_id, item, patient_id in rows:
+            if item == "":
+                continue
+            # Items are stored as strings, the form they take in JSON
+            item = str(item)
+            day = localize_datetime(when, timezone).date()
+            sketches[(day, None)].add(item, patient_id)
+            if doctor_id is not None:
+                sketches.setdefault((day, doctor_id), SpaceSavingSketch(capacity)).add(
+                    item, patient_id
+                )
+
+        return sketches
+
+    @staticmethod
+    def _sketch_rows(kind, sketches):
+        """``trend_sketches`` insert values for built sketches."""
+        now = datetime.utcnow()
+        return [
+            {
+                "kind": kind,
+                "metric_date": day,
+                "doctor_id": doctor_id,
+                "payload": json.dumps(sketch.to_dict()),
+                "refreshed_at": now,
+            }
+            for (day, doctor_id), sketch in sketches.items()
+        ]
+
+    @staticmethod
+    def refresh(start_date, end_date):
+        """Rebuild every sketch for an inclusive date range, a month at a time."""
+        timezone = get_reporting_timezone()
+        chunk_start = start_date
+        while chunk_start <= end_date:
+            next_month = (chunk_start.replace(day=1) + timedelta(days=32)).replace(day=1)
+            chunk_end = min(next_month - timedelta(days=1), end_date)
+
+            for kind in SKETCH_SOURCES:
+                sketches = TrendSketchService.build_sketches(
+                    kind, chunk_start, chunk_end, timezone
+                )
+                TrendSketch.query.filter(
+                    TrendSketch.kind == kind,
+                    TrendSketch.metric_date >= chunk_start,
+                    TrendSketch.metric_date <= chunk_end,
+                ).delete(synchronize_session=False)
+                db.session.execute(
+                    insert(TrendSketch), TrendSketchService._sketch_rows(kind, sketches)
+                )
+            db.session.commit()
+
+            chunk_start = chunk_end + timedelta(days=1)
+
+    @staticmethod
+    def top_items(kind, start_date, end_date, doctor_id=None, limit=10):
+        """Merged top items for a range as ``(item, count, patients)`` tuples.
+
+        Returns None when the sketches cannot answer: they are disabled, the
+        user views reports in a different timezone, or a day in the range
+        has not been sketched yet.
+        """
+        if not current_app.config.get("ANALYTICS_ROLLUP_ENABLED", True):
+            return None
+
+        if get_user_timezone().zone != get_reporting_timezone().zone:
+            return None
+
+        covered = TrendSketch.query.filter(
+            TrendSketch.kind == kind,
+            TrendSketch.metric_date >= start_date,
+            TrendSketch.metric_date <= end_date,
+            TrendSketch.doctor_id.is_(None),
+        )
+        if covered.count() < (end_date - start_date).days + 1:
+            return None
+
+        if doctor_id:
+            sketch_rows = TrendSketch.query.filter(
+                TrendSketch.kind == kind,
+                TrendSketch.metric_date >= start_date,
+                TrendSketch.metric_date <= end_date,
+                TrendSketch.doctor_id == doctor_id,
+            )
+        else:
+            sketch_rows = covered
+
+        merged = SpaceSavingSketch(_capacity())
+        for row in sketch_rows.with_entities(TrendSketch.payload):
+            merged.merge(SpaceSavingSketch.from_dict(json.loads(row.payload)))
+
+        return merged.top(limit)
+
+    @staticmethod
+    def _touched_days(obj, date_attribute, previous):
+        """Reporting-timezone days an object falls on before and after a flush."""
+        history = inspect(obj).attrs[date_attribute].history
+        values = [getattr(obj, date_attribute)]
+        if previous and history.deleted:
+            values.extend(history.deleted)
+
+        timezone = get_reporting_timezone()
+        return {
+            localize_datetime(value, timezone).date()
+            for value in values
+            if value is not None
+        }
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        """Rebuild the sketches of every day touched by the flush."""
+        touched = set()
+
+        for kind, (model, date_attribute, item_attribute) in SKETCH_SOURCES.items():
+            tracked = (date_attribute, item_attribute, "doctor_id", "patient_id")
+
+            for obj in session.new:
+                if isinstance(obj, model):
+                    touched.update(
+                        (kind, day)
+                        for day in TrendSketchService._touched_days(obj, date_attribute, False)
+                    )
+
+            for obj in session.dirty:
+                if not isinstance(obj, model):
+                    continue
+                state = inspect(obj)
+                if not any(state.attrs[name].history.has_changes() for name in tracked):
+                    continue
+                touched.update(
+                    (kind, day)
+                    for day in TrendSketchService._touched_days(obj, date_attribute, True)
+                )
+
+            for obj in session.deleted:
+                if isinstance(obj, model):
+                    touched.update(
+                        (kind, day)
+                        for day in TrendSketchService._touched_days(obj, date_attribute, True)
+                    )
+
+        if not touched:
+            return
+
+        connection = session.connection()
+        table = TrendSketch.__table__
+        timezone = get_reporting_timezone()
+        for kind, day in touched:
+            sketches = TrendSketchService.build_sketches(
+                kind, day, day, timezone, executor=connection
+            )
+            connection.execute(
+                delete(table).where(table.c.kind == kind, table.c.metric_date == day)
+            )
+            connection.execute(insert(table), TrendSketchService._sketch_rows(kind, sketches))
@@ -0,0 +1,84 @@
+from collections import Counter
+from sqlalchemy import event, func, select
+from app import db, socketio
+from app.models.message import ConversationSummary, InternalMessage
+from app.services.conversation_service import ConversationService, _unread
+
+
+class UnreadCounterService:
+    """Unread message counts pushed to clients over Socket.IO.
+
+    Counts are always read from ``conversation_summaries``, so every
+    server process and CLI command sees the same committed value and
+    nothing is cached in memory. The flush listener works out how each
+    send, read and delete changes its recipient's count; once the
+    transaction commits, the committed count of every user whose count
+    changed is read back and pushed as ``unread_count_update`` to their
+    ``user_<id>`` room.
+
+    An emit reaches the sockets connected to the process that commits.
+    With several server processes, or for writes made by CLI commands,
+    set ``SOCKETIO_MESSAGE_QUEUE`` so emits are relayed to all of them.
+    """
+
+    @staticmethod
+    def register():
+        """Attach the session listeners (idempotent)."""
+        if event.contains(db.session, "after_flush", UnreadCounterService._after_flush):
+            return
+        event.listen(db.session, "after_flush", UnreadCounterService._after_flush)
+        event.listen(db.session, "after_commit", UnreadCounterService._after_commit)
+        event.listen(db.session, "after_rollback", UnreadCounterService._after_rollback)
+
+    @staticmethod
+    def count(user_id):
+        """Messages the user has neither read nor deleted."""
+        return ConversationService.unread_count(user_id)
+
+    @staticmethod
+    def committed_counts(connection, user_ids):
+        """``{user_id: count}`` of the given users, read on ``connection``."""
+        counts = dict.fromkeys(user_ids, 0)
+        counts.update(
+            connection.execute(
+                select(ConversationSummary.user_id, func.sum(ConversationSummary.unread_count))
+                .where(ConversationSummary.user_id.in_(counts))
+                .group_by(ConversationSummary.user_id)
+            ).all()
+        )
+        return counts
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        """Collect the flushed changes to each recipient's unread count."""
+        deltas = session.info.setdefault("unread_count_deltas", Counter())
+
+        for obj in session.new:
+            if isinstance(obj, InternalMessage):
+                deltas[obj.recipient_id] += _unread(obj)
+
+        for obj in session.dirty:
+            if isinstance(obj, InternalMessage):
+                deltas[obj.recipient_id] += _unread(obj) - _unread(obj, previous=True)
+
+        for obj in session.deleted:
+            if isinstance(obj, InternalMessage):
+                deltas[obj.recipient_id] -= _unread(obj, previous=True)
+
+    @staticmethod
+    def _after_commit(session):
+        """Push the committed counts of the users whose count changed."""
+        deltas = session.info.pop("unread_count_deltas", None)
+        user_ids = [user_id for user_id, delta in (deltas or {}).items() if delta]
+        if not user_ids:
+            return
+
+        # The session cannot run queries while it finishes committing
+        with db.engine.connect() as connection:
+            counts = UnreadCounterService.committed_counts(connection, user_ids)
+        for user_id, count in counts.items():
+            socketio.emit("unread_count_update", {"count": count}, room=f"user_{user_id}")
+
+    @staticmethod
+    def _after_rollback(session):
+        session.info.pop("unread_count_deltas", None)
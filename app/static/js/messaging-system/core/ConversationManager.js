@@ -8,6 +8,9 @@ export class ConversationManager {
         this.conversations = [];
         this.allUsers = [];
         this.userTimezone = this.getUserTimezone();
+        // Cursor of the oldest loaded message while older ones remain
+        this.olderCursor = null;
+        this.loadingOlder = false;
     }
 
     /**
@@ -94,23 +97,14 @@ export class ConversationManager {
                 this.userTimezone = data.timezone;
             }
 
-            // Add status to messages based on sender and timezone info
-            const messagesWithStatus = data.messages.map((message) => ({
-                ...message,
-                status:
-                    message.sender_id === this.messageSystem.currentUserId
-                        ? message.is_read
-                            ? "read"
-                            : "delivered"
-                        : "received",
-                timezone: data.timezone,
-            }));
+            this.olderCursor = data.paging?.has_more ? data.paging.before : null;
+            this.watchForOlderMessages(userId);
 
             this.messageSystem.messageRenderer.renderChatHeader(
                 data.other_user
             );
             this.messageSystem.messageRenderer.renderMessages(
-                messagesWithStatus
+                this.withStatus(data.messages, data.timezone)
             );
             this.markConversationAsRead(userId);
 
@@ -127,6 +121,58 @@ export class ConversationManager {
         }
     }
 
+    /**
+     * Add status to messages based on sender and timezone info
+     */
+    withStatus(messages, timezone) {
+        return messages.map((message) => ({
+            ...message,
+            status:
+                message.sender_id === this.messageSystem.currentUserId
+                    ? message.is_read
+                        ? "read"
+                        : "delivered"
+                    : "received",
+            timezone: timezone,
+        }));
+    }
+
+    /**
+     * Load the previous page of a conversation when scrolled to the top
+     */
+    watchForOlderMessages(userId) {
+        const container = document.getElementById("messagesArea");
+        if (!container) return;
+
+        container.onscroll = () => {
+            if (container.scrollTop < 50) {
+                this.loadOlderMessages(userId);
+            }
+        };
+    }
+
+    async loadOlderMessages(userId) {
+        if (!this.olderCursor || this.loadingOlder) return;
+        this.loadingOlder = true;
+
+        try {
+            const response = await fetch(
+                `/messages/api/conversation/${userId}?before=${encodeURIComponent(this.olderCursor)}`
+            );
+            const data = await response.json();
+
+            this.olderCursor = data.paging?.has_more ? data.paging.before : null;
+            this.messageSystem.messageRenderer.prependMessages(
+                this.withStatus(data.messages, data.timezone)
+            );
+            document.dispatchEvent(new CustomEvent("messagesLoaded"));
+        } catch (error) {
+            console.error("Error loading older messages:", error);
+        } finally {
+            this.loadingOlder = false;
+        }
+    }
+
     /**
      * Mark conversation as read
      */
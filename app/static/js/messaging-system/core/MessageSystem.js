@@ -300,11 +300,9 @@ export class MessageSystem {
      * Update unread count badges across the interface
      */
     updateUnreadCountBadges() {
-        // Request updated count from server via Socket.IO
-        if (this.socketManager.socket) {
-            this.socketManager.socket.emit('request_unread_count');
-        } else {
-            // Fallback to REST API if Socket.IO not available
+        // Connected clients get changed counts pushed as unread_count_update;
+        // fall back to the REST API if Socket.IO is not available
+        if (!this.socketManager.socket?.connected) {
             this.fetchUnreadCountFallback();
         }
     }
@@ -19,9 +19,8 @@ export class SocketManager {
 
         this.socket.on("connect", () => {
             console.log("Connected to messaging system");
+            // The server sends the unread count on connect
             this.socket.emit("join_user_room");
-            // Request initial unread count on connection
-            this.socket.emit("request_unread_count");
         });
 
         this.socket.on("new_message", (data) => {
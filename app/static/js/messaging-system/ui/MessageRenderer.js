@@ -142,6 +142,22 @@ export class MessageRenderer {
         });
     }
 
+    /**
+     * Insert older messages above the loaded ones, keeping the view in place
+     */
+    prependMessages(messages) {
+        const container = document.getElementById("messagesArea");
+        if (!container || !messages.length) return;
+
+        const previousHeight = container.scrollHeight;
+        const fragment = document.createDocumentFragment();
+        messages.forEach((message) => {
+            fragment.appendChild(this.createMessageElement(message));
+        });
+        container.insertBefore(fragment, container.firstChild);
+        container.scrollTop += container.scrollHeight - previousHeight;
+    }
+
     /**
      * Create a message element
      */
@@ -126,9 +126,6 @@ document.addEventListener("DOMContentLoaded", function () {
   updateSidebarTime();
   setInterval(updateSidebarTime, 60000);
 
-  // Request initial unread count
+  // Request initial unread count; later changes are pushed by the server
   setTimeout(updateUnreadCount, 1000);
-
-  // Update unread count periodically
-  setInterval(updateUnreadCount, 30000); // Every 30 seconds
 });
@@ -0,0 +1,94 @@
+import tempfile
+from itertools import islice
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
+
+HEADER_FONT = Font(bold=True, color="FFFFFF")
+HEADER_FILL = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+HEADER_ALIGNMENT = Alignment(horizontal="center")
+
+MAX_COLUMN_WIDTH = 50
+
+# Rows buffered per sheet to size the columns before streaming the rest
+WIDTH_SAMPLE_ROWS = 1000
+
+# Reports up to this size stay in memory before spilling to disk
+SPOOL_MAX_SIZE = 5 * 1024 * 1024
+
+CHUNK_SIZE = 64 * 1024
+
+
+class StreamingWorkbook:
+    """Excel workbook written row by row with openpyxl's write-only mode.
+
+    Rows are never kept as cell objects. Column widths are computed from the
+    header and the first ``WIDTH_SAMPLE_ROWS`` rows of each sheet, because
+    write-only sheets must declare their columns before the first row.
+    """
+
+    def __init__(self):
+        self.workbook = Workbook(write_only=True)
+
+    def add_sheet(self, title, headers, rows):
+        """Add a sheet with a styled header row followed by ``rows``."""
+        ws = self.workbook.create_sheet(title)
+        rows = iter(rows)
+        sample = list(islice(rows, WIDTH_SAMPLE_ROWS))
+
+        widths = [len(str(header)) for header in headers]
+        for row in sample:
+            for index, value in enumerate(row):
+                if value is None:
+                    continue
+                length = len(str(value))
+                if index >= len(widths):
+                    widths.append(length)
+                elif length > widths[index]:
+                    widths[index] = length
+
+        for index, width in enumerate(widths, 1):
+            ws.column_dimensions[get_column_letter(index)].width = min(
+                width + 2, MAX_COLUMN_WIDTH
+            )
+
+        header_cells = []
+        for header in headers:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.font = HEADER_FONT
+            cell.fill = HEADER_FILL
+            cell.alignment = HEADER_ALIGNMENT
+            header_cells.append(cell)
+        ws.append(header_cells)
+
+        for row in sample:
+            ws.append(row)
+        for row in rows:
+            ws.append(row)
+
+    def save(self, path=None):
+        """Write the workbook to ``path``, or to a spooled temporary file.
+
+        The temporary file is returned rewound to the start.
+        """
+        if path is not None:
+            self.workbook.save(path)
+            return path
+
+        output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        self.workbook.save(output)
+        output.seek(0)
+        return output
+
+
+def iter_file_chunks(fileobj, chunk_size=CHUNK_SIZE):
+    """Yield a file's contents in chunks, closing it when done."""
+    try:
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        fileobj.close()
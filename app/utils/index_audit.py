@@ -0,0 +1,217 @@
+from datetime import datetime, timedelta
+from sqlalchemy import and_
+from app import db
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.medical_record import Consultation, Prescription, ConsultationStatus
+from app.models.message import ConversationSummary, InternalMessage
+from app.models.user import User
+
+# Query shapes checked by ``flask db-index-audit``: name -> builder taking
+# sample ids and returning a Query. Register the shape of every hot query.
+QUERY_REGISTRY = {}
+
+def register_query(name):
+    """Add a query builder to the audit registry."""
+
+    def decorator(builder):
+        QUERY_REGISTRY[name] = builder
+        return builder
+
+    return decorator
+
+
+@register_query("messages.unread_count")
+def _unread_count(sample):
+    return InternalMessage.query.filter(
+        InternalMessage.recipient_id == sample["user_id"],
+        InternalMessage.is_read == False,
+        InternalMessage.is_deleted_by_recipient == False,
+    )
+
+
+@register_query("messages.inbox")
+def _inbox(sample):
+    return InternalMessage.query.filter(
+        InternalMessage.recipient_id == sample["user_id"],
+        InternalMessage.is_deleted_by_recipient == False,
+    ).order_by(InternalMessage.created_at.desc())
+
+
+@register_query("messages.sent")
+def _sent(sample):
+    return InternalMessage.query.filter(
+        InternalMessage.sender_id == sample["user_id"],
+        InternalMessage.is_deleted_by_sender == False,
+    ).order_by(InternalMessage.created_at.desc())
+
+
+@register_query("messages.conversations")
+def _conversations(sample):
+    return ConversationSummary.query.filter(
+        ConversationSummary.user_id == sample["user_id"]
+    ).order_by(
+        ConversationSummary.last_message_at.desc(),
+        ConversationSummary.last_message_id.desc(),
+    )
+
+
+@register_query("messages.conversation_history")
+def _conversation_history(sample):
+    return InternalMessage.query.filter(
+        InternalMessage.sender_id == sample["user_id"],
+        InternalMessage.recipient_id == sample["patient_id"],
+    ).order_by(InternalMessage.created_at.desc())
+
+
+@register_query("appointments.doctor_schedule")
+def _doctor_schedule(sample):
+    return Appointment.query.filter(
+        Appointment.doctor_id == sample["doctor_id"],
+        Appointment.appointment_date >= sample["day_start"],
+        Appointment.appointment_date < sample["day_start"] + timedelta(days=1),
+        Appointment.status.in_(Appointment.ACTIVE_STATUSES),
+    )
+
+
+@register_query("appointments.conflict_check")
+def _conflict_check(sample):
+    start = sample["day_start"] + timedelta(hours=9)
+    return Appointment.query.filter(
+        Appointment.doctor_id == sample["doctor_id"],
+        Appointment.status.in_(Appointment.ACTIVE_STATUSES),
+        Appointment.end_time > start,
+        Appointment.appointment_date < start + timedelta(minutes=30),
+    )
+
+
+@register_query("appointments.patient_list")
+def _patient_appointments(sample):
+    return Appointment.query.filter_by(patient_id=sample["patient_id"]).order_by(
+        Appointment.appointment_date.desc()
+    )
+
+
+@register_query("appointments.facility_today")
+def _facility_today(sample):
+    return Appointment.query.filter(
+        Appointment.appointment_date >= sample["day_start"],
+        Appointment.appointment_date < sample["day_start"] + timedelta(days=1),
+        Appointment.status.in_(
+            [AppointmentStatus.CONFIRMED, AppointmentStatus.IN_PROGRESS]
+        ),
+    )
+
+
+@register_query("consultations.doctor_drafts")
+def _doctor_drafts(sample):
+    return Consultation.query.filter(
+        and_(
+            Consultation.doctor_id == sample["doctor_id"],
+            Consultation.status == ConsultationStatus.DRAFT,
+        )
+    )
+
+
+@register_query("consultations.facility_drafts")
+def _facility_drafts(sample):
+    return Consultation.query.filter(Consultation.status == ConsultationStatus.DRAFT)
+
+
+@register_query("consultations.doctor_range")
+def _doctor_consultations(sample):
+    return Consultation.query.filter(
+        Consultation.doctor_id == sample["doctor_id"],
+        Consultation.consultation_date >= sample["day_start"] - timedelta(days=30),
+        Consultation.consultation_date < sample["day_start"],
+    )
+
+
+@register_query("prescriptions.doctor_recent")
+def _doctor_recent_prescriptions(sample):
+    return Prescription.query.filter(
+        Prescription.doctor_id == sample["doctor_id"],
+        Prescription.created_at >= sample["day_start"] - timedelta(days=7),
+    )
+
+
+@register_query("prescriptions.facility_recent")
+def _facility_recent_prescriptions(sample):
+    return Prescription.query.filter(
+        Prescription.created_at >= sample["day_start"] - timedelta(days=7)
+    )
+
+
+@register_query("prescriptions.doctor_range")
+def _doctor_prescriptions(sample):
+    return Prescription.query.filter(
+        Prescription.doctor_id == sample["doctor_id"],
+        Prescription.prescribed_date >= sample["day_start"] - timedelta(days=30),
+        Prescription.prescribed_date < sample["day_start"],
+    )
+
+
+@register_query("users.active_doctors")
+def _active_doctors(sample):
+    return User.query.filter_by(role="doctor", active=True)
+
+
+@register_query("users.patient_count")
+def _patient_count(sample):
+    return User.query.filter_by(role="patient")
+
+
+def _sample_values():
+    """Ids to plug into the registered queries; plans do not depend on them."""
+    doctor = User.query.filter_by(role="doctor").first()
+    patient = User.query.filter_by(role="patient").first()
+    return {
+        "doctor_id": doctor.id if doctor else 1,
+        "patient_id": patient.id if patient else 1,
+        "user_id": doctor.id if doctor else 1,
+        "day_start": datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0),
+    }
+
+
+def _full_scans(dialect, plan):
+    """Plan lines that read a whole table instead of using an index."""
+    if dialect == "sqlite":
+        # "SCAN t USING INDEX i" still walks the whole table, in index order
+        return [
+            line
+            for line in plan
+            if line.startswith("SCAN ") and not line.startswith("SCAN CONSTANT ROW")
+        ]
+    return [line.strip() for line in plan if "Seq Scan" in line]
+
+
+def explain(query):
+    """The database's plan for a query, one line per step."""
+    connection = db.session.connection()
+    dialect = connection.dialect
+    sql = str(
+        query.statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+    )
+    if dialect.name == "sqlite":
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+        return [row[-1] for row in rows]
+    rows = connection.exec_driver_sql(f"EXPLAIN {sql}").fetchall()
+    return [row[0] for row in rows]
+
+
+def audit_queries(names=None):
+    """Explain every registered query and flag the ones with full scans.
+
+    Returns a list of ``{"name", "plan", "full_scans"}`` dicts in registry
+    order.
+    """
+    dialect = db.session.connection().dialect.name
+    sample = _sample_values()
+    results = []
+    for name, builder in QUERY_REGISTRY.items():
+        if names and name not in names:
+            continue
+        plan = explain(builder(sample))
+        results.append(
+            {"name": name, "plan": plan, "full_scans": _full_scans(dialect, plan)}
+        )
+    return results
@@ -0,0 +1,42 @@
+from bisect import bisect_left
+from itertools import accumulate
+
+
+class IntervalIndex:
+    """Static set of half-open ``[start, end)`` intervals for overlap queries.
+
+    Intervals are sorted by start and ``reach[i]`` holds the latest end among
+    the first ``i + 1`` of them. An interval overlaps ``[start, end)`` when it
+    starts before ``end`` and ends after ``start``, so a query bisects for
+    the intervals starting before ``end`` and compares their furthest reach
+    with ``start``: O(log n) per query after an O(n log n) build.
+    """
+
+    def __init__(self, intervals=()):
+        # (start, end, key) tuples; key identifies the interval to callers
+        self.intervals = sorted(intervals, key=lambda interval: interval[:2])
+        self.starts = [interval[0] for interval in self.intervals]
+        self.reach = list(accumulate((interval[1] for interval in self.intervals), max))
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def overlaps(self, start, end):
+        """Whether any interval overlaps ``[start, end)``."""
+        count = bisect_left(self.starts, end)
+        return count > 0 and self.reach[count - 1] > start
+
+    def overlapping(self, start, end):
+        """Keys of the intervals overlapping ``[start, end)``, latest start first.
+
+        Walks back from the last interval starting before ``end`` and stops
+        as soon as no earlier interval reaches past ``start``, so the cost is
+        O(log n) plus the intervals inspected near the query.
+        """
+        keys = []
+        for i in range(bisect_left(self.starts, end) - 1, -1, -1):
+            if self.reach[i] <= start:
+                break
+            if self.intervals[i][1] > start:
+                keys.append(self.intervals[i][2])
+        return keys
@@ -0,0 +1,88 @@
+import base64
+import heapq
+from datetime import datetime
+from sqlalchemy import literal, tuple_
+
+# Page sizes accepted by the keyset-paginated endpoints
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(created_at, row_id):
+    """Opaque cursor for the position of a row in ``(created_at, id)`` order."""
+    raw = f"{created_at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """``(created_at, id)`` from a cursor; raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = raw.decode("utf-8").split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(f"Invalid cursor '{cursor}'")
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE):
+    """Page size from a request argument, capped at ``MAX_PAGE_SIZE``."""
+    if value in (None, ""):
+        return default
+    size = int(value)
+    if size < 1:
+        raise ValueError("Page size must be positive")
+    return min(size, MAX_PAGE_SIZE)
+
+
+def keyset_page(queries, model, before=None, after=None, limit=DEFAULT_PAGE_SIZE):
+    """One page of rows in ``(created_at, id)`` order, newest first.
+
+    Without a cursor the page holds the newest rows; with ``before`` the
+    newest rows older than that cursor, and with ``after`` the oldest rows
+    newer than it, so pages join up in both directions. Each query in
+    ``queries`` is read as its own index range of at most ``limit + 1``
+    rows and the results are merged, which keeps an OR of several
+    conditions (both directions of a conversation, say) at O(page) cost.
+
+    Returns ``(rows, paging)`` where ``paging`` has the ``before`` and
+    ``after`` cursors of the page's ends and ``has_more``, whether more
+    rows exist beyond the page in the direction read.
+    """
+    if before and after:
+        raise ValueError("Pass either before or after, not both")
+
+    def bound(cursor):
+        created_at, row_id = decode_cursor(cursor)
+        return tuple_(
+            literal(created_at, model.created_at.type), literal(row_id, model.id.type)
+        )
+
+    position = tuple_(model.created_at, model.id)
+    if after:
+        ordering = (model.created_at.asc(), model.id.asc())
+        queries = [query.filter(position > bound(after)) for query in queries]
+    else:
+        ordering = (model.created_at.desc(), model.id.desc())
+        if before:
+            queries = [query.filter(position < bound(before)) for query in queries]
+
+    def sort_key(row):
+        return (row.created_at, row.id)
+
+    rows = heapq.merge(
+        *[query.order_by(*ordering).limit(limit + 1).all() for query in queries],
+        key=sort_key,
+        reverse=not after,
+    )
+    rows = list(rows)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if after:
+        rows.reverse()
+
+    paging = {
+        "before": encode_cursor(*sort_key(rows[-1])) if rows else before,
+        "after": encode_cursor(*sort_key(rows[0])) if rows else after,
+        "has_more": has_more,
+    }
+    return rows, paging
@@ -0,0 +1,18 @@
+from sqlalchemy import event
+
+
+def _track_previous_value(target, value, oldvalue, initiator):
+    """No-op listener; registering it makes SQLAlchemy load old values."""
+
+
+def track_previous_values(model, attributes):
+    """Keep the pre-flush value of each attribute in its history (idempotent).
+
+    Flush listeners that compute deltas read ``history.deleted``, which
+    SQLAlchemy only fills for unloaded attributes when an active-history
+    listener is attached to them.
+    """
+    for attribute in attributes:
+        column = getattr(model, attribute)
+        if not event.contains(column, "set", _track_previous_value):
+            event.listen(column, "set", _track_previous_value, active_history=True)
@@ -1,20 +1,120 @@
 from datetime import datetime, timedelta
+import sqlite3
+import pytz
+from flask import current_app
 from flask_login import current_user
-from sqlalchemy import desc, func, and_, or_
+from sqlalchemy import desc, event, func, and_, or_, inspect
 from app import db
-from app.utils.timezone_utils import get_user_timezone, get_current_time
+from app.utils.timezone_utils import (
+    get_user_timezone,
+    get_current_time,
+    get_local_date_bounds,
+)
 from app.models.user import User
 from app.models.appointment import Appointment, AppointmentStatus
 from app.models.medical_record import Consultation, Prescription, ConsultationStatus
 from app.models.message import InternalMessage
+from app.services.analytics_cache import analytics_cache
 
+# Seconds a cached entry may live; writes usually invalidate it sooner, the
+# TTL covers counts that change with time alone (the 7-day window)
+SIDEBAR_CACHE_TTL = 300
 
-def get_sidebar_stats():
-    """Get statistics for sidebar display (shared utility for medical dashboard)."""
-    # Get user's timezone for displaying timestamps
+# Queries needed to compute each kind of entry, for the savings statistics
+ENTRY_QUERIES = {
+    "sidebar_patients": 1,
+    "sidebar_facility": 3,
+    "sidebar_doctor": 4,
+    "sidebar_user": 1,
+}
+
+# Models whose writes change sidebar counts: (owner column, columns counted).
+# A row's owner is the doctor or recipient whose entry shows it.
+WATCHED_MODELS = {
+    Appointment: ("doctor_id", ("doctor_id", "appointment_date", "status")),
+    Consultation: ("doctor_id", ("doctor_id", "status")),
+    Prescription: ("doctor_id", ("doctor_id", "created_at")),
+    InternalMessage: (
+        "recipient_id",
+        ("recipient_id", "is_read", "is_deleted_by_recipient"),
+    ),
+}
+
+
+def _counts_window():
+    """Today's bounds and the UTC start of the 7-day window for the user.
+
+    Today's bounds are local midnights, as appointment times are stored in
+    local wall time.
+    """
     user_timezone = get_user_timezone()
     current_time_local = get_current_time(user_timezone)
     today_local = current_time_local.date()
+    today_start, today_end = get_local_date_bounds(today_local)
+    seven_days_ago = (current_time_local - timedelta(days=7)).astimezone(
+        pytz.utc
+    ).replace(tzinfo=None)
+    return user_timezone, today_local, today_start, today_end, seven_days_ago
+
+
+def _activity_counts(doctor_id, today_start, today_end, seven_days_ago):
+    """Today's appointments, draft consultations and recent prescriptions.
+
+    Counts one doctor's records, or the whole facility when ``doctor_id``
+    is None.
+    """
+    appointments = Appointment.query.filter(
+        Appointment.appointment_date >= today_start,
+        Appointment.appointment_date < today_end,
+        Appointment.status.in_(
+            [AppointmentStatus.CONFIRMED, AppointmentStatus.IN_PROGRESS]
+        ),
+    )
+    consultations = Consultation.query.filter(
+        Consultation.status == ConsultationStatus.DRAFT
+    )
+    prescriptions = Prescription.query.filter(
+        Prescription.created_at >= seven_days_ago
+    )
+    if doctor_id is not None:
+        appointments = appointments.filter(Appointment.doctor_id == doctor_id)
+        consultations = consultations.filter(Consultation.doctor_id == doctor_id)
+        prescriptions = prescriptions.filter(Prescription.doctor_id == doctor_id)
+
+    return {
+        "todays_appointments": appointments.count(),
+        "pending_consultations": consultations.count(),
+        "recent_prescriptions": prescriptions.count(),
+    }
+
+
+def _unread_messages(user_id):
+    return InternalMessage.query.filter(
+        and_(
+            InternalMessage.recipient_id == user_id,
+            InternalMessage.is_read == False,
+            InternalMessage.is_deleted_by_recipient == False,
+        )
+    ).count()
+
+
+def _cached(method, key, tags, compute):
+    """Read an entry from the shared report cache, computing it on a miss."""
+    return analytics_cache.fetch(method, key, compute, SIDEBAR_CACHE_TTL, tags)
+
+
+def get_sidebar_stats():
+    """Get statistics for sidebar display (shared utility for medical dashboard).
+
+    Counts are cached in the report cache backend: one entry per
+    (user, role, local date), plus entries shared by every user for the
+    patient total and the facility-wide counts staff and admins see.
+    Committed writes invalidate only the entries of the doctor, recipient
+    or facility they affect (see ``SidebarStatsCache``).
+    """
+    user_timezone, today_local, today_start, today_end, seven_days_ago = (
+        _counts_window()
+    )
 
     # Initialize statistics
     stats = {
@@ -25,71 +125,159 @@ def get_sidebar_stats():
         "recent_prescriptions": 0,
     }
 
-    # Role-specific data gathering
-    if current_user.role == "doctor":
-        # Doctor-specific statistics
-        stats["total_patients"] = User.query.filter_by(role="patient").count()
-
-        # Today's appointments for this doctor
-        stats["todays_appointments"] = Appointment.query.filter(
-            and_(
-                Appointment.doctor_id == current_user.id,
-                Appointment.appointment_date.cast(db.Date) == today_local,
-                Appointment.status.in_(
-                    [AppointmentStatus.CONFIRMED, AppointmentStatus.IN_PROGRESS]
-                ),
-            )
-        ).count()
+    user_id = current_user.id
+    role = current_user.role
+    day_key = (today_local.isoformat(), user_timezone.zone)
 
-        # Pending consultations (draft consultations by this doctor)
-        stats["pending_consultations"] = Consultation.query.filter(
-            and_(
-                Consultation.doctor_id == current_user.id,
-                Consultation.status == ConsultationStatus.DRAFT,
-            )
-        ).count()
-
-        # Recent prescriptions by this doctor (last 7 days)
-        seven_days_ago = current_time_local - timedelta(days=7)
-        stats["recent_prescriptions"] = Prescription.query.filter(
-            and_(
-                Prescription.doctor_id == current_user.id,
-                Prescription.created_at >= seven_days_ago.replace(tzinfo=None),
-            )
-        ).count()
-
-    elif current_user.role in ["staff", "admin"]:
-        # Staff/admin can see system-wide statistics
-        stats["total_patients"] = User.query.filter_by(role="patient").count()
-
-        # All appointments today
-        stats["todays_appointments"] = Appointment.query.filter(
-            and_(
-                Appointment.appointment_date.cast(db.Date) == today_local,
-                Appointment.status.in_(
-                    [AppointmentStatus.CONFIRMED, AppointmentStatus.IN_PROGRESS]
-                ),
-            )
-        ).count()
+    # Per-user entry: the doctor's own counts and everyone's unread messages
+    if role == "doctor":
 
-        # All pending consultations (draft status)
-        stats["pending_consultations"] = Consultation.query.filter(
-            Consultation.status == ConsultationStatus.DRAFT
-        ).count()
+        def compute_user():
+            counts = _activity_counts(user_id, today_start, today_end, seven_days_ago)
+            counts["unread_messages"] = _unread_messages(user_id)
+            return counts
 
-        # Recent prescriptions system-wide (last 7 days)
-        seven_days_ago = current_time_local - timedelta(days=7)
-        stats["recent_prescriptions"] = Prescription.query.filter(
-            Prescription.created_at >= seven_days_ago.replace(tzinfo=None)
-        ).count()
+        method = "sidebar_doctor"
+    else:
 
-    # Unread messages (common for both roles)
-    stats["unread_messages"] = InternalMessage.query.filter(
-        and_(
-            InternalMessage.recipient_id == current_user.id,
-            InternalMessage.is_read == False,
-            InternalMessage.is_deleted_by_recipient == False,
+        def compute_user():
+            return {"unread_messages": _unread_messages(user_id)}
+
+        method = "sidebar_user"
+
+    stats.update(
+        _cached(
+            method,
+            repr(("sidebar", "user", user_id, role, day_key)),
+            (f"sidebar:user:{user_id}",),
+            compute_user,
+        )
+    )
+
+    if role in ["doctor", "staff", "admin"]:
+        stats["total_patients"] = _cached(
+            "sidebar_patients",
+            repr(("sidebar", "patients")),
+            ("sidebar:patients",),
+            lambda: User.query.filter_by(role="patient").count(),
+        )
+
+    if role in ["staff", "admin"]:
+        # Staff/admin see system-wide counts, shared by all of them
+        stats.update(
+            _cached(
+                "sidebar_facility",
+                repr(("sidebar", "facility", day_key)),
+                ("sidebar:facility",),
+                lambda: _activity_counts(None, today_start, today_end, seven_days_ago),
+            )
         )
-    ).count()
 
     return stats
+
+
+def sidebar_cache_stats():
+    """Cache hits and the COUNT queries they saved per sidebar render."""
+    methods = analytics_cache.stats()["methods"]
+    renders = sum(
+        methods.get(method, {}).get(result, 0)
+        for method in ("sidebar_doctor", "sidebar_user")
+        for result in ("hits", "misses")
+    )
+    queries_run = sum(
+        methods.get(method, {}).get("misses", 0) * queries
+        for method, queries in ENTRY_QUERIES.items()
+    )
+    queries_saved = sum(
+        methods.get(method, {}).get("hits", 0) * queries
+        for method, queries in ENTRY_QUERIES.items()
+    )
+    return {
+        "renders": renders,
+        "queries_run": queries_run,
+        "queries_saved": queries_saved,
+        "queries_per_render": round(queries_run / renders, 2) if renders else 0,
+        "uncached_queries_per_render": (
+            round((queries_run + queries_saved) / renders, 2) if renders else 0
+        ),
+    }
+
+
+class SidebarStatsCache:
+    """Invalidates cached sidebar counts when the rows behind them change.
+
+    Flushed writes are mapped to the entries they affect: appointments,
+    consultations and prescriptions to their doctor's entry and the
+    facility entry, messages to the recipient's entry, and patient
+    accounts to the shared patient total. Entries are dropped once the
+    transaction commits.
+    """
+
+    @staticmethod
+    def register():
+        """Attach the session listeners (idempotent)."""
+        if event.contains(db.session, "after_flush", SidebarStatsCache._after_flush):
+            return
+        event.listen(db.session, "after_flush", SidebarStatsCache._after_flush)
+        event.listen(db.session, "after_commit", SidebarStatsCache._after_commit)
+        event.listen(db.session, "after_rollback", SidebarStatsCache._after_rollback)
+
+    @staticmethod
+    def _tags(obj, state, previous):
+        """Tags of the entries a row counts towards, before or after the flush."""
+
+        def value(attribute):
+            history = state.attrs[attribute].history
+            if previous and history.deleted:
+                return history.deleted[0]
+            return getattr(obj, attribute)
+
+        if isinstance(obj, User):
+            return {"sidebar:patients"} if value("role") == "patient" else set()
+
+        owner_attribute, _ = WATCHED_MODELS[type(obj)]
+        owner = value(owner_attribute)
+        tags = {f"sidebar:user:{owner}"} if owner is not None else set()
+        if not isinstance(obj, InternalMessage):
+            tags.add("sidebar:facility")
+        return tags
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        tags = session.info.setdefault("sidebar_cache_tags", set())
+
+        for obj in session.new:
+            if isinstance(obj, User) or type(obj) in WATCHED_MODELS:
+                tags.update(SidebarStatsCache._tags(obj, inspect(obj), False))
+
+        for obj in session.dirty:
+            if isinstance(obj, User):
+                watched = ("role",)
+            elif type(obj) in WATCHED_MODELS:
+                watched = WATCHED_MODELS[type(obj)][1]
+            else:
+                continue
+            state = inspect(obj)
+            if not any(state.attrs[name].history.has_changes() for name in watched):
+                continue
+            tags.update(SidebarStatsCache._tags(obj, state, False))
+            tags.update(SidebarStatsCache._tags(obj, state, True))
+
+        for obj in session.deleted:
+            if isinstance(obj, User) or type(obj) in WATCHED_MODELS:
+                tags.update(SidebarStatsCache._tags(obj, inspect(obj), True))
+
+    @staticmethod
+    def _after_commit(session):
+        tags = session.info.pop("sidebar_cache_tags", None)
+        if not tags:
+            return
+        for tag in tags:
+            try:
+                analytics_cache.invalidate(tag)
+            except sqlite3.Error as e:
+                current_app.logger.warning(f"Sidebar cache invalidation failed: {e}")
+
+    @staticmethod
+    def _after_rollback(session):
+        session.info.pop("sidebar_cache_tags", None)
@@ -0,0 +1,246 @@
+import hashlib
+import math
+
+# HyperLogLog precision: 2**12 registers, about 1.6% standard error
+HLL_PRECISION = 12
+
+
+class HyperLogLog:
+    """Mergeable distinct-count estimator with sparse register storage.
+
+    Only non-zero registers are stored, so the small sets typical of one
+    item on one day stay tiny when serialized. Small cardinalities use
+    linear counting and are effectively exact.
+    """
+
+    def __init__(self, registers=None, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = dict(registers or {})
+
+    @property
+    def size(self):
+        return 1 << self.precision
+
+    def add(self, value):
+        digest = hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest()
+        hashed = int.from_bytes(digest, "big")
+        index = hashed >> (64 - self.precision)
+        remaining_bits = 64 - self.precision
+        rest = hashed & ((1 << remaining_bits) - 1)
+        rank = remaining_bits - rest.bit_length() + 1
+        if rank > self.registers.get(index, 0):
+            self.registers[index] = rank
+
+    def merge(self, other):
+        for index, rank in other.registers.items():
+            if rank > self.registers.get(index, 0):
+                self.registers[index] = rank
+        return self
+
+    def estimate(self):
+        m = self.size
+        zeros = m - len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / (zeros + sum(2.0 ** -rank for rank in self.registers.values()))
+        if raw <= 2.5 * m and zeros:
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
+
+    def to_dict(self):
+        return {str(index): rank for index, rank in self.registers.items()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls({int(index): rank for index, rank in data.items()})
+
+
+class SpaceSavingSketch:
+    """Top-K heavy hitters (Space-Saving) with a distinct-patient HLL per item.
+
+    Each tracked item has a count and the maximum overestimate of that
+    count. While fewer than ``capacity`` distinct items have been seen all
+    counts are exact. Sketches merge by adding counters, so per-day sketches
+    can be combined for any date range.
+    """
+
+    def __init__(self, capacity, counters=None, patients=None):
+        self.capacity = capacity
+        self.counters = dict(counters or {})
+        self.patients = dict(patients or {})
+
+    def add(self, item, patient_id, count=1):
+        if item in self.counters:
+            current, error = self.counters[item]
+            self.counters[item] = (current + count, error)
+        elif len(self.counters) < self.capacity:
+            self.counters[item] = (count, 0)
+        else:
+            # Replace the smallest counter; its count becomes the new error
+            evicted = min(self.counters, key=lambda key: self.counters[key][0])
+            floor, _ = self.counters.pop(evicted)
+            self.patients.pop(evicted, None)
+            self.counters[item] = (floor + count, floor)
+        self.patients.setdefault(item, HyperLogLog()).add(patient_id)
+
+    def _floor(self):
+        """Upper bound on the count of any item this sketch dropped."""
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    def merge(self, other):
+        floor, other_floor = self._floor(), other._floor()
+        merged = {}
+        for item in set(self.counters) | set(other.counters):
+            count, error = self.counters.get(item, (floor, floor))
+            other_count, other_error = other.counters.get(item, (other_floor, other_floor))
+            merged[item] = (count + other_count, error + other_error)
+
+        kept = sorted(merged, key=lambda key: (-merged[key][0], key))[: self.capacity]
+        self.counters = {item: merged[item] for item in kept}
+
+        patients = {}
+        for item in kept:
+            hll = HyperLogLog()
+            if item in self.patients:
+                hll.merge(self.patients[item])
+            if item in other.patients:
+                hll.merge(other.patients[item])
+            patients[item] = hll
+        self.patients = patients
+        return self
+
+    def top(self, limit):
+        """``(item, count, distinct_patients)`` tuples, largest counts first."""
+        items = sorted(self.counters, key=lambda key: (-self.counters[key][0], key))
+        return [
+            (
+                item,
+                self.counters[item][0],
+                self.patients[item].estimate() if item in self.patients else 0,
+            )
+            for item in items[:limit]
+        ]
+
+    def to_dict(self):
+        return {
+            "capacity": self.capacity,
+            "counters": {item: list(value) for item, value in self.counters.items()},
+            "patients": {item: hll.to_dict() for item, hll in self.patients.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["capacity"],
+            {item: tuple(value) for item, value in data["counters"].items()},
+            {item: HyperLogLog.from_dict(value) for item, value in data["patients"].items()},
+        )
+
+
+class TDigest:
+    """Mergeable streaming quantile estimator (merging t-digest).
+
+    Values are buffered and periodically merged into a bounded list of
+    weighted centroids; centroids near the tails are kept small, so
+    extreme quantiles such as p99 stay accurate. Memory is proportional
+    to ``compression``, not to the number of values added.
+    """
+
+    def __init__(self, compression=100, centroids=None, count=0, minimum=None, maximum=None):
+        self.compression = compression
+        self.centroids = [tuple(centroid) for centroid in centroids or []]
+        self.count = count
+        self.minimum = minimum
+        self.maximum = maximum
+        self._buffer = []
+
+    def add(self, value, weight=1):
+        self._buffer.append((float(value), weight))
+        self.count += weight
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+        if len(self._buffer) >= self.compression * 5:
+            self._compress()
+
+    def merge(self, other):
+        other._compress()
+        self._buffer.extend(other.centroids)
+        self.count += other.count
+        for value in (other.minimum, other.maximum):
+            if value is not None:
+                self.minimum = value if self.minimum is None else min(self.minimum, value)
+                self.maximum = value if self.maximum is None else max(self.maximum, value)
+        self._compress()
+        return self
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        points = sorted(self.centroids + self._buffer)
+        self._buffer = []
+
+        total = sum(weight for _, weight in points)
+        merged = []
+        mean, weight = points[0]
+        cumulative = 0
+        for point_mean, point_weight in points[1:]:
+            q = (cumulative + weight + point_weight / 2) / total
+            limit = max(1, 4 * total * q * (1 - q) / self.compression)
+            if weight + point_weight <= limit:
+                mean += (point_mean - mean) * point_weight / (weight + point_weight)
+                weight += point_weight
+            else:
+                merged.append((mean, weight))
+                cumulative += weight
+                mean, weight = point_mean, point_weight
+        merged.append((mean, weight))
+        self.centroids = merged
+
+    def quantile(self, q):
+        """Estimated value at quantile ``q`` (0-1), or None when empty."""
+        self._compress()
+        if not self.centroids:
+            return None
+        if len(self.centroids) == 1 or q <= 0:
+            return self.minimum if q <= 0 else self.centroids[0][0]
+        if q >= 1:
+            return self.maximum
+
+        # Each centroid's mean sits at the middle of its weight; interpolate
+        # between neighbouring midpoints, and towards min/max at the ends.
+        target = q * self.count
+        cumulative = 0
+        previous_mean, previous_mid = self.minimum, 0
+        for mean, weight in self.centroids:
+            mid = cumulative + weight / 2
+            if target < mid:
+                span = mid - previous_mid
+                fraction = (target - previous_mid) / span if span else 0
+                return previous_mean + (mean - previous_mean) * fraction
+            previous_mean, previous_mid = mean, mid
+            cumulative += weight
+
+        span = self.count - previous_mid
+        fraction = (target - previous_mid) / span if span else 0
+        return previous_mean + (self.maximum - previous_mean) * fraction
+
+    def to_dict(self):
+        self._compress()
+        return {
+            "compression": self.compression,
+            "centroids": [list(centroid) for centroid in self.centroids],
+            "count": self.count,
+            "min": self.minimum,
+            "max": self.maximum,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data["compression"],
+            data["centroids"],
+            data["count"],
+            data["min"],
+            data["max"],
+        )
@@ -1,10 +1,19 @@
-from flask import session
+from flask import session, has_request_context, has_app_context, current_app, g
 import pytz
-from datetime import datetime
+from datetime import datetime, time, timedelta
 
 
 def get_user_timezone():
-    """Get user's timezone from session or default to Philippines timezone."""
+    """Get user's timezone from session or default to Philippines timezone.
+
+    Outside a request, a timezone set on ``g.user_timezone`` (e.g. by a
+    background job acting for a user) is used instead of the session.
+    """
+    if not has_request_context():
+        if has_app_context() and g.get("user_timezone"):
+            return pytz.timezone(g.user_timezone)
+        return pytz.timezone("Asia/Manila")
+
     user_timezone = session.get("user_timezone", "Asia/Manila")
     try:
         return pytz.timezone(user_timezone)
@@ -12,6 +21,14 @@ def get_user_timezone():
         return pytz.timezone("Asia/Manila")
 
 
+def get_reporting_timezone():
+    """Get the clinic timezone whose local days the reporting rollups use."""
+    timezone_name = "Asia/Manila"
+    if has_app_context():
+        timezone_name = current_app.config.get("ANALYTICS_TIMEZONE", timezone_name)
+    return pytz.timezone(timezone_name)
+
+
 def localize_datetime(dt, timezone=None):
     """Convert UTC datetime to user's timezone."""
     if dt is None:
@@ -35,3 +52,44 @@ def get_current_time(timezone=None):
     utc_now = datetime.utcnow()
     utc_dt = pytz.utc.localize(utc_now)
     return utc_dt.astimezone(timezone)
+
+
+def get_utc_date_bounds(start_date, end_date=None, timezone=None):
+    """Convert an inclusive range of local dates into half-open UTC bounds.
+
+    Returns naive UTC datetimes ``(start, end)`` so that filtering with
+    ``start <= column < end`` selects every row whose local date falls in
+    ``[start_date, end_date]`` while still letting the database use an index
+    on the column.
+    """
+    if end_date is None:
+        end_date = start_date
+
+    if timezone is None:
+        timezone = get_user_timezone()
+
+    start_local = timezone.localize(datetime.combine(start_date, time.min))
+    end_local = timezone.localize(
+        datetime.combine(end_date + timedelta(days=1), time.min)
+    )
+
+    return (
+        start_local.astimezone(pytz.utc).replace(tzinfo=None),
+        end_local.astimezone(pytz.utc).replace(tzinfo=None),
+    )
+
+
+def get_local_date_bounds(start_date, end_date=None):
+    """Half-open naive bounds of an inclusive range of dates, unconverted.
+
+    For columns that store local wall-clock time rather than UTC, such as
+    ``Appointment.appointment_date``: a row's local date is simply the
+    date of its stored value.
+    """
+    if end_date is None:
+        end_date = start_date
+
+    return (
+        datetime.combine(start_date, time.min),
+        datetime.combine(end_date + timedelta(days=1), time.min),
+    )
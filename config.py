@@ -52,6 +52,31 @@ class Config:
     HCAPTCHA_SITE_KEY = os.environ.get('HCAPTCHA_SITE_KEY', '')
     HCAPTCHA_SECRET_KEY = os.environ.get('HCAPTCHA_SECRET_KEY', '')
 
+    # Reporting settings
+    ANALYTICS_TIMEZONE = os.environ.get('ANALYTICS_TIMEZONE', 'Asia/Manila')
+    ANALYTICS_ROLLUP_ENABLED = os.environ.get('ANALYTICS_ROLLUP_ENABLED', 'True').lower() in ['true', 'on', '1']
+    TREND_SKETCH_CAPACITY = int(os.environ.get('TREND_SKETCH_CAPACITY', 200))  # items tracked per daily sketch
+    DIAGNOSIS_SYNONYMS = {}  # extra synonyms, e.g. {'URI': 'Upper respiratory tract infection'}
+    DIAGNOSIS_SYNONYMS_FILE = os.environ.get('DIAGNOSIS_SYNONYMS_FILE')  # JSON object of synonym -> diagnosis
+    ANALYTICS_CACHE_BACKEND = os.environ.get('ANALYTICS_CACHE_BACKEND', 'memory')  # memory, sqlite or none
+    ANALYTICS_CACHE_PATH = os.environ.get('ANALYTICS_CACHE_PATH')  # defaults to instance/analytics_cache.db
+    ANALYTICS_CACHE_MAX_ENTRIES = int(os.environ.get('ANALYTICS_CACHE_MAX_ENTRIES', 512))
+    ANALYTICS_CACHE_TTLS = {}  # per-method TTL overrides in seconds, e.g. {'generate_timeseries': 60}
+    ANALYTICS_CACHE_CLOSED_TTL = int(os.environ.get('ANALYTICS_CACHE_CLOSED_TTL', 3600))  # seconds; for ranges that have ended
+    STATS_SNAPSHOT_INTERVAL = int(os.environ.get('STATS_SNAPSHOT_INTERVAL', 30))  # seconds; 0 computes on every request
+    STATS_SNAPSHOT_PATH = os.environ.get('STATS_SNAPSHOT_PATH')  # defaults to instance/stats_snapshot.db
+    STATS_SNAPSHOT_LEASE = 30  # seconds one worker may take to recompute the snapshot
+
+    # Background report jobs
+    REPORT_JOB_WORKERS = int(os.environ.get('REPORT_JOB_WORKERS', 2))  # 0 runs jobs inline
+    REPORT_JOB_DIR = os.environ.get('REPORT_JOB_DIR')  # defaults to instance/report_jobs
+    REPORT_JOB_TIMEOUT_MINUTES = int(os.environ.get('REPORT_JOB_TIMEOUT_MINUTES', 30))
+    REPORT_JOB_RETENTION_HOURS = int(os.environ.get('REPORT_JOB_RETENTION_HOURS', 24))
+
+    # Messaging
+    MESSAGE_EVENT_RETENTION_DAYS = int(os.environ.get('MESSAGE_EVENT_RETENTION_DAYS', 30))  # sync tokens older than this reset
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')  # e.g. redis://localhost:6379/0 to share pushes between processes
+
 class DevelopmentConfig(Config):
     """Development configuration."""
     DEBUG = True
@@ -0,0 +1,59 @@
+"""Store appointments.end_time for indexed overlap checks
+
+Revision ID: add_appointment_end_time
+Revises: add_composite_indexes
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from datetime import timedelta
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_appointment_end_time'
+down_revision = 'add_composite_indexes'
+branch_labels = None
+depends_on = None
+
+# Rows updated per statement while backfilling
+BATCH_SIZE = 1000
+
+appointments = sa.table(
+    'appointments',
+    sa.column('id', sa.Integer()),
+    sa.column('appointment_date', sa.DateTime()),
+    sa.column('duration_minutes', sa.Integer()),
+    sa.column('end_time', sa.DateTime()),
+)
+
+def upgrade():
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('end_time', sa.DateTime(), nullable=True))
+
+    # Computed in Python so every database stores the value in the same
+    # format as appointment_date and the two compare correctly.
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(appointments.c.id, appointments.c.appointment_date, appointments.c.duration_minutes)
+    ).fetchall()
+    update = (
+        appointments.update()
+        .where(appointments.c.id == sa.bindparam('row_id'))
+        .values(end_time=sa.bindparam('row_end_time'))
+    )
+    for offset in range(0, len(rows), BATCH_SIZE):
+        connection.execute(update, [
+            {'row_id': row_id, 'row_end_time': start + timedelta(minutes=duration)}
+            for row_id, start, duration in rows[offset:offset + BATCH_SIZE]
+        ])
+
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.alter_column('end_time', existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_index(
+            'ix_appointments_doctor_end', ['doctor_id', 'end_time', 'appointment_date', 'status']
+        )
+
+def downgrade():
+    with op.batch_alter_table('appointments', schema=None) as batch_op:
+        batch_op.drop_index('ix_appointments_doctor_end')
+        batch_op.drop_column('end_time')
@@ -0,0 +1,37 @@
+"""Add composite indexes for hot query shapes
+
+Revision ID: add_composite_indexes
+Revises: add_diagnoses
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers
+revision = 'add_composite_indexes'
+down_revision = 'add_diagnoses'
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns)
+INDEXES = [
+    ('ix_appointments_doctor_date_status', 'appointments', ['doctor_id', 'appointment_date', 'status']),
+    ('ix_appointments_patient_date', 'appointments', ['patient_id', 'appointment_date']),
+    ('ix_consultations_status_doctor', 'consultations', ['status', 'doctor_id']),
+    ('ix_consultations_doctor_date', 'consultations', ['doctor_id', 'consultation_date']),
+    ('ix_prescriptions_created_at', 'prescriptions', ['created_at']),
+    ('ix_prescriptions_doctor_created', 'prescriptions', ['doctor_id', 'created_at']),
+    ('ix_prescriptions_doctor_prescribed', 'prescriptions', ['doctor_id', 'prescribed_date']),
+    ('ix_internal_messages_recipient_unread', 'internal_messages', ['recipient_id', 'is_read', 'is_deleted_by_recipient']),
+    ('ix_internal_messages_recipient_inbox', 'internal_messages', ['recipient_id', 'is_deleted_by_recipient', 'created_at']),
+    ('ix_internal_messages_sender_sent', 'internal_messages', ['sender_id', 'is_deleted_by_sender', 'created_at']),
+    ('ix_users_role_active', 'users', ['role', 'active']),
+]
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
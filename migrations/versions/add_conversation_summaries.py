@@ -0,0 +1,79 @@
+"""Add conversation_summaries and a sender/recipient message index
+
+Revision ID: add_conversation_summaries
+Revises: add_appointment_end_time
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_conversation_summaries'
+down_revision = 'add_appointment_end_time'
+branch_labels = None
+depends_on = None
+
+# Latest message and unread count of every (user, peer) conversation; the
+# same computation as `flask rebuild-conversation-summaries`
+BACKFILL = sa.text("""
+    INSERT INTO conversation_summaries
+        (user_id, peer_id, last_message_id, last_message_at, unread_count, updated_at)
+    SELECT user_id, peer_id, message_id, created_at, unread_count, :now
+    FROM (
+        SELECT user_id, peer_id, message_id, created_at,
+               ROW_NUMBER() OVER (
+                   PARTITION BY user_id, peer_id
+                   ORDER BY created_at DESC, message_id DESC
+               ) AS position,
+               SUM(unread) OVER (PARTITION BY user_id, peer_id) AS unread_count
+        FROM (
+            SELECT sender_id AS user_id, recipient_id AS peer_id,
+                   id AS message_id, created_at, 0 AS unread
+            FROM internal_messages
+            UNION ALL
+            SELECT recipient_id, sender_id, id, created_at,
+                   CASE WHEN is_read = :false AND is_deleted_by_recipient = :false
+                        THEN 1 ELSE 0 END
+            FROM internal_messages
+        ) AS sides
+    ) AS ranked
+    WHERE position = 1
+""").bindparams(
+    sa.bindparam('now', type_=sa.DateTime()),
+    sa.bindparam('false', False, type_=sa.Boolean()),
+)
+
+def upgrade():
+    op.create_index(
+        'ix_internal_messages_pair', 'internal_messages', ['sender_id', 'recipient_id', 'created_at']
+    )
+
+    op.create_table(
+        'conversation_summaries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('peer_id', sa.Integer(), nullable=False),
+        sa.Column('last_message_id', sa.Integer(), nullable=False),
+        sa.Column('last_message_at', sa.DateTime(), nullable=True),
+        sa.Column('unread_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['peer_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['last_message_id'], ['internal_messages.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'peer_id', name='uq_conversation_summaries_user_peer'),
+    )
+    op.create_index(
+        'ix_conversation_summaries_user_recent',
+        'conversation_summaries',
+        ['user_id', 'last_message_at', 'last_message_id'],
+    )
+
+    op.get_bind().execute(BACKFILL, {'now': datetime.utcnow()})
+
+def downgrade():
+    op.drop_index('ix_conversation_summaries_user_recent', table_name='conversation_summaries')
+    op.drop_table('conversation_summaries')
+    op.drop_index('ix_internal_messages_pair', table_name='internal_messages')
@@ -0,0 +1,47 @@
+"""Add daily_metrics reporting rollup table
+
+Revision ID: add_daily_metrics
+Revises: add_admin_field
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_daily_metrics'
+down_revision = 'add_admin_field'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'daily_metrics',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('metric_date', sa.Date(), nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=True),
+        sa.Column('total_appointments', sa.Integer(), nullable=False),
+        sa.Column('scheduled_appointments', sa.Integer(), nullable=False),
+        sa.Column('confirmed_appointments', sa.Integer(), nullable=False),
+        sa.Column('in_progress_appointments', sa.Integer(), nullable=False),
+        sa.Column('completed_appointments', sa.Integer(), nullable=False),
+        sa.Column('cancelled_appointments', sa.Integer(), nullable=False),
+        sa.Column('no_show_appointments', sa.Integer(), nullable=False),
+        sa.Column('total_consultations', sa.Integer(), nullable=False),
+        sa.Column('completed_consultations', sa.Integer(), nullable=False),
+        sa.Column('total_prescriptions', sa.Integer(), nullable=False),
+        sa.Column('new_patients', sa.Integer(), nullable=False),
+        sa.Column('unique_patients', sa.Integer(), nullable=False),
+        sa.Column('unique_patients_seen', sa.Integer(), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['doctor_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('metric_date', 'doctor_id', name='uq_daily_metric_date_doctor'),
+    )
+    op.create_index('ix_daily_metrics_metric_date', 'daily_metrics', ['metric_date'])
+    op.create_index('ix_daily_metrics_doctor_id', 'daily_metrics', ['doctor_id'])
+
+def downgrade():
+    op.drop_index('ix_daily_metrics_doctor_id', table_name='daily_metrics')
+    op.drop_index('ix_daily_metrics_metric_date', table_name='daily_metrics')
+    op.drop_table('daily_metrics')
@@ -0,0 +1,43 @@
+"""Add diagnoses dictionary and consultations.diagnosis_code
+
+Revision ID: add_diagnoses
+Revises: add_trend_sketches
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_diagnoses'
+down_revision = 'add_trend_sketches'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'diagnoses',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('key_hash', sa.String(length=40), nullable=False),
+        sa.Column('normalized_name', sa.Text(), nullable=False),
+        sa.Column('display_name', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_diagnoses_key_hash', 'diagnoses', ['key_hash'], unique=True)
+
+    with op.batch_alter_table('consultations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('diagnosis_code', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            'fk_consultations_diagnosis_code', 'diagnoses', ['diagnosis_code'], ['id']
+        )
+        batch_op.create_index('ix_consultations_diagnosis_code', ['diagnosis_code'])
+
+def downgrade():
+    with op.batch_alter_table('consultations', schema=None) as batch_op:
+        batch_op.drop_index('ix_consultations_diagnosis_code')
+        batch_op.drop_constraint('fk_consultations_diagnosis_code', type_='foreignkey')
+        batch_op.drop_column('diagnosis_code')
+
+    op.drop_index('ix_diagnoses_key_hash', table_name='diagnoses')
+    op.drop_table('diagnoses')
@@ -0,0 +1,34 @@
+"""Add message_events for incremental message sync
+
+Revision ID: add_message_events
+Revises: add_conversation_summaries
+Create Date: 2026-10-18 23:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_message_events'
+down_revision = 'add_conversation_summaries'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # message_id has no foreign key so tombstones outlive hard deletes
+    op.create_table(
+        'message_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('message_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sqlite_autoincrement=True,
+    )
+    op.create_index('ix_message_events_user_id', 'message_events', ['user_id', 'id'])
+
+def downgrade():
+    op.drop_index('ix_message_events_user_id', table_name='message_events')
+    op.drop_table('message_events')
@@ -0,0 +1,38 @@
+"""Add message_sync_state and move the sync prune watermark into it
+
+Revision ID: add_message_sync_state
+Revises: rebuild_daily_metrics
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_message_sync_state'
+down_revision = 'rebuild_daily_metrics'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'message_sync_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('pruned_through', sa.Integer(), nullable=False),
+        sa.Column('last_logged_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.execute(
+        "INSERT INTO message_sync_state (id, pruned_through) "
+        "SELECT 1, COALESCE(MAX(value), 0) FROM metric_counters "
+        "WHERE name = 'message_events_pruned_through'"
+    )
+    op.execute("DELETE FROM metric_counters WHERE name = 'message_events_pruned_through'")
+
+def downgrade():
+    op.execute(
+        "INSERT INTO metric_counters (name, value, updated_at) "
+        "SELECT 'message_events_pruned_through', pruned_through, CURRENT_TIMESTAMP "
+        "FROM message_sync_state WHERE pruned_through > 0"
+    )
+    op.drop_table('message_sync_state')
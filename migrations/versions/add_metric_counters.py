@@ -0,0 +1,27 @@
+"""Add metric_counters table for system-wide running totals
+
+Revision ID: add_metric_counters
+Revises: add_daily_metrics
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_metric_counters'
+down_revision = 'add_daily_metrics'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'metric_counters',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+
+def downgrade():
+    op.drop_table('metric_counters')
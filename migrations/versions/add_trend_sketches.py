@@ -0,0 +1,36 @@
+"""Add trend_sketches table for top-K medication and diagnosis trends
+
+Revision ID: add_trend_sketches
+Revises: add_report_jobs
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_trend_sketches'
+down_revision = 'add_report_jobs'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'trend_sketches',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('metric_date', sa.Date(), nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=True),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['doctor_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('kind', 'metric_date', 'doctor_id', name='uq_trend_sketch_kind_date_doctor'),
+    )
+    op.create_index('ix_trend_sketches_metric_date', 'trend_sketches', ['metric_date'])
+    op.create_index('ix_trend_sketches_doctor_id', 'trend_sketches', ['doctor_id'])
+
+def downgrade():
+    op.drop_index('ix_trend_sketches_doctor_id', table_name='trend_sketches')
+    op.drop_index('ix_trend_sketches_metric_date', table_name='trend_sketches')
+    op.drop_table('trend_sketches')
@@ -0,0 +1,26 @@
+"""Clear daily_metrics so appointments are rolled up on their local day
+
+Appointment times are stored as local wall time, but earlier rollups
+counted them on the local day of the time read as UTC. Cleared days are
+computed from the raw tables until `flask refresh-daily-metrics` fills
+them again.
+
+Revision ID: rebuild_daily_metrics
+Revises: add_message_events
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers
+revision = 'rebuild_daily_metrics'
+down_revision = 'add_message_events'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute('DELETE FROM daily_metrics')
+
+def downgrade():
+    # The rollup is derived data; `flask refresh-daily-metrics` rebuilds it
+    pass
@@ -0,0 +1,92 @@
+import contextlib
+import itertools
+import pytest
+from sqlalchemy import event
+from app import create_app, db
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.user import User
+from config import TestingConfig, config
+
+_sequence = itertools.count(1)
+
+
+@pytest.fixture
+def app(tmp_path):
+    """App backed by a fresh SQLite file, with every session listener active."""
+
+    class DatabaseTestingConfig(TestingConfig):
+        DISABLE_DATABASE = False
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        ANALYTICS_CACHE_BACKEND = "none"
+        STATS_SNAPSHOT_PATH = str(tmp_path / "stats_snapshot.db")
+        REPORT_JOB_DIR = str(tmp_path / "report_jobs")
+        REPORT_JOB_WORKERS = 0
+        HCAPTCHA_ENABLED = False
+
+    config["pytest"] = DatabaseTestingConfig
+    app = create_app("pytest")
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def make_user(app):
+    """Create and commit a user with the given role."""
+
+    def make(role="patient", **fields):
+        number = next(_sequence)
+        user = User(
+            username=f"{role}{number}",
+            email=f"{role}{number}@example.com",
+            password_hash="x",
+            role=role,
+            first_name=role.title(),
+            last_name=str(number),
+            **fields,
+        )
+        db.session.add(user)
+        db.session.commit()
+        return user
+
+    return make
+
+
+@pytest.fixture
+def make_appointment(app):
+    """Add an appointment without committing it."""
+
+    def make(doctor, patient, when, status=AppointmentStatus.SCHEDULED, **fields):
+        appointment = Appointment(
+            doctor_id=doctor.id,
+            patient_id=patient.id,
+            appointment_date=when,
+            status=status,
+            **fields,
+        )
+        db.session.add(appointment)
+        return appointment
+
+    return make
+
+
+@pytest.fixture
+def count_selects(app):
+    """Context manager collecting the SELECT statements run inside it."""
+
+    @contextlib.contextmanager
+    def count():
+        statements = []
+
+        def record(connection, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+                statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+
+    return count
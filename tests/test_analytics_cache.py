@@ -0,0 +1,130 @@
+from datetime import date, datetime
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import insert
+from app import db
+from app.models.appointment import Appointment
+from app.services import analytics_cache as analytics_cache_module
+from app.services.analytics_cache import analytics_cache
+from app.services.analytics_service import AnalyticsService
+
+# A range that has ended, and one that has not
+PAST = (date(2020, 3, 2), date(2020, 3, 8))
+FUTURE = (date(2030, 3, 4), date(2030, 3, 10))
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def cache(request, app, tmp_path):
+    app.config["ANALYTICS_CACHE_BACKEND"] = request.param
+    app.config["ANALYTICS_CACHE_PATH"] = str(tmp_path / "analytics_cache.db")
+    analytics_cache.init_app(app)
+    yield analytics_cache
+    app.extensions["analytics_cache"] = None
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """The cache's clock, frozen at now until moved forward."""
+    now = SimpleNamespace(value=datetime.utcnow().timestamp())
+    monkeypatch.setattr(
+        analytics_cache_module, "time", SimpleNamespace(time=lambda: now.value)
+    )
+    return now
+
+
+@pytest.fixture
+def booking(make_user, make_appointment):
+    doctor, patient = make_user("doctor"), make_user()
+
+    def book(day, hour=10):
+        make_appointment(doctor, patient, datetime(day.year, day.month, day.day, hour))
+        db.session.commit()
+
+    return book
+
+
+def _total(date_range):
+    return AnalyticsService.generate_appointment_metrics(*date_range)["total_appointments"]
+
+
+def test_repeated_call_is_a_hit(cache, booking, count_selects):
+    booking(FUTURE[0])
+    assert _total(FUTURE) == 1
+
+    with count_selects() as statements:
+        assert _total(FUTURE) == 1
+
+    assert statements == []
+    stats = cache.stats()["methods"]["generate_appointment_metrics"]
+    assert stats == {"hits": 1, "misses": 1}
+
+
+def test_commit_invalidates_only_ranges_it_touches(cache, booking):
+    assert _total(FUTURE) == 0
+    assert _total(PAST) == 0
+
+    booking(FUTURE[1])
+    assert _total(FUTURE) == 1
+    assert cache.stats()["methods"]["generate_appointment_metrics"]["hits"] == 0
+
+    # Outside the past range: its entry survives
+    booking(date(2020, 3, 9))
+    assert _total(PAST) == 0
+    assert cache.stats()["methods"]["generate_appointment_metrics"]["hits"] == 1
+
+
+def test_closed_range_expires_after_closed_ttl(app, cache, clock):
+    app.config["ANALYTICS_CACHE_CLOSED_TTL"] = 7200
+    assert _total(PAST) == 0
+    assert _total(FUTURE) == 0
+
+    # A write that bypasses the ORM invalidates nothing
+    db.session.execute(
+        insert(Appointment),
+        [
+            {
+                "doctor_id": 1,
+                "patient_id": 1,
+                "appointment_date": datetime(2020, 3, 3, 10),
+                "end_time": datetime(2020, 3, 3, 10, 30),
+            },
+            {
+                "doctor_id": 1,
+                "patient_id": 1,
+                "appointment_date": datetime(2030, 3, 5, 10),
+                "end_time": datetime(2030, 3, 5, 10, 30),
+            },
+        ],
+    )
+    db.session.commit()
+
+    # Past the method's own TTL, the open range is recomputed
+    clock.value += 301
+    assert _total(PAST) == 0
+    assert _total(FUTURE) == 1
+
+    # but the closed one is kept no longer than the closed-range TTL
+    clock.value += 7200
+    assert _total(PAST) == 1
+
+
+def test_refresh_daily_metrics_invalidates_its_days(cache):
+    assert AnalyticsService.generate_timeseries(*PAST)[1]["total_appointments"] == 0
+
+    db.session.execute(
+        insert(Appointment),
+        [
+            {
+                "doctor_id": 1,
+                "patient_id": 1,
+                "appointment_date": datetime(2020, 3, 3, 10),
+                "end_time": datetime(2020, 3, 3, 10, 30),
+            }
+        ],
+    )
+    db.session.commit()
+    assert AnalyticsService.generate_timeseries(*PAST)[1]["total_appointments"] == 0
+
+    AnalyticsService.refresh_daily_metrics(*PAST)
+
+    assert AnalyticsService.generate_timeseries(*PAST)[1]["total_appointments"] == 1
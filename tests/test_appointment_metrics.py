@@ -0,0 +1,71 @@
+import random
+from datetime import date, datetime, timedelta
+import pytest
+from sqlalchemy import func
+from app import db
+from app.models.appointment import Appointment, AppointmentStatus
+from app.services.analytics_service import AnalyticsService
+
+
+def _row_loading_metrics(start_date, end_date, doctor_id=None):
+    """The original implementation: load every row and count in Python."""
+    query = Appointment.query.filter(
+        func.date(Appointment.appointment_date) >= start_date,
+        func.date(Appointment.appointment_date) <= end_date,
+    )
+    if doctor_id:
+        query = query.filter(Appointment.doctor_id == doctor_id)
+    appointments = query.all()
+
+    def count(status):
+        return len([a for a in appointments if a.status == status])
+
+    total = len(appointments)
+    completed = count(AppointmentStatus.COMPLETED)
+    cancelled = count(AppointmentStatus.CANCELLED)
+    return {
+        "total_appointments": total,
+        "scheduled_appointments": count(AppointmentStatus.SCHEDULED),
+        "confirmed_appointments": count(AppointmentStatus.CONFIRMED),
+        "completed_appointments": completed,
+        "cancelled_appointments": cancelled,
+        "unique_patients": len({a.patient_id for a in appointments}),
+        "completion_rate": round((completed / total * 100) if total > 0 else 0, 2),
+        "cancellation_rate": round((cancelled / total * 100) if total > 0 else 0, 2),
+    }
+
+
+@pytest.fixture
+def seeded(app, make_user, make_appointment):
+    rng = random.Random(7)
+    doctors = [make_user("doctor") for _ in range(3)]
+    patients = [make_user() for _ in range(15)]
+    first_day = date(2030, 3, 1)
+    for _ in range(400):
+        when = datetime.combine(
+            first_day + timedelta(days=rng.randrange(40)), datetime.min.time()
+        ) + timedelta(minutes=rng.randrange(24 * 60))
+        make_appointment(
+            rng.choice(doctors),
+            rng.choice(patients),
+            when,
+            status=rng.choice(list(AppointmentStatus)),
+        )
+    db.session.commit()
+    return doctors
+
+
+@pytest.mark.parametrize(
+    "start_date, end_date",
+    [
+        (date(2030, 3, 1), date(2030, 4, 9)),
+        (date(2030, 3, 10), date(2030, 3, 10)),
+        (date(2030, 3, 5), date(2030, 3, 25)),
+        (date(2031, 1, 1), date(2031, 1, 31)),
+    ],
+)
+def test_single_query_matches_row_loading(seeded, start_date, end_date):
+    for doctor_id in [None] + [doctor.id for doctor in seeded]:
+        assert AnalyticsService.generate_appointment_metrics(
+            start_date, end_date, doctor_id
+        ) == _row_loading_metrics(start_date, end_date, doctor_id)
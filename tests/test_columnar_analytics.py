@@ -0,0 +1,154 @@
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+import pytest
+from app import db
+from app.models.appointment import Appointment, AppointmentStatus
+from app.services.analytics_service import AnalyticsService
+
+np = pytest.importorskip("numpy")
+
+from app.services.columnar_analytics import ColumnarAnalyticsService  # noqa: E402
+
+RANGES = [
+    (date(2030, 6, 1), date(2030, 7, 10)),
+    (date(2030, 6, 15), date(2030, 6, 15)),
+    (date(2030, 6, 20), date(2030, 8, 31)),
+]
+
+
+@pytest.fixture
+def seeded(app, make_user, make_appointment):
+    rng = random.Random(3)
+    doctors = [make_user("doctor") for _ in range(3)]
+    patients = [make_user() for _ in range(20)]
+    first_day = date(2030, 5, 30)
+    for _ in range(500):
+        when = datetime.combine(
+            first_day + timedelta(days=rng.randrange(45)), datetime.min.time()
+        ) + timedelta(minutes=rng.randrange(24 * 60))
+        make_appointment(
+            rng.choice(doctors),
+            rng.choice(patients),
+            when,
+            status=rng.choice(list(AppointmentStatus)),
+        )
+    db.session.commit()
+    return doctors
+
+
+@pytest.mark.parametrize("start_date, end_date", RANGES)
+def test_appointment_metrics_match_row_based(seeded, start_date, end_date):
+    for doctor_id in [None] + [doctor.id for doctor in seeded]:
+        columns = ColumnarAnalyticsService.load(start_date, end_date, doctor_id)
+
+        assert ColumnarAnalyticsService.appointment_metrics(
+            columns
+        ) == AnalyticsService.generate_appointment_metrics(start_date, end_date, doctor_id)
+
+
+@pytest.mark.parametrize("start_date, end_date", RANGES)
+def test_daily_counts_match_timeseries(seeded, start_date, end_date):
+    for doctor_id in [None] + [doctor.id for doctor in seeded]:
+        columns = ColumnarAnalyticsService.load(start_date, end_date, doctor_id)
+        series = AnalyticsService.generate_timeseries(start_date, end_date, doctor_id=doctor_id)
+
+        assert ColumnarAnalyticsService.daily_counts(columns).tolist() == [
+            day["total_appointments"] for day in series
+        ]
+        for status in AppointmentStatus:
+            assert ColumnarAnalyticsService.daily_counts(columns, status).tolist() == [
+                day[f"{status.value}_appointments"] for day in series
+            ]
+
+
+def test_by_doctor_counts_match_doctor_filter(seeded):
+    start_date, end_date = RANGES[0]
+    columns = ColumnarAnalyticsService.load(start_date, end_date)
+    doctor_ids, counts = ColumnarAnalyticsService.daily_counts(columns, by_doctor=True)
+
+    assert sorted(doctor_ids.tolist()) == sorted(doctor.id for doctor in seeded)
+    for doctor_id, row in zip(doctor_ids.tolist(), counts.tolist()):
+        series = AnalyticsService.generate_timeseries(start_date, end_date, doctor_id=doctor_id)
+        assert row == [day["total_appointments"] for day in series]
+
+
+def test_lead_times_use_the_clinic_clock(app, make_user, make_appointment):
+    doctor, patient = make_user("doctor"), make_user()
+    # Booked at 08:30 UTC, 16:30 in Manila, for 16:30 local the next day
+    make_appointment(
+        doctor, patient, datetime(2030, 1, 15, 16, 30), created_at=datetime(2030, 1, 14, 8, 30)
+    )
+    make_appointment(
+        doctor, patient, datetime(2030, 1, 15, 10), created_at=datetime(2030, 1, 15, 1)
+    )
+    db.session.commit()
+
+    columns = ColumnarAnalyticsService.load(date(2030, 1, 15), date(2030, 1, 15))
+
+    assert sorted(columns.lead_minutes.tolist()) == [60, 24 * 60]
+    assert ColumnarAnalyticsService.lead_time_percentiles(columns, (0, 100)) == {
+        0: 1.0,
+        100: 24.0,
+    }
+
+
+@pytest.mark.skipif(
+    not os.environ.get("RUN_BENCHMARKS"), reason="set RUN_BENCHMARKS=1 to run"
+)
+def test_benchmark_one_million_appointments(app, make_user):
+    """Columnar vs row-based timings over 1M synthetic appointments."""
+    rng = np.random.default_rng(0)
+    doctors = [make_user("doctor").id for _ in range(20)]
+    patients = [make_user().id for _ in range(200)]
+    start_date, end_date = date(2030, 1, 1), date(2030, 12, 31)
+    days = (end_date - start_date).days + 1
+    statuses = list(AppointmentStatus)
+
+    size = 1_000_000
+    offsets = rng.integers(0, days * 24 * 60, size).tolist()
+    picks = rng.integers(0, 2**31, (size, 4)).tolist()
+    starts = datetime.combine(start_date, datetime.min.time())
+    for first in range(0, size, 50_000):
+        rows = []
+        for offset, (doctor, patient, status, lead) in zip(
+            offsets[first : first + 50_000], picks[first : first + 50_000]
+        ):
+            when = starts + timedelta(minutes=offset)
+            rows.append(
+                {
+                    "doctor_id": doctors[doctor % len(doctors)],
+                    "patient_id": patients[patient % len(patients)],
+                    "appointment_date": when,
+                    "duration_minutes": 30,
+                    "end_time": when + timedelta(minutes=30),
+                    "status": statuses[status % len(statuses)],
+                    "created_at": when - timedelta(minutes=lead % (30 * 24 * 60)),
+                }
+            )
+        # Core insert: the rollup and counter listeners only watch ORM flushes
+        db.session.execute(Appointment.__table__.insert(), rows)
+    db.session.commit()
+
+    began = time.perf_counter()
+    columns = ColumnarAnalyticsService.load(start_date, end_date)
+    doctor_ids, counts = ColumnarAnalyticsService.daily_counts(columns, by_doctor=True)
+    ColumnarAnalyticsService.daily_rates(columns, by_doctor=True)
+    ColumnarAnalyticsService.rolling_mean(counts)
+    ColumnarAnalyticsService.lead_time_percentiles(columns, by_doctor=True)
+    columnar_seconds = time.perf_counter() - began
+
+    began = time.perf_counter()
+    row_based = {
+        doctor_id: AnalyticsService.generate_timeseries(
+            start_date, end_date, doctor_id=doctor_id
+        )
+        for doctor_id in doctor_ids.tolist()
+    }
+    row_seconds = time.perf_counter() - began
+
+    print(f"\ncolumnar: {columnar_seconds:.2f}s  row-based: {row_seconds:.2f}s")
+    assert len(columns) == size
+    for doctor_id, row in zip(doctor_ids.tolist(), counts.tolist()):
+        assert row == [day["total_appointments"] for day in row_based[doctor_id]]
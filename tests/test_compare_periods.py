@@ -0,0 +1,143 @@
+from datetime import date, datetime
+import pytest
+from app import db
+from app.models.appointment import AppointmentStatus
+from app.services.analytics_service import AnalyticsService, _one_year_earlier
+
+
+@pytest.mark.parametrize(
+    "period, anchor, expected",
+    [
+        (
+            "day",
+            date(2030, 3, 1),
+            [
+                (date(2030, 3, 1), date(2030, 3, 1)),
+                (date(2030, 2, 28), date(2030, 2, 28)),
+                (date(2029, 3, 1), date(2029, 3, 1)),
+            ],
+        ),
+        (
+            "week",
+            date(2030, 1, 3),
+            [
+                (date(2029, 12, 28), date(2030, 1, 3)),
+                (date(2029, 12, 21), date(2029, 12, 27)),
+                (date(2028, 12, 28), date(2029, 1, 3)),
+            ],
+        ),
+        (
+            "month",
+            date(2030, 3, 31),
+            [
+                (date(2030, 3, 1), date(2030, 3, 31)),
+                # February is shorter: its whole month, not a run into March
+                (date(2030, 2, 1), date(2030, 2, 28)),
+                (date(2029, 3, 1), date(2029, 3, 31)),
+            ],
+        ),
+        (
+            "month",
+            date(2030, 3, 15),
+            [
+                (date(2030, 3, 1), date(2030, 3, 15)),
+                (date(2030, 2, 1), date(2030, 2, 15)),
+                (date(2029, 3, 1), date(2029, 3, 15)),
+            ],
+        ),
+        (
+            "month",
+            date(2030, 1, 10),
+            [
+                (date(2030, 1, 1), date(2030, 1, 10)),
+                (date(2029, 12, 1), date(2029, 12, 10)),
+                (date(2029, 1, 1), date(2029, 1, 10)),
+            ],
+        ),
+        (
+            "month",
+            date(2028, 2, 29),
+            [
+                (date(2028, 2, 1), date(2028, 2, 29)),
+                (date(2028, 1, 1), date(2028, 1, 29)),
+                (date(2027, 2, 1), date(2027, 2, 28)),
+            ],
+        ),
+    ],
+)
+def test_comparison_periods(period, anchor, expected):
+    assert AnalyticsService.comparison_periods(period, anchor) == expected
+
+
+def test_one_year_earlier():
+    assert _one_year_earlier(date(2028, 2, 29)) == date(2027, 2, 28)
+    assert _one_year_earlier(date(2028, 2, 28)) == date(2027, 2, 28)
+    assert _one_year_earlier(date(2029, 3, 1)) == date(2028, 3, 1)
+
+
+def test_comparison_periods_rejects_unknown_period():
+    with pytest.raises(ValueError):
+        AnalyticsService.comparison_periods("quarter", date(2030, 3, 1))
+
+
+@pytest.fixture
+def bookings(app, make_user, make_appointment):
+    """Two doctors' appointments across a week, the week before and a year earlier."""
+    doctor, other, patient = make_user("doctor"), make_user("doctor"), make_user()
+    for day in (3, 4, 5):
+        make_appointment(
+            doctor, patient, datetime(2030, 3, day, 10), status=AppointmentStatus.COMPLETED
+        )
+    make_appointment(doctor, patient, datetime(2030, 2, 26, 10))
+    make_appointment(other, patient, datetime(2030, 3, 6, 10))
+    make_appointment(other, patient, datetime(2029, 3, 6, 10))
+    db.session.commit()
+    return doctor, other
+
+
+def test_compare_periods_counts_and_changes(bookings):
+    doctor, _ = bookings
+    periods = AnalyticsService.comparison_periods("week", date(2030, 3, 7))
+
+    result = AnalyticsService.compare_periods(periods)
+
+    assert [entry["total_appointments"] for entry in result["periods"]] == [4, 1, 1]
+    assert [entry["days"] for entry in result["periods"]] == [7, 7, 7]
+    assert result["periods"][0]["completed_appointments"] == 3
+    previous, year_earlier = result["comparisons"]
+    assert previous["start"] == "2030-02-22"
+    assert previous["changes"]["total_appointments"] == {
+        "current": 4,
+        "previous": 1,
+        "delta": 3,
+        "percent_change": 300.0,
+    }
+    assert year_earlier["changes"]["completed_appointments"]["percent_change"] is None
+
+    mine = AnalyticsService.compare_periods(periods, doctor.id)
+    assert [entry["total_appointments"] for entry in mine["periods"]] == [3, 1, 0]
+
+
+def test_compare_periods_rejects_overlap():
+    with pytest.raises(ValueError):
+        AnalyticsService.compare_periods(
+            [(date(2030, 3, 1), date(2030, 3, 7)), (date(2030, 3, 7), date(2030, 3, 8))]
+        )
+
+
+def test_compare_route_filters_by_doctor_id(app, make_user, bookings):
+    _, other = bookings
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(make_user("admin").id)
+
+    url = "/reports/api/compare?period=week&date=2030-03-07"
+    response = client.get(f"{url}&doctor_id={other.id}")
+    assert response.status_code == 200
+    totals = [entry["total_appointments"] for entry in response.get_json()["periods"]]
+    assert totals == [1, 0, 1]
+
+    # A doctor_id that is not a number is ignored rather than queried
+    response = client.get(f"{url}&doctor_id=abc")
+    totals = [entry["total_appointments"] for entry in response.get_json()["periods"]]
+    assert totals == [4, 1, 1]
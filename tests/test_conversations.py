@@ -0,0 +1,274 @@
+import os
+import random
+import time
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import and_, or_, update
+from app import db
+from app.models.message import ConversationSummary, InternalMessage
+from app.models.user import User
+from app.services.conversation_service import ConversationService
+
+
+def _per_pair_conversations(user_id):
+    """The original implementation: group partners, then two queries each."""
+    partners = (
+        db.session.query(
+            User.id,
+            db.func.max(InternalMessage.created_at).label("last_message_time"),
+        )
+        .join(
+            InternalMessage,
+            or_(
+                and_(
+                    InternalMessage.sender_id == User.id,
+                    InternalMessage.recipient_id == user_id,
+                ),
+                and_(
+                    InternalMessage.recipient_id == User.id,
+                    InternalMessage.sender_id == user_id,
+                ),
+            ),
+        )
+        .filter(User.id != user_id)
+        .group_by(User.id)
+        .order_by(db.func.max(InternalMessage.created_at).desc())
+        .all()
+    )
+
+    conversations = []
+    for partner in partners:
+        last_message = (
+            InternalMessage.query.filter(
+                or_(
+                    and_(
+                        InternalMessage.sender_id == partner.id,
+                        InternalMessage.recipient_id == user_id,
+                    ),
+                    and_(
+                        InternalMessage.recipient_id == partner.id,
+                        InternalMessage.sender_id == user_id,
+                    ),
+                )
+            )
+            .order_by(InternalMessage.created_at.desc())
+            .first()
+        )
+        unread_count = InternalMessage.query.filter(
+            InternalMessage.sender_id == partner.id,
+            InternalMessage.recipient_id == user_id,
+            InternalMessage.is_read == False,
+            InternalMessage.is_deleted_by_recipient == False,
+        ).count()
+        conversations.append((partner.id, last_message.id, unread_count))
+    return conversations
+
+
+def _window_conversations(user_id):
+    return [
+        (peer.id, last_message.id, unread_count)
+        for peer, last_message, unread_count in ConversationService.list_conversations(user_id)
+    ]
+
+
+@pytest.fixture
+def staff(app, make_user):
+    return [make_user("staff") for _ in range(3)] + [make_user("doctor") for _ in range(3)]
+
+
+def _send(sender, recipient, when, **fields):
+    message = InternalMessage(
+        sender_id=sender.id,
+        recipient_id=recipient.id,
+        subject="Schedule",
+        content="See you at 10",
+        created_at=when,
+        **fields,
+    )
+    db.session.add(message)
+    return message
+
+
+def test_window_query_matches_per_pair_grouping(staff):
+    rng = random.Random(21)
+    # Distinct timestamps: the old code had no tie-breaker for the latest message
+    moments = iter(datetime(2030, 1, 1) + timedelta(minutes=i) for i in range(10_000))
+    messages = []
+    for _ in range(120):
+        sender, recipient = rng.sample(staff, 2)
+        messages.append(_send(sender, recipient, next(moments)))
+    db.session.commit()
+
+    for _ in range(60):
+        message = rng.choice(messages)
+        change = rng.randrange(3)
+        if change == 0:
+            message.is_read = True
+        elif change == 1:
+            message.is_deleted_by_recipient = True
+        else:
+            message.is_deleted_by_sender = True
+        db.session.commit()
+
+    for user in staff:
+        assert _window_conversations(user.id) == _per_pair_conversations(user.id)
+
+
+def test_pair_with_one_side_deleted(staff):
+    alice, bob = staff[:2]
+    first = _send(alice, bob, datetime(2030, 1, 1, 9))
+    second = _send(bob, alice, datetime(2030, 1, 1, 10))
+    last = _send(alice, bob, datetime(2030, 1, 1, 11))
+    db.session.commit()
+
+    # Bob deletes everything Alice sent him; Alice keeps her copies
+    first.is_deleted_by_recipient = True
+    last.is_deleted_by_recipient = True
+    second.is_deleted_by_sender = True
+    db.session.commit()
+
+    assert _window_conversations(bob.id) == _per_pair_conversations(bob.id)
+    assert _window_conversations(alice.id) == _per_pair_conversations(alice.id)
+    assert _window_conversations(bob.id) == [(alice.id, last.id, 0)]
+    assert _window_conversations(alice.id) == [(bob.id, last.id, 1)]
+    assert ConversationService.check_consistency() == []
+
+
+def _summary(user, peer):
+    return ConversationSummary.query.filter_by(user_id=user.id, peer_id=peer.id).one_or_none()
+
+
+def test_hard_delete_recomputes_the_pair(staff):
+    alice, bob = staff[:2]
+    first = _send(alice, bob, datetime(2030, 1, 1, 9))
+    last = _send(alice, bob, datetime(2030, 1, 1, 10))
+    db.session.commit()
+    assert _summary(bob, alice).unread_count == 2
+
+    # Deleting the latest message moves both sides back to the one before
+    db.session.delete(last)
+    db.session.commit()
+    assert _summary(bob, alice).unread_count == 1
+    assert _summary(bob, alice).last_message_id == first.id
+    assert _summary(alice, bob).last_message_id == first.id
+
+    # and deleting the only one left removes the conversation
+    db.session.delete(first)
+    db.session.commit()
+    assert _summary(bob, alice) is None
+    assert _summary(alice, bob) is None
+    assert ConversationService.list_conversations(bob.id) == []
+    assert ConversationService.check_consistency() == []
+
+
+def test_check_consistency_reports_drift_and_rebuild_repairs_it(staff):
+    alice, bob, carol = staff[:3]
+    _send(alice, bob, datetime(2030, 1, 1, 9))
+    _send(carol, bob, datetime(2030, 1, 1, 10))
+    db.session.commit()
+
+    # Writes that bypass the ORM leave the summaries stale
+    db.session.execute(
+        update(ConversationSummary)
+        .where(ConversationSummary.user_id == bob.id, ConversationSummary.peer_id == alice.id)
+        .values(unread_count=5)
+    )
+    db.session.execute(
+        ConversationSummary.__table__.delete().where(
+            ConversationSummary.user_id == carol.id
+        )
+    )
+    db.session.commit()
+
+    mismatches = ConversationService.check_consistency()
+    assert {
+        "user_id": bob.id,
+        "peer_id": alice.id,
+        "field": "unread_count",
+        "stored": 5,
+        "expected": 1,
+    } in mismatches
+    missing = [m for m in mismatches if m["user_id"] == carol.id]
+    assert missing and all(m["stored"] is None for m in missing)
+
+    assert ConversationService.rebuild() == 4
+    assert ConversationService.check_consistency() == []
+    assert ConversationService.unread_count(bob.id) == 2
+
+
+def test_check_command_repairs(app, staff):
+    alice, bob = staff[:2]
+    _send(alice, bob, datetime(2030, 1, 1, 9))
+    db.session.commit()
+    db.session.execute(update(ConversationSummary).values(unread_count=3))
+    db.session.commit()
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["check-conversation-summaries"])
+    assert "Found 2 mismatch(es)" in result.output
+    assert ConversationService.check_consistency() != []
+
+    result = runner.invoke(args=["check-conversation-summaries", "--repair"])
+    assert "Rebuilt the conversation summaries" in result.output
+    assert ConversationService.check_consistency() == []
+
+
+@pytest.mark.skipif(
+    not os.environ.get("RUN_BENCHMARKS"), reason="set RUN_BENCHMARKS=1 to run"
+)
+@pytest.mark.parametrize("peers", [100, 1000])
+def test_benchmark_conversation_list(app, make_user, count_selects, peers):
+    """Queries and wall time of the summary read against per-pair grouping."""
+    rng = random.Random(peers)
+    user_id = make_user("staff").id
+    db.session.execute(
+        User.__table__.insert(),
+        [
+            {
+                "username": f"peer{peers}_{i}",
+                "email": f"peer{peers}_{i}@example.com",
+                "password_hash": "x",
+                "role": "doctor",
+                "first_name": "Peer",
+                "last_name": str(i),
+            }
+            for i in range(peers)
+        ],
+    )
+    peer_ids = [peer.id for peer in User.query.filter(User.username.like(f"peer{peers}_%"))]
+    start = datetime(2030, 1, 1)
+    messages = []
+    for minute in range(peers * 5):
+        peer_id = rng.choice(peer_ids)
+        sender, recipient = rng.sample([user_id, peer_id], 2)
+        messages.append(
+            {
+                "sender_id": sender,
+                "recipient_id": recipient,
+                "subject": "Shift",
+                "content": "Swap?",
+                "created_at": start + timedelta(minutes=minute),
+                "is_read": rng.random() < 0.5,
+            }
+        )
+    # Core insert skips the flush listeners; summaries are rebuilt below
+    db.session.execute(InternalMessage.__table__.insert(), messages)
+    db.session.commit()
+    ConversationService.rebuild()
+
+    began = time.perf_counter()
+    with count_selects() as summary_queries:
+        listed = _window_conversations(user_id)
+    summary_seconds = time.perf_counter() - began
+
+    began = time.perf_counter()
+    with count_selects() as pair_queries:
+        grouped = _per_pair_conversations(user_id)
+    pair_seconds = time.perf_counter() - began
+
+    print(
+        f"\n{peers} conversations: summaries {len(summary_queries)} queries "
+        f"{summary_seconds:.3f}s, per-pair {len(pair_queries)} queries {pair_seconds:.3f}s"
+    )
+    assert listed == grouped
+    assert len(summary_queries) == 1
@@ -0,0 +1,122 @@
+import random
+from datetime import date, datetime, timedelta
+import pytest
+from app import db
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.medical_record import Consultation, ConsultationStatus, Prescription
+from app.services.analytics_service import AnalyticsService, _bucket_bounds
+from app.services.metrics_maintainer import MetricsMaintainer
+
+START = date(2030, 5, 1)
+END = date(2030, 5, 14)
+
+
+def _moment(rng):
+    """A random time within the range, or just outside it."""
+    day = START + timedelta(days=rng.randrange(-1, (END - START).days + 2))
+    return datetime.combine(day, datetime.min.time()) + timedelta(
+        minutes=rng.randrange(24 * 60)
+    )
+
+
+def _add(rng, model, doctors, patients):
+    doctor, patient = rng.choice(doctors), rng.choice(patients)
+    if model is Appointment:
+        row = Appointment(
+            doctor_id=doctor.id,
+            patient_id=patient.id,
+            appointment_date=_moment(rng),
+            status=rng.choice(list(AppointmentStatus)),
+        )
+    elif model is Consultation:
+        row = Consultation(
+            doctor_id=doctor.id,
+            patient_id=patient.id,
+            consultation_date=_moment(rng),
+            status=rng.choice(list(ConsultationStatus)),
+            chief_complaint="Fever",
+        )
+    else:
+        row = Prescription(
+            doctor_id=doctor.id,
+            patient_id=patient.id,
+            prescribed_date=_moment(rng),
+            medication_name=rng.choice(["Amoxicillin", "Paracetamol", "Losartan"]),
+            dosage="500 mg",
+            frequency="Twice daily",
+            duration="7 days",
+        )
+    db.session.add(row)
+
+
+def _mutate(rng, row, doctors):
+    """Change a row's date, doctor or status the way the app's forms do."""
+    change = rng.randrange(3)
+    if change == 0:
+        row.doctor_id = rng.choice(doctors).id
+    elif isinstance(row, Appointment):
+        if change == 1:
+            row.appointment_date = _moment(rng)
+        else:
+            row.status = rng.choice(list(AppointmentStatus))
+    elif isinstance(row, Consultation):
+        if change == 1:
+            row.consultation_date = _moment(rng)
+        else:
+            row.status = rng.choice(list(ConsultationStatus))
+    else:
+        row.prescribed_date = _moment(rng)
+
+
+@pytest.fixture
+def people(app, make_user):
+    return [make_user("doctor") for _ in range(3)], [make_user() for _ in range(10)]
+
+
+def test_rollup_stays_consistent_under_orm_writes(people):
+    doctors, patients = people
+    rng = random.Random(11)
+    models = (Appointment, Consultation, Prescription)
+    for _ in range(150):
+        _add(rng, rng.choice(models), doctors, patients)
+    db.session.commit()
+
+    AnalyticsService.refresh_daily_metrics(START, END)
+    MetricsMaintainer.rebuild_counters()
+    assert MetricsMaintainer.check_consistency(START, END) == []
+
+    for _ in range(40):
+        for _ in range(rng.randrange(1, 6)):
+            model = rng.choice(models)
+            rows = model.query.all()
+            action = rng.random()
+            if action < 0.4 or not rows:
+                _add(rng, model, doctors, patients)
+            elif action < 0.85:
+                _mutate(rng, rng.choice(rows), doctors)
+            else:
+                db.session.delete(rng.choice(rows))
+        db.session.commit()
+
+    assert MetricsMaintainer.check_consistency(START, END) == []
+
+
+def test_timeseries_from_rollup_matches_live(people):
+    doctors, patients = people
+    rng = random.Random(5)
+    for _ in range(150):
+        _add(rng, rng.choice((Appointment, Consultation, Prescription)), doctors, patients)
+    db.session.commit()
+
+    # Roll up the first days only, so the series mixes rollup and live days
+    AnalyticsService.refresh_daily_metrics(START, END - timedelta(days=4))
+    for _ in range(30):
+        row = rng.choice(Appointment.query.all())
+        _mutate(rng, row, doctors)
+        db.session.commit()
+
+    assert AnalyticsService._rollup_days(START, END) is not None
+    for doctor_id in [None] + [doctor.id for doctor in doctors]:
+        assert AnalyticsService.generate_timeseries(
+            START, END, doctor_id=doctor_id
+        ) == AnalyticsService._live_timeseries(_bucket_bounds(START, END, "day"), doctor_id)
@@ -0,0 +1,89 @@
+import re
+from datetime import date, datetime
+import pytest
+from sqlalchemy import select, text
+from app import db
+from app.models.appointment import Appointment
+from app.models.daily_metric import DailyMetric
+from app.models.medical_record import Consultation, Prescription
+from app.services.analytics_service import AnalyticsService, _date_range_filter
+from app.utils.timezone_utils import get_local_date_bounds, get_utc_date_bounds
+
+DAY = date(2030, 1, 15)
+
+
+def _query_plan(statement):
+    sql = statement.compile(db.engine, compile_kwargs={"literal_binds": True})
+    rows = db.session.execute(text(f"EXPLAIN QUERY PLAN {sql}"))
+    return " ".join(row[-1] for row in rows)
+
+
+@pytest.mark.parametrize(
+    "model, date_column, index",
+    [
+        (Appointment, Appointment.appointment_date, "ix_appointments_appointment_date"),
+        (Consultation, Consultation.consultation_date, "ix_consultations_consultation_date"),
+        (Prescription, Prescription.prescribed_date, "ix_prescriptions_prescribed_date"),
+    ],
+)
+def test_date_range_filter_uses_index(app, model, date_column, index):
+    statement = select(model).where(*_date_range_filter(date_column, DAY, DAY))
+    plan = _query_plan(statement)
+
+    assert re.search(rf"USING (COVERING )?INDEX {index}\b", plan), plan
+
+
+def test_local_date_bounds_are_unconverted_midnights():
+    assert get_local_date_bounds(DAY, date(2030, 1, 16)) == (
+        datetime(2030, 1, 15),
+        datetime(2030, 1, 17),
+    )
+
+
+def test_appointment_counts_on_its_stored_day(app, make_user, make_appointment):
+    doctor, patient = make_user("doctor"), make_user()
+    # 16:30 in Manila is 08:30 UTC; read as UTC it would fall on the next day
+    make_appointment(doctor, patient, datetime(2030, 1, 15, 16, 30))
+    make_appointment(doctor, patient, datetime(2030, 1, 15, 0, 30))
+    db.session.commit()
+
+    assert AnalyticsService.generate_appointment_metrics(DAY, DAY)["total_appointments"] == 2
+    assert (
+        AnalyticsService.generate_appointment_metrics(date(2030, 1, 16), date(2030, 1, 16))[
+            "total_appointments"
+        ]
+        == 0
+    )
+
+    AnalyticsService.refresh_daily_metrics(DAY, date(2030, 1, 16))
+    make_appointment(doctor, patient, datetime(2030, 1, 15, 23, 45))
+    db.session.commit()
+
+    rollup = {
+        metric.metric_date: metric.total_appointments
+        for metric in DailyMetric.query.filter(DailyMetric.doctor_id.is_(None))
+    }
+    assert rollup == {DAY: 3, date(2030, 1, 16): 0}
+
+
+def test_utc_columns_count_on_their_local_day(app, make_user):
+    doctor, patient = make_user("doctor"), make_user()
+    # 20:00 UTC on the 15th is 04:00 on the 16th in Manila
+    db.session.add(
+        Consultation(
+            doctor_id=doctor.id,
+            patient_id=patient.id,
+            consultation_date=datetime(2030, 1, 15, 20, 0),
+            chief_complaint="Cough",
+        )
+    )
+    db.session.commit()
+
+    def count(day):
+        return Consultation.query.filter(
+            *_date_range_filter(Consultation.consultation_date, day, day)
+        ).count()
+
+    assert count(DAY) == 0
+    assert count(date(2030, 1, 16)) == 1
+    assert get_utc_date_bounds(DAY)[0] == datetime(2030, 1, 14, 16, 0)
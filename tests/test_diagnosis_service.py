@@ -0,0 +1,64 @@
+import pytest
+from app import db
+from app.models.medical_record import Consultation, Diagnosis
+from app.services import diagnosis_service
+from app.services.diagnosis_service import DiagnosisService
+
+
+@pytest.fixture
+def consult(app, make_user):
+    doctor, patient = make_user("doctor"), make_user()
+
+    def add(assessment):
+        consultation = Consultation(
+            doctor_id=doctor.id,
+            patient_id=patient.id,
+            chief_complaint="Checkup",
+            assessment=assessment,
+        )
+        db.session.add(consultation)
+        db.session.flush()
+        return consultation
+
+    return add
+
+
+def test_synonyms_share_one_code(consult):
+    first = consult("Hypertension")
+    second = consult("  HTN. ")
+    db.session.commit()
+
+    assert first.diagnosis_code == second.diagnosis_code
+    assert Diagnosis.query.count() == 1
+
+
+def test_rolled_back_diagnosis_is_not_interned(consult):
+    consult("Hypertension")
+    # Found by query while the row above is still uncommitted
+    consult("HTN")
+    db.session.rollback()
+
+    # SQLite hands the freed id to the next diagnosis
+    asthma = consult("Asthma")
+    db.session.commit()
+
+    hypertension = consult("Hypertension")
+    db.session.commit()
+
+    assert hypertension.diagnosis.display_name == "Hypertension"
+    assert hypertension.diagnosis_code != asthma.diagnosis_code
+
+
+def test_stale_interned_code_is_checked(consult):
+    asthma = consult("Asthma")
+    db.session.commit()
+    # An entry left over from rows that no longer exist
+    diagnosis_service._interned_codes[DiagnosisService.lookup("Hypertension").key_hash] = (
+        asthma.diagnosis_code
+    )
+    db.session.rollback()
+
+    hypertension = consult("Hypertension")
+    db.session.commit()
+
+    assert hypertension.diagnosis.display_name == "Hypertension"
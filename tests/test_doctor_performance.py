@@ -0,0 +1,152 @@
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+import pytest
+from sqlalchemy import func
+from app import db
+from app.models.appointment import Appointment, AppointmentStatus
+from app.models.medical_record import Consultation, ConsultationStatus, Prescription
+from app.models.user import User
+from app.services.analytics_service import AnalyticsService
+
+START = date(2030, 4, 1)
+END = date(2030, 4, 30)
+
+
+def _per_doctor_performance(start_date, end_date):
+    """The original implementation: three row-loading queries per doctor."""
+    report = []
+    for doctor in User.query.filter_by(role="doctor", active=True):
+        appointments = Appointment.query.filter(
+            Appointment.doctor_id == doctor.id,
+            func.date(Appointment.appointment_date) >= start_date,
+            func.date(Appointment.appointment_date) <= end_date,
+        ).all()
+        consultations = Consultation.query.filter(
+            Consultation.doctor_id == doctor.id,
+            func.date(Consultation.consultation_date) >= start_date,
+            func.date(Consultation.consultation_date) <= end_date,
+        ).all()
+        prescriptions = Prescription.query.filter(
+            Prescription.doctor_id == doctor.id,
+            func.date(Prescription.prescribed_date) >= start_date,
+            func.date(Prescription.prescribed_date) <= end_date,
+        ).all()
+        report.append(
+            {
+                "doctor_id": doctor.id,
+                "total_appointments": len(appointments),
+                "completed_appointments": len(
+                    [a for a in appointments if a.status == AppointmentStatus.COMPLETED]
+                ),
+                "total_consultations": len(consultations),
+                "total_prescriptions": len(prescriptions),
+                "unique_patients": len({a.patient_id for a in appointments}),
+            }
+        )
+    return report
+
+
+@pytest.fixture
+def add_doctors(app, make_user, make_appointment):
+    """Add doctors, each with a month of appointments, consultations and prescriptions."""
+    rng = random.Random(2)
+    patients = [make_user() for _ in range(10)]
+
+    def add(count, per_doctor=6):
+        for _ in range(count):
+            doctor = make_user("doctor")
+            for _ in range(per_doctor):
+                # 01:00-08:00 UTC is still the same day in Manila, so the
+                # func.date and local-day bounds agree
+                when = datetime.combine(
+                    START + timedelta(days=rng.randrange(30)), datetime.min.time()
+                ) + timedelta(hours=rng.randrange(1, 8))
+                patient = rng.choice(patients)
+                make_appointment(
+                    doctor, patient, when, status=rng.choice(list(AppointmentStatus))
+                )
+                db.session.add(
+                    Consultation(
+                        doctor_id=doctor.id,
+                        patient_id=patient.id,
+                        consultation_date=when,
+                        status=rng.choice(list(ConsultationStatus)),
+                        chief_complaint="Headache",
+                    )
+                )
+                db.session.add(
+                    Prescription(
+                        doctor_id=doctor.id,
+                        patient_id=patient.id,
+                        prescribed_date=when,
+                        medication_name="Paracetamol",
+                        dosage="500 mg",
+                        frequency="Every 6 hours",
+                        duration="3 days",
+                    )
+                )
+        db.session.commit()
+
+    return add
+
+
+def test_query_count_does_not_grow_with_doctors(add_doctors, count_selects):
+    add_doctors(4)
+    with count_selects() as few:
+        AnalyticsService.generate_doctor_performance(START, END)
+
+    add_doctors(4)
+    with count_selects() as many:
+        report = AnalyticsService.generate_doctor_performance(START, END)
+
+    # Plus the sample doctor created with the app
+    assert len(report) == 9
+    assert len(few) == len(many) == 4
+
+
+def test_grouped_report_matches_per_doctor_queries(add_doctors):
+    add_doctors(5)
+    fields = [
+        "doctor_id",
+        "total_appointments",
+        "completed_appointments",
+        "total_consultations",
+        "total_prescriptions",
+        "unique_patients",
+    ]
+
+    report = [
+        {field: row[field] for field in fields}
+        for row in AnalyticsService.generate_doctor_performance(START, END)
+    ]
+
+    assert sorted(report, key=lambda row: row["doctor_id"]) == sorted(
+        _per_doctor_performance(START, END), key=lambda row: row["doctor_id"]
+    )
+
+
+@pytest.mark.skipif(
+    not os.environ.get("RUN_BENCHMARKS"), reason="set RUN_BENCHMARKS=1 to run"
+)
+@pytest.mark.parametrize("doctors", [50, 100, 200])
+def test_benchmark_doctor_performance(add_doctors, count_selects, doctors):
+    """Queries and wall time of the grouped report against the per-doctor loop."""
+    add_doctors(doctors, per_doctor=20)
+
+    began = time.perf_counter()
+    with count_selects() as grouped:
+        AnalyticsService.generate_doctor_performance(START, END)
+    grouped_seconds = time.perf_counter() - began
+
+    began = time.perf_counter()
+    with count_selects() as per_doctor:
+        _per_doctor_performance(START, END)
+    per_doctor_seconds = time.perf_counter() - began
+
+    print(
+        f"\n{doctors} doctors: grouped {len(grouped)} queries {grouped_seconds:.3f}s, "
+        f"per-doctor {len(per_doctor)} queries {per_doctor_seconds:.3f}s"
+    )
+    assert len(grouped) == 4
@@ -0,0 +1,134 @@
+import io
+import os
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+import pytest
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Alignment, Font, PatternFill
+from app import db
+from app.models.appointment import AppointmentStatus
+from app.services.analytics_service import AnalyticsService
+from app.services.export_service import ExportService
+from app.utils.excel_export import StreamingWorkbook
+
+
+def _in_memory_workbook(headers, rows):
+    """The original export: a full workbook, styled cell by cell, then sized."""
+    wb = Workbook()
+    ws = wb.active
+    for col, header in enumerate(headers, 1):
+        cell = ws.cell(row=1, column=col, value=header)
+        cell.font = Font(bold=True, color="FFFFFF")
+        cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+        cell.alignment = Alignment(horizontal="center")
+    for row_index, row in enumerate(rows, 2):
+        for col, value in enumerate(row, 1):
+            ws.cell(row=row_index, column=col, value=value)
+
+    for column in ws.columns:
+        max_length = max(len(str(cell.value)) for cell in column if cell.value is not None)
+        ws.column_dimensions[column[0].column_letter].width = min(max_length + 2, 50)
+
+    output = io.BytesIO()
+    wb.save(output)
+    output.seek(0)
+    return output
+
+
+def _streamed_workbook(headers, rows):
+    workbook = StreamingWorkbook()
+    workbook.add_sheet("Sheet", headers, rows)
+    return workbook.save()
+
+
+def _rows(count):
+    start = date(2030, 1, 1)
+    return (
+        (
+            (start + timedelta(days=i % 365)).strftime("%Y-%m-%d"),
+            f"Patient {i}",
+            i % 17,
+            round(i / 7, 2),
+            "x" * (i % 80),
+        )
+        for i in range(count)
+    )
+
+
+def _contents(fileobj):
+    sheet = load_workbook(fileobj).worksheets[0]
+    widths = {
+        letter: dimension.width for letter, dimension in sheet.column_dimensions.items()
+    }
+    return list(sheet.iter_rows(values_only=True)), widths, sheet["A1"]
+
+
+HEADERS = ["Date", "Patient", "Visits", "Average", "Notes"]
+
+
+def test_streamed_sheet_matches_in_memory_export():
+    rows, widths, header = _contents(_streamed_workbook(HEADERS, _rows(300)))
+    old_rows, old_widths, old_header = _contents(_in_memory_workbook(HEADERS, _rows(300)))
+
+    assert rows == old_rows
+    assert rows[0] == tuple(HEADERS)
+    assert len(rows) == 301
+    assert widths == old_widths
+    # Long notes are capped
+    assert widths["E"] == 50
+    assert header.font.bold and header.fill.start_color.rgb == old_header.fill.start_color.rgb
+    assert header.alignment.horizontal == "center"
+
+
+def test_report_workbook_contents(app, make_user, make_appointment):
+    doctor, patient = make_user("doctor"), make_user()
+    start_date, end_date = date(2030, 2, 1), date(2030, 2, 7)
+    for day in range(7):
+        for status in (AppointmentStatus.COMPLETED, AppointmentStatus.CANCELLED)[: day % 3]:
+            make_appointment(
+                doctor, patient, datetime(2030, 2, 1 + day, 10), status=status
+            )
+    db.session.commit()
+
+    saved = ExportService.build_report_workbook("appointments", start_date, end_date).save()
+    workbook = load_workbook(saved)
+
+    assert workbook.sheetnames == ["Appointment Metrics", "Daily Breakdown"]
+    metrics = AnalyticsService.generate_appointment_metrics(start_date, end_date)
+    summary = dict(workbook["Appointment Metrics"].iter_rows(min_row=2, values_only=True))
+    assert summary["Total Appointments"] == metrics["total_appointments"] == 6
+    assert summary["Completion Rate (%)"] == metrics["completion_rate"]
+
+    daily = list(workbook["Daily Breakdown"].iter_rows(min_row=2, values_only=True))
+    assert [row[0] for row in daily] == [
+        (start_date + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(7)
+    ]
+    assert [row[1] for row in daily] == [0, 1, 2, 0, 1, 2, 0]
+    assert daily[2][4] == 50.0
+
+
+@pytest.mark.skipif(
+    not os.environ.get("RUN_BENCHMARKS"), reason="set RUN_BENCHMARKS=1 to run"
+)
+@pytest.mark.parametrize("count", [10_000, 100_000])
+def test_benchmark_streamed_export(count):
+    """Wall time and peak traced memory, in-memory export against streamed."""
+    results = {}
+    for name, build in (("in-memory", _in_memory_workbook), ("streamed", _streamed_workbook)):
+        tracemalloc.start()
+        began = time.perf_counter()
+        build(HEADERS, _rows(count)).close()
+        seconds = time.perf_counter() - began
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[name] = (seconds, peak)
+
+    print(
+        f"\n{count} rows: "
+        + ", ".join(
+            f"{name} {seconds:.2f}s {peak / 2**20:.0f} MiB"
+            for name, (seconds, peak) in results.items()
+        )
+    )
+    assert results["streamed"][1] < results["in-memory"][1]
@@ -0,0 +1,58 @@
+import importlib.util
+import os
+import pytest
+from sqlalchemy import inspect
+from app import db
+from app.models.message import InternalMessage
+from app.utils.index_audit import QUERY_REGISTRY, audit_queries
+
+MIGRATION = os.path.join(
+    os.path.dirname(__file__), "..", "migrations", "versions", "add_composite_indexes.py"
+)
+
+
+@pytest.fixture
+def unindexed(monkeypatch):
+    """Register a query on a column no index covers."""
+    monkeypatch.setitem(
+        QUERY_REGISTRY,
+        "messages.by_subject",
+        lambda sample: InternalMessage.query.filter(InternalMessage.subject == "Hi"),
+    )
+    return "messages.by_subject"
+
+
+def test_registered_queries_use_indexes(app):
+    results = audit_queries()
+
+    assert [result["name"] for result in results] == list(QUERY_REGISTRY)
+    assert {result["name"]: result["full_scans"] for result in results if result["full_scans"]} == {}
+
+
+def test_full_scan_is_flagged(app, unindexed):
+    (result,) = audit_queries([unindexed])
+
+    assert result["full_scans"] == ["SCAN internal_messages"]
+
+
+def test_audit_command_exit_status(app, unindexed):
+    runner = app.test_cli_runner()
+
+    result = runner.invoke(args=["db-index-audit", "appointments.doctor_schedule"])
+    assert result.exit_code == 0
+    assert "Checked 1 query shape(s); 0 with full scans" in result.output
+
+    result = runner.invoke(args=["db-index-audit", unindexed, "--verbose"])
+    assert result.exit_code == 1
+    assert f"FULL SCAN  {unindexed}" in result.output
+
+
+def test_migration_creates_the_model_indexes(app):
+    spec = importlib.util.spec_from_file_location("add_composite_indexes", MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+
+    inspector = inspect(db.engine)
+    for name, table, columns in migration.INDEXES:
+        indexes = {index["name"]: index["column_names"] for index in inspector.get_indexes(table)}
+        assert indexes.get(name) == columns, name
@@ -0,0 +1,150 @@
+import os
+from datetime import datetime, timedelta
+import pytest
+from openpyxl import load_workbook
+from sqlalchemy import update
+from app import db
+from app.models.report_job import JobStatus, ReportJob
+from app.services import job_service
+from app.services.job_service import JobService
+
+REPORT = {
+    "report_type": "appointments",
+    "start_date": "2030-02-01",
+    "end_date": "2030-02-07",
+    "timezone": "Asia/Manila",
+}
+
+
+@pytest.fixture
+def jobs_dir(app, tmp_path):
+    app.config["REPORT_JOB_DIR"] = str(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def held(monkeypatch):
+    """Leave submitted jobs pending, as if every worker were busy."""
+    monkeypatch.setattr(JobService, "_execute", staticmethod(lambda app, job_id: None))
+
+
+def test_job_runs_through_to_completed(app, make_user, jobs_dir, monkeypatch):
+    seen = []
+
+    def handler(job, params, progress):
+        seen.append((job.status, job.started_at is not None))
+        progress(40)
+        seen.append(db.session.get(ReportJob, job.id).progress)
+        job.artifact_path = str(jobs_dir / "out.txt")
+
+    monkeypatch.setitem(job_service.JOB_HANDLERS, "report", handler)
+    job, created = JobService.submit("report", REPORT, make_user("admin"))
+
+    assert created
+    assert seen == [(JobStatus.RUNNING, True), 40]
+    assert job.status == JobStatus.COMPLETED
+    assert (job.progress, job.message) == (100, "Completed")
+    assert job.finished_at >= job.started_at
+
+
+def test_failed_handler_records_the_error(app, make_user, monkeypatch):
+    def handler(job, params, progress):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setitem(job_service.JOB_HANDLERS, "report", handler)
+    job, _ = JobService.submit("report", REPORT, make_user("admin"))
+
+    assert job.status == JobStatus.FAILED
+    assert job.error == "disk full"
+    assert job.finished_at is not None
+
+
+def test_report_job_writes_the_workbook(app, make_user, jobs_dir):
+    job, _ = JobService.submit("report", REPORT, make_user("admin"))
+
+    assert job.status == JobStatus.COMPLETED, job.error
+    assert os.path.dirname(job.artifact_path) == str(jobs_dir)
+    assert job.artifact_name == "appointments_report_2030-02-01_2030-02-07.xlsx"
+    assert load_workbook(job.artifact_path).sheetnames[0] == "Appointment Metrics"
+
+
+def test_identical_active_requests_share_a_job(app, make_user, held):
+    admin, other_admin = make_user("admin"), make_user("admin")
+    doctor, other_doctor = make_user("doctor"), make_user("doctor")
+
+    job, created = JobService.submit("report", REPORT, admin)
+    assert created and job.status == JobStatus.PENDING
+    assert JobService.submit("report", REPORT, admin) == (job, False)
+    # Admins share jobs with each other
+    assert JobService.submit("report", REPORT, other_admin) == (job, False)
+    # Others only with themselves, as they may only download their own
+    mine, created = JobService.submit("report", REPORT, doctor)
+    assert created and mine.id != job.id
+    assert JobService.submit("report", REPORT, doctor) == (mine, False)
+    assert JobService.submit("report", REPORT, other_doctor)[1]
+    # Different parameters are a different job
+    assert JobService.submit("report", dict(REPORT, end_date="2030-02-08"), admin)[1]
+
+    assert JobService.get_job(mine.id, doctor) is mine
+    assert JobService.get_job(mine.id, other_doctor) is None
+    assert JobService.get_job(mine.id, admin) is mine
+
+
+def test_finished_jobs_are_not_reused(app, make_user, monkeypatch):
+    monkeypatch.setitem(job_service.JOB_HANDLERS, "report", lambda job, params, progress: None)
+    admin = make_user("admin")
+
+    first, _ = JobService.submit("report", REPORT, admin)
+    second, created = JobService.submit("report", REPORT, admin)
+
+    assert first.status == JobStatus.COMPLETED
+    assert created and second.id != first.id
+
+
+def test_stale_jobs_expire_and_stop_blocking(app, make_user, held):
+    admin = make_user("admin")
+    stale, _ = JobService.submit("report", REPORT, admin)
+    fresh, _ = JobService.submit("report", dict(REPORT, end_date="2030-02-08"), admin)
+    app.config["REPORT_JOB_TIMEOUT_MINUTES"] = 30
+    db.session.execute(
+        update(ReportJob)
+        .where(ReportJob.id == stale.id)
+        .values(status=JobStatus.RUNNING, updated_at=datetime.utcnow() - timedelta(minutes=31))
+    )
+    db.session.commit()
+
+    assert JobService.expire_stale_jobs() == 1
+
+    db.session.refresh(stale)
+    db.session.refresh(fresh)
+    assert stale.status == JobStatus.FAILED
+    assert stale.error == "Job was interrupted before it finished"
+    assert fresh.status == JobStatus.PENDING
+    # The identical request gets a new job instead of the dead one
+    replacement, created = JobService.submit("report", REPORT, admin)
+    assert created and replacement.id != stale.id
+
+
+def test_prune_removes_old_finished_jobs_and_artifacts(app, make_user, jobs_dir, monkeypatch):
+    def handler(job, params, progress):
+        job.artifact_path = str(jobs_dir / f"{job.id}.txt")
+        with open(job.artifact_path, "w") as output:
+            output.write("rows")
+
+    monkeypatch.setitem(job_service.JOB_HANDLERS, "report", handler)
+    admin = make_user("admin")
+    old, _ = JobService.submit("report", REPORT, admin)
+    recent, _ = JobService.submit("report", REPORT, admin)
+    old_path = old.artifact_path
+    db.session.execute(
+        update(ReportJob)
+        .where(ReportJob.id == old.id)
+        .values(finished_at=datetime.utcnow() - timedelta(hours=25))
+    )
+    db.session.commit()
+
+    assert JobService.prune_jobs(24) == 1
+
+    assert not os.path.exists(old_path)
+    assert os.path.exists(recent.artifact_path)
+    assert [job.id for job in ReportJob.query] == [recent.id]
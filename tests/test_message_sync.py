@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import update
+from app import db
+from app.models.daily_metric import MetricCounter
+from app.models.message import InternalMessage, MessageEvent, MessageSyncState
+from app.services.message_sync import MessageSyncService
+
+
+@pytest.fixture
+def pair(app, make_user):
+    return make_user("staff"), make_user("doctor")
+
+
+def _send(sender, recipient, subject="Rounds"):
+    message = InternalMessage(
+        sender_id=sender.id, recipient_id=recipient.id, subject=subject, content="At 8"
+    )
+    db.session.add(message)
+    db.session.commit()
+    return message
+
+
+def _ids(messages):
+    return sorted(message.id for message in messages)
+
+
+def test_changes_are_folded_per_message(pair):
+    alice, bob = pair
+    kept = _send(alice, bob)
+    token = MessageSyncService.current_token()
+
+    # New to bob and read in the same window: still just created
+    fresh = _send(alice, bob)
+    fresh.is_read = True
+    kept.is_read = True
+    # Sent and then deleted by bob before he synced: a tombstone
+    dropped = _send(alice, bob)
+    dropped.is_deleted_by_recipient = True
+    db.session.commit()
+
+    changes = MessageSyncService.changes(bob.id, token)
+    assert _ids(changes["created"]) == [fresh.id]
+    assert _ids(changes["read"]) == [kept.id]
+    assert changes["deleted"] == [dropped.id]
+    assert changes["has_more"] is False
+
+    # Alice deleted nothing, so she still has the message bob dropped
+    changes = MessageSyncService.changes(alice.id, token)
+    assert _ids(changes["created"]) == sorted([fresh.id, dropped.id])
+    assert _ids(changes["read"]) == [kept.id]
+    assert changes["deleted"] == []
+
+
+def test_hard_delete_is_a_tombstone_for_both(pair):
+    alice, bob = pair
+    message = _send(alice, bob)
+    token = MessageSyncService.current_token()
+
+    db.session.delete(message)
+    db.session.commit()
+
+    for user in pair:
+        changes = MessageSyncService.changes(user.id, token)
+        assert changes["deleted"] == [message.id]
+        assert changes["created"] == changes["read"] == []
+
+
+def test_batches_page_with_has_more(pair):
+    alice, bob = pair
+    token = MessageSyncService.current_token()
+    sent = [_send(alice, bob, f"Note {i}") for i in range(5)]
+
+    received, pages = [], 0
+    while True:
+        changes = MessageSyncService.changes(bob.id, token, limit=2)
+        received.extend(changes["created"])
+        token = changes["sync_token"]
+        pages += 1
+        if not changes["has_more"]:
+            break
+
+    assert pages == 3
+    assert _ids(received) == _ids(sent)
+    assert MessageSyncService.changes(bob.id, token)["created"] == []
+    assert token == MessageSyncService.current_token()
+
+
+def test_token_older_than_prune_resets(pair):
+    alice, bob = pair
+    old_token = MessageSyncService.current_token()
+    _send(alice, bob)
+    db.session.execute(
+        update(MessageEvent).values(created_at=datetime.utcnow() - timedelta(days=60))
+    )
+    db.session.commit()
+    recent = _send(alice, bob)
+    # Just before the two events (one per participant) of the recent message
+    kept_token = str(max(event.id for event in MessageEvent.query) - 2)
+
+    assert MessageSyncService.prune(30) == 2
+
+    changes = MessageSyncService.changes(bob.id, old_token)
+    assert changes == {"reset": True, "sync_token": MessageSyncService.current_token()}
+    # A token from after the pruned events still syncs
+    assert _ids(MessageSyncService.changes(bob.id, kept_token)["created"]) == [recent.id]
+
+    # The watermark lives in the sync state, not the analytics counters
+    state = db.session.get(MessageSyncState, MessageSyncState.ROW_ID)
+    assert str(state.pruned_through) == kept_token
+    assert db.session.get(MetricCounter, "message_events_pruned_through") is None
+
+
+def test_current_token_does_not_go_back_after_full_prune(pair):
+    alice, bob = pair
+    _send(alice, bob)
+    token = MessageSyncService.current_token()
+    db.session.execute(
+        update(MessageEvent).values(created_at=datetime.utcnow() - timedelta(days=60))
+    )
+    db.session.commit()
+
+    MessageSyncService.prune(30)
+
+    assert MessageEvent.query.count() == 0
+    assert MessageSyncService.current_token() == token
+    assert MessageSyncService.changes(bob.id, token)["reset"] is False
+    # New events get ids after every pruned one
+    message = _send(alice, bob)
+    assert _ids(MessageSyncService.changes(bob.id, token)["created"]) == [message.id]
+
+
+def test_logging_events_takes_the_sync_state_row(pair):
+    alice, bob = pair
+    _send(alice, bob)
+
+    state = db.session.get(MessageSyncState, MessageSyncState.ROW_ID)
+    assert state.last_logged_at is not None
+    assert state.pruned_through == 0
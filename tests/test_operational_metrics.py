@@ -0,0 +1,31 @@
+from datetime import date, datetime
+from app import db
+from app.models.appointment import AppointmentStatus
+from app.services.analytics_service import AnalyticsService
+
+DAY = date(2030, 1, 15)
+
+
+def test_lead_times_use_the_clinic_clock(app, make_user, make_appointment):
+    doctor, patient = make_user("doctor"), make_user()
+    # Booked at 08:30 UTC, 16:30 in Manila, for 16:30 local the next day
+    make_appointment(
+        doctor, patient, datetime(2030, 1, 15, 16, 30), created_at=datetime(2030, 1, 14, 8, 30)
+    )
+    # Cancelled at 04:30 UTC, 12:30 in Manila, four hours ahead
+    make_appointment(
+        doctor,
+        patient,
+        datetime(2030, 1, 15, 16, 30),
+        status=AppointmentStatus.CANCELLED,
+        created_at=datetime(2030, 1, 15, 4, 30),
+        cancelled_at=datetime(2030, 1, 15, 4, 30),
+    )
+    db.session.commit()
+
+    metrics = AnalyticsService.generate_operational_metrics(DAY, DAY)
+
+    assert metrics["booking_lead_time"]["count"] == 2
+    assert metrics["booking_lead_time"]["mean_hours"] == 14.0
+    assert metrics["cancellation_lead_time"]["count"] == 1
+    assert metrics["cancellation_lead_time"]["mean_hours"] == 4.0
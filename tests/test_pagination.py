@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta
+import pytest
+from app import db
+from app.models.message import InternalMessage
+from app.utils.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+    keyset_page,
+    parse_page_size,
+)
+
+
+def test_cursor_round_trip():
+    moment = datetime(2030, 1, 2, 3, 4, 5, 678901)
+    cursor = encode_cursor(moment, 12345)
+
+    assert decode_cursor(cursor) == (moment, 12345)
+    # Safe in a query string as is
+    assert cursor.replace("-", "").replace("_", "").isalnum()
+    assert decode_cursor(encode_cursor(datetime(2030, 1, 2), 1)) == (datetime(2030, 1, 2), 1)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor",
+        encode_cursor(datetime(2030, 1, 1), 1)[:-3],
+        "MjAzMC0wMS0wMQ",  # "2030-01-01" without an id
+        "MjAzMC0wMS0wMXxhYmM",  # "2030-01-01|abc"
+    ],
+)
+def test_malformed_cursor_is_a_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_parse_page_size():
+    assert parse_page_size(None) == parse_page_size("") == DEFAULT_PAGE_SIZE
+    assert parse_page_size("20") == 20
+    assert parse_page_size(str(MAX_PAGE_SIZE + 1)) == MAX_PAGE_SIZE
+    for value in ("0", "-3", "many"):
+        with pytest.raises(ValueError):
+            parse_page_size(value)
+
+
+@pytest.fixture
+def conversation(app, make_user):
+    """Messages both ways, several sharing each timestamp."""
+    alice, bob = make_user("staff"), make_user("doctor")
+    start = datetime(2030, 1, 1, 9)
+    for i in range(23):
+        sender, recipient = (alice, bob) if i % 3 else (bob, alice)
+        db.session.add(
+            InternalMessage(
+                sender_id=sender.id,
+                recipient_id=recipient.id,
+                subject="Rounds",
+                content=str(i),
+                created_at=start + timedelta(minutes=i // 4),
+            )
+        )
+    db.session.commit()
+    newest_first = sorted(
+        InternalMessage.query.all(), key=lambda m: (m.created_at, m.id), reverse=True
+    )
+    return alice, bob, [message.id for message in newest_first]
+
+
+def _directions(alice, bob):
+    return [
+        InternalMessage.query.filter_by(sender_id=alice.id, recipient_id=bob.id),
+        InternalMessage.query.filter_by(sender_id=bob.id, recipient_id=alice.id),
+    ]
+
+
+def test_pages_backwards_through_equal_timestamps(conversation):
+    alice, bob, newest_first = conversation
+    seen, before = [], None
+    while True:
+        rows, paging = keyset_page(_directions(alice, bob), InternalMessage, before=before, limit=5)
+        seen.extend(row.id for row in rows)
+        before = paging["before"]
+        if not paging["has_more"]:
+            break
+
+    # Ties on created_at are broken by id: nothing repeated or skipped
+    assert seen == newest_first
+
+
+def test_pages_forwards_from_a_cursor(conversation):
+    alice, bob, newest_first = conversation
+    rows, paging = keyset_page(_directions(alice, bob), InternalMessage, limit=5)
+    assert [row.id for row in rows] == newest_first[:5]
+    assert paging["has_more"]
+
+    # Walk back up from the oldest message
+    oldest = db.session.get(InternalMessage, newest_first[-1])
+    after, seen = encode_cursor(oldest.created_at, oldest.id), []
+    while True:
+        rows, paging = keyset_page(_directions(alice, bob), InternalMessage, after=after, limit=4)
+        # Each page is still newest first
+        seen = [row.id for row in rows] + seen
+        after = paging["after"]
+        if not paging["has_more"]:
+            break
+    assert seen == newest_first[:-1]
+
+    # Nothing newer: the cursor is echoed back for the next poll
+    rows, paging = keyset_page(_directions(alice, bob), InternalMessage, after=after)
+    assert rows == []
+    assert paging == {"before": None, "after": after, "has_more": False}
+
+
+def test_before_and_after_together_are_rejected(conversation):
+    alice, bob, _ = conversation
+    cursor = encode_cursor(datetime(2030, 1, 1), 1)
+    with pytest.raises(ValueError):
+        keyset_page(_directions(alice, bob), InternalMessage, before=cursor, after=cursor)
+
+
+def test_conversation_endpoint_pages(app, conversation):
+    alice, bob, newest_first = conversation
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(alice.id)
+
+    body = client.get(f"/messages/api/conversation/{bob.id}?limit=10").get_json()
+    # Displayed oldest first
+    assert [message["id"] for message in body["messages"]] == newest_first[9::-1]
+    assert body["paging"]["has_more"]
+
+    before = body["paging"]["before"]
+    body = client.get(f"/messages/api/conversation/{bob.id}?before={before}&limit=200").get_json()
+    assert [message["id"] for message in body["messages"]] == newest_first[:9:-1]
+    assert not body["paging"]["has_more"]
+
+    response = client.get(f"/messages/api/conversation/{bob.id}?before=garbage")
+    assert response.status_code == 400
@@ -0,0 +1,207 @@
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+import pytest
+from app import db
+from app.models.appointment import Appointment, AppointmentStatus
+from app.services.scheduling_service import SchedulingService
+from app.utils.intervals import IntervalIndex
+
+DAY = date(2030, 3, 4)
+
+
+def at(hour, minute=0, day=DAY):
+    return datetime.combine(day, datetime.min.time()).replace(hour=hour, minute=minute)
+
+
+def test_interval_index_treats_touching_intervals_as_free():
+    index = IntervalIndex([(at(9), at(9, 30), 1)])
+
+    assert not index.overlaps(at(9, 30), at(10))
+    assert not index.overlaps(at(8, 30), at(9))
+    assert index.overlapping(at(9, 30), at(10)) == []
+
+
+def test_interval_index_finds_overlaps_behind_a_long_interval():
+    index = IntervalIndex(
+        [
+            (at(9), at(12), "long"),
+            (at(9, 30), at(10), "short"),
+            (at(10, 15), at(10, 45), "later"),
+        ]
+    )
+
+    assert index.overlaps(at(11), at(11, 30))
+    assert index.overlapping(at(11), at(11, 30)) == ["long"]
+    assert index.overlapping(at(9, 45), at(10, 30)) == ["later", "short", "long"]
+    assert index.overlapping(at(12), at(13)) == []
+    assert not IntervalIndex().overlaps(at(9), at(10))
+
+
+@pytest.fixture
+def doctor(app, make_user):
+    return make_user("doctor")
+
+
+def _starts(slots):
+    return [slot["start"] for slot in slots]
+
+
+def test_available_slots_around_booked_appointments(doctor, make_user, make_appointment):
+    patient = make_user()
+    make_appointment(doctor, patient, at(9))
+    make_appointment(doctor, patient, at(10, 15))
+    make_appointment(doctor, patient, at(11), status=AppointmentStatus.CANCELLED)
+    make_appointment(doctor, patient, at(12), status=AppointmentStatus.COMPLETED)
+    db.session.commit()
+
+    starts = _starts(SchedulingService.available_slots([doctor.id], DAY, DAY))
+
+    # Adjacent: 9:30 starts as the 9:00 appointment ends
+    assert at(9) not in starts
+    assert at(9, 30) in starts
+    # 10:15-10:45 overlaps both the 10:00 and 10:30 slots
+    assert at(10) not in starts and at(10, 30) not in starts
+    # Cancelled and completed appointments do not occupy the schedule
+    assert at(11) in starts and at(12) in starts
+
+
+def test_available_slots_working_hour_edges(doctor, make_user, make_appointment):
+    patient = make_user()
+    # Starts before opening and runs into the first slot
+    make_appointment(doctor, patient, at(8), duration_minutes=75)
+    # After closing: cannot block anything
+    make_appointment(doctor, patient, at(17))
+    # The previous evening, ending exactly at midnight
+    make_appointment(doctor, patient, at(23, 30, DAY - timedelta(days=1)))
+    db.session.commit()
+
+    starts = _starts(SchedulingService.available_slots([doctor.id], DAY, DAY))
+    assert starts[0] == at(9, 30)
+    # The last slot ends exactly at closing time
+    assert starts[-1] == at(16, 30)
+    assert len(starts) == 15
+
+    # 45-minute steps: 16:30 would end after 17:00
+    starts = _starts(SchedulingService.available_slots([doctor.id], DAY, DAY, 45))
+    assert starts[-1] == at(15, 45)
+
+
+def test_available_slots_ranking_and_limits(doctor, make_user, make_appointment):
+    other = make_user("doctor")
+    patient = make_user()
+    make_appointment(doctor, patient, at(15), duration_minutes=60)
+    db.session.commit()
+
+    slots = SchedulingService.available_slots(
+        [doctor.id, other.id], DAY, DAY + timedelta(days=1), not_before=at(16)
+    )
+    # Same start: the doctor with fewer booked minutes that day comes first
+    assert [(slot["doctor_id"], slot["start"]) for slot in slots[:2]] == [
+        (other.id, at(16)),
+        (doctor.id, at(16)),
+    ]
+    assert slots[1]["booked_minutes"] == 60
+
+    slots = SchedulingService.available_slots(
+        [doctor.id, other.id], DAY, DAY + timedelta(days=1), per_doctor=3, limit=5
+    )
+    assert len(slots) == 5
+    assert all(slot["start"].date() == DAY for slot in slots)
+
+
+@pytest.mark.parametrize(
+    "query, status",
+    [
+        ("per_doctor=2", 200),
+        ("per_doctor=0", 400),
+        ("per_doctor=-1", 400),
+        ("per_doctor=many", 400),
+        ("limit=0", 400),
+        ("duration=0", 400),
+    ],
+)
+def test_availability_rejects_non_positive_parameters(app, doctor, query, status):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(doctor.id)
+
+    response = client.get(f"/appointments/api/availability?date=2030-03-04&{query}")
+
+    assert response.status_code == status
+
+
+def _per_doctor_day_slots(doctor_ids, start_date, end_date, duration_minutes=30):
+    """The original search: one query and a nested scan per doctor and day."""
+    step = timedelta(minutes=duration_minutes)
+    slots = []
+    for doctor_id in doctor_ids:
+        day = start_date
+        while day <= end_date:
+            open_at = datetime.combine(day, datetime.min.time()).replace(hour=9)
+            close_at = open_at.replace(hour=17)
+            booked = Appointment.query.filter(
+                Appointment.doctor_id == doctor_id,
+                Appointment.appointment_date >= open_at,
+                Appointment.appointment_date < close_at + timedelta(days=1),
+                Appointment.status.in_(Appointment.ACTIVE_STATUSES),
+            ).all()
+            slot = open_at
+            while slot + step <= close_at:
+                if not any(
+                    slot < appointment.end_time and slot + step > appointment.appointment_date
+                    for appointment in booked
+                ):
+                    slots.append((doctor_id, slot))
+                slot += step
+            day += timedelta(days=1)
+    return slots
+
+
+@pytest.mark.skipif(
+    not os.environ.get("RUN_BENCHMARKS"), reason="set RUN_BENCHMARKS=1 to run"
+)
+@pytest.mark.parametrize("doctors", [20, 80])
+def test_benchmark_availability_search(app, make_user, count_selects, doctors):
+    """Queries and wall time of the bulk search against per-doctor, per-day lookups."""
+    rng = random.Random(20)
+    doctor_ids = [make_user("doctor").id for _ in range(doctors)]
+    patient = make_user()
+    rows = []
+    for doctor_id in doctor_ids:
+        for day in range(28):
+            for _ in range(8):
+                start = at(9, day=DAY + timedelta(days=day)) + timedelta(
+                    minutes=15 * rng.randrange(30)
+                )
+                rows.append(
+                    {
+                        "doctor_id": doctor_id,
+                        "patient_id": patient.id,
+                        "appointment_date": start,
+                        "duration_minutes": 30,
+                        "end_time": start + timedelta(minutes=30),
+                        "status": rng.choice(list(AppointmentStatus)),
+                    }
+                )
+    db.session.execute(Appointment.__table__.insert(), rows)
+    db.session.commit()
+    end_date = DAY + timedelta(days=27)
+
+    began = time.perf_counter()
+    with count_selects() as bulk_queries:
+        bulk = SchedulingService.available_slots(doctor_ids, DAY, end_date)
+    bulk_seconds = time.perf_counter() - began
+
+    began = time.perf_counter()
+    with count_selects() as old_queries:
+        old = _per_doctor_day_slots(doctor_ids, DAY, end_date)
+    old_seconds = time.perf_counter() - began
+
+    print(
+        f"\n{doctors} doctors x 28 days: bulk {len(bulk_queries)} queries {bulk_seconds:.3f}s, "
+        f"per-doctor-day {len(old_queries)} queries {old_seconds:.3f}s"
+    )
+    assert sorted((slot["doctor_id"], slot["start"]) for slot in bulk) == sorted(old)
+    assert len(bulk_queries) == 1
@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta
+import pytest
+from flask_login import login_user
+from app import db
+from app.models.appointment import AppointmentStatus
+from app.models.message import InternalMessage
+from app.services.analytics_cache import analytics_cache
+from app.utils.sidebar_utils import _counts_window, get_sidebar_stats
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def cache(request, app, tmp_path):
+    app.config["ANALYTICS_CACHE_BACKEND"] = request.param
+    app.config["ANALYTICS_CACHE_PATH"] = str(tmp_path / "analytics_cache.db")
+    analytics_cache.init_app(app)
+    yield analytics_cache
+    app.extensions["analytics_cache"] = None
+
+
+@pytest.fixture
+def sidebar(app):
+    """Render the sidebar counts as a user, in a request of their own."""
+
+    def render(user):
+        with app.test_request_context():
+            login_user(user)
+            return get_sidebar_stats()
+
+    return render
+
+
+@pytest.fixture
+def book_today(app, make_appointment):
+    def book(doctor, patient):
+        with app.test_request_context():
+            today_start = _counts_window()[2]
+        make_appointment(
+            doctor,
+            patient,
+            today_start + timedelta(hours=10),
+            status=AppointmentStatus.CONFIRMED,
+        )
+        db.session.commit()
+
+    return book
+
+
+def _results(method):
+    return analytics_cache.stats()["methods"].get(method, {"hits": 0, "misses": 0})
+
+
+def test_repeated_render_is_a_hit(cache, sidebar, make_user, book_today):
+    doctor, patient = make_user("doctor"), make_user()
+    book_today(doctor, patient)
+
+    first = sidebar(doctor)
+    assert sidebar(doctor) == first
+    assert first["todays_appointments"] == 1
+    assert _results("sidebar_doctor") == {"hits": 1, "misses": 1}
+    assert _results("sidebar_patients") == {"hits": 1, "misses": 1}
+
+
+def test_appointment_invalidates_only_its_doctor(cache, sidebar, make_user, book_today):
+    doctor, other, admin, patient = (
+        make_user("doctor"),
+        make_user("doctor"),
+        make_user("admin"),
+        make_user(),
+    )
+    for user in (doctor, other, admin):
+        assert sidebar(user)["todays_appointments"] == 0
+
+    book_today(doctor, patient)
+
+    assert sidebar(doctor)["todays_appointments"] == 1
+    assert sidebar(other)["todays_appointments"] == 0
+    assert _results("sidebar_doctor") == {"hits": 1, "misses": 3}
+    # The facility-wide entry counts every doctor's appointments
+    assert sidebar(admin)["todays_appointments"] == 1
+    assert _results("sidebar_facility") == {"hits": 0, "misses": 2}
+
+
+def test_message_invalidates_its_recipient(cache, sidebar, make_user):
+    sender, recipient = make_user("staff"), make_user("doctor")
+    assert sidebar(sender)["unread_messages"] == 0
+    assert sidebar(recipient)["unread_messages"] == 0
+
+    message = InternalMessage(
+        sender_id=sender.id, recipient_id=recipient.id, subject="Hi", content="Rounds"
+    )
+    db.session.add(message)
+    db.session.commit()
+
+    assert sidebar(recipient)["unread_messages"] == 1
+    assert sidebar(sender)["unread_messages"] == 0
+    assert _results("sidebar_user") == {"hits": 1, "misses": 1}
+
+    message.is_read = True
+    db.session.commit()
+    assert sidebar(recipient)["unread_messages"] == 0
+
+
+def test_new_patient_invalidates_the_shared_total(cache, sidebar, make_user):
+    staff = make_user("staff")
+    total = sidebar(staff)["total_patients"]
+
+    make_user()
+
+    assert sidebar(staff)["total_patients"] == total + 1
+    assert _results("sidebar_patients") == {"hits": 0, "misses": 2}
+
+
+def test_rolled_back_write_keeps_the_entry(cache, sidebar, make_user, make_appointment):
+    doctor, patient = make_user("doctor"), make_user()
+    sidebar(doctor)
+
+    make_appointment(doctor, patient, datetime(2030, 1, 1, 10))
+    db.session.flush()
+    db.session.rollback()
+
+    sidebar(doctor)
+    assert _results("sidebar_doctor") == {"hits": 1, "misses": 1}
+
@@ -0,0 +1,126 @@
+from types import SimpleNamespace
+import pytest
+from app.models.appointment import Appointment
+from app.models.user import User
+from app.services import stats_snapshot
+from app.services.stats_snapshot import SNAPSHOT_NAME, SnapshotStore, StatsSnapshotService
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """The snapshot module's clock, moved only by the test (and by sleeping)."""
+    now = SimpleNamespace(value=1_000_000.0)
+
+    def sleep(seconds):
+        now.value += seconds
+
+    monkeypatch.setattr(
+        stats_snapshot, "time", SimpleNamespace(time=lambda: now.value, sleep=sleep)
+    )
+    return now
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    return SnapshotStore(str(tmp_path / "snapshots.db"))
+
+
+@pytest.fixture
+def computes(app, monkeypatch):
+    """Replace the count query with a numbered payload; records each call."""
+    calls = []
+
+    def compute():
+        calls.append(len(calls) + 1)
+        return {"version": len(calls)}
+
+    monkeypatch.setattr(StatsSnapshotService, "compute", staticmethod(compute))
+    app.config["STATS_SNAPSHOT_INTERVAL"] = 30
+    app.config["STATS_SNAPSHOT_LEASE"] = 10
+    return calls
+
+
+def test_only_one_caller_holds_the_lease(store, clock):
+    assert store.claim(SNAPSHOT_NAME, 30, 10)
+    assert not store.claim(SNAPSHOT_NAME, 30, 10)
+
+    store.store(SNAPSHOT_NAME, {"version": 1})
+    assert store.read(SNAPSHOT_NAME) == ({"version": 1}, clock.value)
+    # Fresh again: nothing to refresh until it is older than max_age
+    assert not store.claim(SNAPSHOT_NAME, 30, 10)
+    clock.value += 31
+    assert store.claim(SNAPSHOT_NAME, 30, 10)
+
+
+def test_lease_expires_or_is_released(store, clock):
+    assert store.read(SNAPSHOT_NAME) == (None, 0)
+    assert store.claim(SNAPSHOT_NAME, 30, 10)
+
+    # The holder died without storing; the lease runs out
+    clock.value += 9
+    assert not store.claim(SNAPSHOT_NAME, 30, 10)
+    clock.value += 1
+    assert store.claim(SNAPSHOT_NAME, 30, 10)
+
+    store.release(SNAPSHOT_NAME)
+    assert store.claim(SNAPSHOT_NAME, 30, 10)
+
+
+def test_snapshot_is_reused_within_the_interval(app, computes, clock):
+    assert StatsSnapshotService.get_snapshot() == {"version": 1}
+    clock.value += 29
+    assert StatsSnapshotService.get_snapshot() == {"version": 1}
+    clock.value += 2
+    assert StatsSnapshotService.get_snapshot() == {"version": 2}
+    assert computes == [1, 2]
+
+
+def test_stale_snapshot_served_while_another_worker_refreshes(app, computes, clock):
+    StatsSnapshotService.get_snapshot()
+    clock.value += 31
+    # Another worker takes the lease first
+    assert StatsSnapshotService._store().claim(SNAPSHOT_NAME, 30, 10)
+
+    assert StatsSnapshotService.get_snapshot() == {"version": 1}
+    assert computes == [1]
+
+    # Its lease runs out without a new snapshot: the next caller refreshes
+    clock.value += 10
+    assert StatsSnapshotService.get_snapshot() == {"version": 2}
+
+
+def test_first_snapshot_waits_for_the_lease_holder(app, computes, clock):
+    assert StatsSnapshotService._store().claim(SNAPSHOT_NAME, 30, 10)
+
+    # Nothing is ever stored, so the caller gives up after the lease
+    assert StatsSnapshotService.get_snapshot() == {"version": 1}
+    assert clock.value >= 1_000_010
+
+
+def test_failed_compute_releases_the_lease(app, computes, clock, monkeypatch):
+    def fail():
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(StatsSnapshotService, "compute", staticmethod(fail))
+    with pytest.raises(RuntimeError):
+        StatsSnapshotService.get_snapshot()
+
+    assert StatsSnapshotService._store().claim(SNAPSHOT_NAME, 30, 10)
+
+
+def test_compute_counts_in_one_query(app, make_user, count_selects):
+    make_user("doctor")
+    make_user()
+    make_user(active=False)
+
+    with count_selects() as statements:
+        snapshot = StatsSnapshotService.compute()
+
+    assert len(statements) == 1
+    assert snapshot["total_patients"] == User.query.filter_by(
+        role="patient", active=True
+    ).count()
+    assert snapshot["total_users"] == User.query.count()
+    assert snapshot["active_users"] == snapshot["total_users"] - 1
+    assert snapshot["total_appointments"] == Appointment.query.count()
+    assert len(snapshot["login_days"]) == 7
@@ -0,0 +1,147 @@
+import random
+from collections import Counter
+from datetime import date, datetime, timedelta
+import pytest
+from app import db
+from app.models.medical_record import Prescription
+from app.models.trend_sketch import TrendSketch
+from app.services.analytics_service import AnalyticsService
+from app.services.trend_sketches import TrendSketchService
+from app.utils.sketches import HyperLogLog, SpaceSavingSketch
+
+START, END = date(2030, 2, 1), date(2030, 2, 7)
+MEDICATIONS = ["Amoxicillin", "Paracetamol", "Losartan", "Metformin", "Cetirizine"]
+
+
+def _stream(rng, size, items):
+    """Zipf-like item stream: item i is about 1/(i+1) as common as the first."""
+    weights = [1 / (i + 1) for i in range(items)]
+    return rng.choices([f"item{i}" for i in range(items)], weights=weights, k=size)
+
+
+def test_space_saving_is_exact_under_capacity():
+    rng = random.Random(11)
+    stream = _stream(rng, 2000, 40)
+    sketch = SpaceSavingSketch(50)
+    for patient, item in enumerate(stream):
+        sketch.add(item, patient % 30)
+
+    exact = Counter(stream)
+    assert {item: count for item, count, _ in sketch.top(50)} == exact
+    assert all(error == 0 for _, error in sketch.counters.values())
+
+
+def test_space_saving_bounds_heavy_hitters_over_capacity():
+    rng = random.Random(11)
+    stream = _stream(rng, 20_000, 500)
+    sketch = SpaceSavingSketch(50)
+    for item in stream:
+        sketch.add(item, 1)
+
+    exact = Counter(stream)
+    top = sketch.top(10)
+    assert [item for item, _, _ in top] == [item for item, _ in exact.most_common(10)]
+    for item, count, _ in top:
+        _, error = sketch.counters[item]
+        assert count - error <= exact[item] <= count
+
+
+def test_merged_day_sketches_match_one_sketch_of_the_range():
+    rng = random.Random(11)
+    days = [_stream(rng, 300, 30) for _ in range(7)]
+    whole = SpaceSavingSketch(50)
+    merged = SpaceSavingSketch(50)
+    for day in days:
+        sketch = SpaceSavingSketch(50)
+        for patient, item in enumerate(day):
+            sketch.add(item, patient)
+            whole.add(item, patient)
+        merged.merge(SpaceSavingSketch.from_dict(sketch.to_dict()))
+
+    assert merged.top(50) == whole.top(50)
+
+
+@pytest.mark.parametrize("distinct", [10, 1000, 50_000])
+def test_hyperloglog_estimate(distinct):
+    hll = HyperLogLog()
+    for value in range(distinct):
+        hll.add(value)
+        hll.add(value)
+
+    assert HyperLogLog.from_dict(hll.to_dict()).estimate() == hll.estimate()
+    # Linear counting is exact for small sets; ~1.6% standard error beyond
+    assert abs(hll.estimate() - distinct) <= max(1, distinct * 0.05)
+
+
+@pytest.fixture
+def prescriptions(app, make_user):
+    rng = random.Random(16)
+    doctors = [make_user("doctor") for _ in range(2)]
+    patients = [make_user() for _ in range(12)]
+    for _ in range(150):
+        day = START + timedelta(days=rng.randrange(7))
+        db.session.add(
+            Prescription(
+                doctor_id=rng.choice(doctors).id,
+                patient_id=rng.choice(patients).id,
+                # 01:00-09:00 UTC stays on the same clinic day
+                prescribed_date=datetime(day.year, day.month, day.day, rng.randrange(1, 10)),
+                medication_name=rng.choices(MEDICATIONS, weights=[8, 5, 3, 2, 1])[0],
+                dosage="500 mg",
+                frequency="Twice daily",
+                duration="7 days",
+            )
+        )
+    db.session.commit()
+    return doctors, patients
+
+
+def _trends(exact, doctor_id=None, end_date=END):
+    """Counts by medication; ties in count are ordered differently by SQL."""
+    return {
+        row["medication"]: (row["total_prescriptions"], row["unique_patients"])
+        for row in AnalyticsService.generate_prescription_trends(
+            START, end_date, doctor_id, limit=10, exact=exact
+        )
+    }
+
+
+def test_sketched_trends_match_exact_counts(prescriptions):
+    doctors, patients = prescriptions
+    TrendSketchService.refresh(START, END)
+
+    assert TrendSketchService.top_items("medication", START, END) is not None
+    assert len(_trends(exact=False)) == len(MEDICATIONS)
+    assert _trends(exact=False) == _trends(exact=True)
+    for doctor in doctors:
+        assert _trends(False, doctor.id) == _trends(True, doctor.id)
+
+    # Writes keep the sketches of the days they touch current
+    prescription = Prescription.query.filter_by(medication_name="Cetirizine").first()
+    prescription.prescribed_date = datetime(2030, 2, 8, 3)
+    db.session.add(
+        Prescription(
+            doctor_id=doctors[0].id,
+            patient_id=patients[0].id,
+            prescribed_date=datetime(2030, 2, 3, 4),
+            medication_name="Losartan",
+            dosage="50 mg",
+            frequency="Daily",
+            duration="30 days",
+        )
+    )
+    db.session.commit()
+
+    assert _trends(exact=False) == _trends(exact=True)
+    assert _trends(False, doctors[0].id) == _trends(True, doctors[0].id)
+
+
+def test_uncovered_range_falls_back_to_the_raw_rows(prescriptions):
+    # Writes sketched the days they touched; the empty day after was never sketched
+    later = END + timedelta(days=1)
+    assert TrendSketch.query.filter_by(metric_date=later).count() == 0
+    assert TrendSketchService.top_items("medication", START, later) is None
+
+    TrendSketchService.refresh(later, later)
+    assert TrendSketchService.top_items("medication", START, later) is not None
+    assert _trends(exact=False, end_date=later) == _trends(exact=True, end_date=later)
@@ -0,0 +1,79 @@
+import pytest
+from sqlalchemy import update
+from app import db, socketio
+from app.models.message import ConversationSummary, InternalMessage
+from app.services.unread_counters import UnreadCounterService
+
+
+@pytest.fixture
+def pushes(monkeypatch):
+    """Unread count pushes as ``(room, count)`` pairs, in order."""
+    sent = []
+
+    def emit(event, data, room=None, **kwargs):
+        if event == "unread_count_update":
+            sent.append((room, data["count"]))
+
+    monkeypatch.setattr(socketio, "emit", emit)
+    return sent
+
+
+@pytest.fixture
+def pair(app, make_user):
+    return make_user("staff"), make_user("doctor")
+
+
+def _send(sender, recipient):
+    message = InternalMessage(
+        sender_id=sender.id, recipient_id=recipient.id, subject="Lab", content="Results are in"
+    )
+    db.session.add(message)
+    return message
+
+
+def test_pushes_committed_counts_when_they_change(pair, pushes):
+    alice, bob = pair
+    first, second = _send(alice, bob), _send(alice, bob)
+    db.session.commit()
+    assert pushes == [(f"user_{bob.id}", 2)]
+
+    first.is_read = True
+    db.session.commit()
+    # Reading it again changes nothing and pushes nothing
+    first.is_read = True
+    db.session.commit()
+    db.session.delete(second)
+    db.session.commit()
+
+    assert pushes == [(f"user_{bob.id}", 2), (f"user_{bob.id}", 1), (f"user_{bob.id}", 0)]
+    assert UnreadCounterService.count(bob.id) == 0
+
+
+def test_rolled_back_changes_are_not_pushed(pair, pushes):
+    alice, bob = pair
+    _send(alice, bob)
+    db.session.flush()
+    db.session.rollback()
+
+    assert pushes == []
+    assert UnreadCounterService.count(bob.id) == 0
+
+
+def test_counts_follow_writes_from_other_processes(pair, pushes):
+    alice, bob = pair
+    _send(alice, bob)
+    db.session.commit()
+    assert UnreadCounterService.count(bob.id) == 1
+
+    # As another worker or a CLI command would, on its own connection
+    with db.engine.begin() as connection:
+        connection.execute(
+            update(ConversationSummary)
+            .where(ConversationSummary.user_id == bob.id)
+            .values(unread_count=5)
+        )
+
+    assert UnreadCounterService.count(bob.id) == 5
+    _send(alice, bob)
+    db.session.commit()
+    assert pushes[-1] == (f"user_{bob.id}", 6)